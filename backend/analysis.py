@@ -0,0 +1,774 @@
+import os
+import time
+import cv2
+import mediapipe as mp
+import numpy as np
+from typing import Callable, List, Optional, Union
+
+from config import settings
+from landmarks import (
+    LANDMARK_FIELDS, LEFT_ANKLE, LEFT_HIP, NUM_LANDMARKS, RIGHT_ANKLE, RIGHT_HIP, LandmarkTrack,
+    hip_center, hip_centers, pose_landmarks_array
+)
+from metrics import compute_basketball_metrics, compute_metrics_from_positions
+from pipeline import FramePipeline, frame_sink_for, merge_stage_timings
+from proxy import ProxyWriter
+from timeline import ThumbnailCollector, merge_timelines, range_timeline, write_sprite, write_video_index
+from roi import crop_region, expand_box, landmark_box
+from schemas import PoseLandmark, BasketballMetrics, VideoAnalysis, AnalysisProfile
+from storage import (
+    FORMAT_VERSION, LandmarkWriter, concatenate_landmark_files, landmarks_path,
+    open_landmark_array, read_landmarks, save_summary, summary_path
+)
+
+# MediaPipe Pose solution
+mp_pose = mp.solutions.pose
+
+# Landmarks the metrics depend on; the model cascade escalates when they are poorly visible
+CASCADE_LANDMARKS = (LEFT_HIP, RIGHT_HIP, LEFT_ANKLE, RIGHT_ANKLE)
+
+def create_pose(model_complexity: Optional[int] = None, static_image_mode: bool = False):
+    """
+    Create a MediaPipe Pose instance. Pose keeps tracking state between frames,
+    so every worker process owns its own instance.
+    """
+    return mp_pose.Pose(
+        static_image_mode=static_image_mode,
+        min_detection_confidence=settings.POSE_MIN_DETECTION_CONFIDENCE,
+        min_tracking_confidence=settings.POSE_MIN_TRACKING_CONFIDENCE,
+        model_complexity=settings.POSE_MODEL_COMPLEXITY if model_complexity is None else model_complexity
+    )
+
+class CascadePose:
+    """
+    Pose with a model cascade: every frame goes through the lite model, and
+    only frames where it lost the person or sees the hips and ankles with a
+    visibility below `visibility_threshold` are run again through the heavy
+    model. The heavy result is used when it sees those landmarks better.
+    
+    The lite instance tracks between frames as usual. The heavy one only
+    sees scattered frames, so it runs in static image mode instead of
+    tracking from a stale region. Counts and timings per tier since the last
+    reset() are reported by stats().
+    """
+    stats_key = "model_cascade"
+    
+    def __init__(self, lite_pose, heavy_pose, visibility_threshold: float,
+                 lite_complexity: Optional[int] = None, heavy_complexity: Optional[int] = None):
+        self.lite = lite_pose
+        self.heavy = heavy_pose
+        self.visibility_threshold = visibility_threshold
+        self.lite_complexity = lite_complexity
+        self.heavy_complexity = heavy_complexity
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        self.frames = 0
+        self.lite_frames = 0
+        self.heavy_frames = 0
+        self.escalations = {"lost": 0, "low_visibility": 0}
+        self.lite_seconds = 0.0
+        self.heavy_seconds = 0.0
+    
+    @staticmethod
+    def key_visibility(results) -> float:
+        """Lowest visibility of the hips and ankles, 0 without a detection."""
+        if not results.pose_landmarks:
+            return 0.0
+        landmarks = results.pose_landmarks.landmark
+        return min(landmarks[i].visibility for i in CASCADE_LANDMARKS)
+    
+    def process(self, image):
+        self.frames += 1
+        started = time.perf_counter()
+        results = self.lite.process(image)
+        self.lite_seconds += time.perf_counter() - started
+        
+        lite_visibility = self.key_visibility(results)
+        if lite_visibility >= self.visibility_threshold:
+            self.lite_frames += 1
+            return results
+        self.escalations["lost" if not results.pose_landmarks else "low_visibility"] += 1
+        
+        started = time.perf_counter()
+        heavy_results = self.heavy.process(image)
+        self.heavy_seconds += time.perf_counter() - started
+        if heavy_results.pose_landmarks and self.key_visibility(heavy_results) > lite_visibility:
+            self.heavy_frames += 1
+            return heavy_results
+        self.lite_frames += 1
+        return results
+    
+    def reset_tracking(self):
+        """Drops tracking state but keeps the stats."""
+        self.lite.reset()
+        self.heavy.reset()
+    
+    def reset(self):
+        self.reset_tracking()
+        self._reset_stats()
+    
+    def close(self):
+        self.lite.close()
+        self.heavy.close()
+    
+    def stats(self) -> dict:
+        escalated = sum(self.escalations.values())
+        return {
+            "lite_complexity": self.lite_complexity,
+            "heavy_complexity": self.heavy_complexity,
+            "visibility_threshold": self.visibility_threshold,
+            "frames": self.frames,
+            "lite_frames": self.lite_frames,
+            "heavy_frames": self.heavy_frames,
+            "escalations": dict(self.escalations),
+            "lite_seconds": round(self.lite_seconds, 4),
+            "heavy_seconds": round(self.heavy_seconds, 4),
+            "escalation_rate": round(escalated / self.frames, 4) if self.frames else 0.0,
+            "heavy_rate": round(self.heavy_frames / self.frames, 4) if self.frames else 0.0,
+        }
+
+def create_cascade_pose() -> CascadePose:
+    """Lite/heavy Pose cascade with the POSE_CASCADE_* settings."""
+    return CascadePose(
+        create_pose(settings.POSE_CASCADE_LITE_COMPLEXITY),
+        create_pose(settings.POSE_CASCADE_HEAVY_COMPLEXITY, static_image_mode=True),
+        settings.POSE_CASCADE_VISIBILITY_THRESHOLD,
+        lite_complexity=settings.POSE_CASCADE_LITE_COMPLEXITY,
+        heavy_complexity=settings.POSE_CASCADE_HEAVY_COMPLEXITY,
+    )
+
+def merge_cascade_stats(stats: List[dict]) -> Optional[dict]:
+    """Adds up the cascade stats of several frame ranges (e.g. video segments)."""
+    stats = [s for s in stats if s]
+    if not stats:
+        return None
+    merged = {key: stats[0][key] for key in ("lite_complexity", "heavy_complexity", "visibility_threshold")}
+    for key in ("frames", "lite_frames", "heavy_frames", "lite_seconds", "heavy_seconds"):
+        merged[key] = sum(s[key] for s in stats)
+    merged["lite_seconds"] = round(merged["lite_seconds"], 4)
+    merged["heavy_seconds"] = round(merged["heavy_seconds"], 4)
+    merged["escalations"] = {
+        reason: sum(s["escalations"][reason] for s in stats) for reason in stats[0]["escalations"]
+    }
+    frames = merged["frames"]
+    merged["escalation_rate"] = round(sum(merged["escalations"].values()) / frames, 4) if frames else 0.0
+    merged["heavy_rate"] = round(merged["heavy_frames"] / frames, 4) if frames else 0.0
+    return merged
+
+class RoiPose:
+    """
+    Pose on a region of interest: each frame is cropped to the previous
+    frame's landmark bounding box, padded by `padding` and shrunk to at most
+    `max_crop_size` pixels, and the landmarks are mapped back to coordinates
+    normalized to the full frame, so callers see no difference. When the
+    person is lost, or the region would cover most of the frame anyway, the
+    full frame is used until landmarks are found again.
+    
+    The wrapped Pose tracks in the coordinates of its input image, so its
+    tracking state is reset whenever the input switches between the crop
+    and the full frame.
+    """
+    stats_key = "roi"
+    
+    # Crops covering more of the frame than this save too little to be worth it
+    MAX_AREA_FRACTION = 0.6
+    
+    def __init__(self, pose, padding: float, max_crop_size: Optional[int] = None):
+        self.pose = pose
+        self.padding = padding
+        self.max_crop_size = max_crop_size
+        self.box = None
+        self._cropping = False
+        self._crop = None
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.fallbacks = 0
+        self.pixels = 0
+        self.full_pixels = 0
+    
+    def _switch(self, cropping: bool):
+        if cropping != self._cropping:
+            # Wrapped cascades keep their stats
+            getattr(self.pose, "reset_tracking", self.pose.reset)()
+            self._cropping = cropping
+    
+    def _process_crop(self, image, crop_box: tuple):
+        height, width = image.shape[:2]
+        crop = crop_region(image, crop_box, self.max_crop_size, dst=self._crop)
+        self._crop = crop
+        crop.flags.writeable = False
+        results = self.pose.process(crop)
+        crop.flags.writeable = True
+        self.pixels += crop.shape[0] * crop.shape[1]
+        if results.pose_landmarks:
+            # Crop-normalized -> frame-normalized, in place on the result
+            x0, y0, x1, y1 = crop_box
+            for landmark in results.pose_landmarks.landmark:
+                landmark.x = (landmark.x * (x1 - x0) + x0) / width
+                landmark.y = (landmark.y * (y1 - y0) + y0) / height
+                landmark.z = landmark.z * (x1 - x0) / width
+        return results
+    
+    def process(self, image):
+        height, width = image.shape[:2]
+        self.full_pixels += width * height
+        crop_box = None
+        if self.box is not None:
+            crop_box = expand_box(self.box, self.padding, width, height)
+            if crop_box is not None and (
+                (crop_box[2] - crop_box[0]) * (crop_box[3] - crop_box[1]) > self.MAX_AREA_FRACTION * width * height
+            ):
+                crop_box = None
+        
+        results = None
+        if crop_box is not None:
+            self._switch(True)
+            results = self._process_crop(image, crop_box)
+            if results.pose_landmarks:
+                self.roi_frames += 1
+            else:
+                # Lost the person inside the region; look at the whole frame
+                self.fallbacks += 1
+                results = None
+        if results is None:
+            self._switch(False)
+            results = self.pose.process(image)
+            self.pixels += width * height
+            self.full_frames += 1
+        
+        landmarks = pose_landmarks_array(results)
+        self.box = landmark_box(landmarks, width, height) if landmarks is not None else None
+        return results
+    
+    def reset(self):
+        self.pose.reset()
+        self.box = None
+        self._cropping = False
+        self._reset_stats()
+    
+    def close(self):
+        self.pose.close()
+    
+    def stats(self) -> dict:
+        frames = self.roi_frames + self.full_frames
+        return {
+            "padding": self.padding,
+            "max_crop_size": self.max_crop_size,
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "fallbacks": self.fallbacks,
+            "roi_rate": round(self.roi_frames / frames, 4) if frames else 0.0,
+            "pixel_fraction": round(self.pixels / self.full_pixels, 4) if self.full_pixels else 0.0,
+            "pixels": self.pixels,
+            "full_pixels": self.full_pixels,
+        }
+
+def create_roi_pose(pose) -> RoiPose:
+    """Wraps a Pose (or cascade) for region-of-interest inference with the ROI_* settings."""
+    return RoiPose(pose, settings.ROI_PADDING, settings.ROI_MAX_CROP_SIZE)
+
+def merge_roi_stats(stats: List[dict]) -> Optional[dict]:
+    """Adds up the ROI stats of several frame ranges (e.g. video segments)."""
+    stats = [s for s in stats if s]
+    if not stats:
+        return None
+    merged = {key: stats[0][key] for key in ("padding", "max_crop_size")}
+    for key in ("roi_frames", "full_frames", "fallbacks", "pixels", "full_pixels"):
+        merged[key] = sum(s[key] for s in stats)
+    frames = merged["roi_frames"] + merged["full_frames"]
+    merged["roi_rate"] = round(merged["roi_frames"] / frames, 4) if frames else 0.0
+    merged["pixel_fraction"] = (
+        round(merged["pixels"] / merged["full_pixels"], 4) if merged["full_pixels"] else 0.0
+    )
+    return merged
+
+# Stats of the Pose wrappers by analysis_metadata key, and how segments are merged
+POSE_STATS_MERGERS = {
+    CascadePose.stats_key: merge_cascade_stats,
+    RoiPose.stats_key: merge_roi_stats,
+}
+
+def pose_stats(pose) -> dict:
+    """Stats of `pose` and the wrappers inside it, keyed by their stats_key."""
+    stats = {}
+    while hasattr(pose, "stats_key"):
+        stats[pose.stats_key] = pose.stats()
+        pose = getattr(pose, "pose", None)
+    return stats
+
+def read_video_properties(video_path: str) -> dict:
+    """
+    Reads fps, frame count and frame size from the container. Raises
+    ValueError when the file cannot be opened as a video.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video file {os.path.basename(video_path)}")
+        return {
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+class LandmarkStream:
+    """
+    Takes the analyzed frames of a range in frame order, fills in the frames
+    skipped by the stride and appends everything to a LandmarkWriter.
+    
+    Skipped frames between two detections are interpolated linearly; next to
+    an analyzed frame without a detection they stay empty. Only the previous
+    analyzed frame is held in memory.
+    """
+    def __init__(self, writer: LandmarkWriter, start_frame: int):
+        self.writer = writer
+        self.start_frame = start_frame
+        self.next_index = start_frame
+        self.detected_frames = 0
+        self.interpolated_frames = 0
+        self._previous = None  # (frame_index, landmarks or None) of the last analyzed frame
+    
+    def add(self, frame_index: int, landmarks: Optional[np.ndarray]):
+        """Adds an analyzed frame. Frames before start_frame only anchor the interpolation."""
+        if self._previous is not None:
+            self._write_previous(frame_index, landmarks, stop_index=frame_index)
+        elif frame_index > self.next_index:
+            # No earlier analyzed frame to interpolate from
+            self.writer.write_missing(frame_index - self.next_index)
+            self.next_index = frame_index
+        self._previous = (frame_index, landmarks)
+    
+    def finish(self, end_index: int, anchor: Optional[tuple] = None):
+        """
+        Completes the range at `end_index` (exclusive). `anchor` is the
+        (frame_index, landmarks) of the first analyzed frame after the range,
+        used only to interpolate the frames up to `end_index`.
+        """
+        if self._previous is not None:
+            anchor_index, anchor_landmarks = anchor or (end_index, None)
+            self._write_previous(anchor_index, anchor_landmarks, stop_index=end_index)
+        self.writer.write_missing(end_index - self.next_index)
+        self.next_index = max(self.next_index, end_index)
+    
+    def _write_previous(self, next_index: int, next_landmarks: Optional[np.ndarray], stop_index: int):
+        """
+        Writes the previous analyzed frame and the skipped frames after it,
+        up to `stop_index`, using the analyzed frame at `next_index` as the
+        other end of the interpolation.
+        """
+        index, landmarks = self._previous
+        if index >= self.start_frame:
+            self.writer.write_frame(landmarks)
+            if landmarks is not None:
+                self.detected_frames += 1
+        
+        first_skipped = max(index + 1, self.start_frame)
+        count = min(stop_index, next_index) - first_skipped
+        if count <= 0:
+            self.next_index = max(self.next_index, index + 1)
+            return
+        if landmarks is not None and next_landmarks is not None:
+            # Positions are relative to the full gap between the two analyzed frames
+            t = np.arange(first_skipped - index, first_skipped - index + count, dtype=np.float32)
+            t = (t / (next_index - index))[:, None, None]
+            frames = landmarks + (next_landmarks - landmarks) * t
+            frames[:, :, 3] = np.minimum(landmarks[:, 3], next_landmarks[:, 3])
+            self.writer.write_frames(frames)
+            self.interpolated_frames += count
+        else:
+            self.writer.write_missing(count)
+        self.next_index = first_skipped + count
+
+def _analyzed_hip_positions(path: str, start_frame: int, frames: int, stride: int) -> list:
+    """
+    Hip-center positions of the analyzed frames among the first `frames`
+    frames of a landmark file that starts at `start_frame`, as
+    analyze_frame_range collects them while analyzing.
+    """
+    data = open_landmark_array(path)[:frames]
+    centers, visible = hip_centers(data[(np.arange(len(data)) + start_frame) % stride == 0])
+    return [tuple(center) for center in centers[visible].tolist()]
+
+def analyze_frame_range(video_path: str, pose, profile: AnalysisProfile, stride: int,
+                        output_path: str, start_frame: int = 0, end_frame: Optional[int] = None,
+                        warmup_frames: int = 0,
+                        progress: Optional[Callable[[int], None]] = None,
+                        checkpoint: Optional[Callable[[dict], None]] = None,
+                        resume_from: Optional[dict] = None,
+                        proxy: Optional[ProxyWriter] = None,
+                        thumbnails: Optional[ThumbnailCollector] = None) -> dict:
+    """
+    Runs pose estimation on frames [start_frame, end_frame) of a video and
+    appends their landmarks to the landmark file at `output_path`.
+    
+    Frames whose index is a multiple of `stride` are analyzed, the rest are
+    only grabbed and later interpolated. With `warmup_frames`, that many
+    frames before `start_frame` are fed to Pose first so the tracker has
+    settled when the range begins; they are not written.
+    
+    `progress` is called every ANALYSIS_PROGRESS_INTERVAL frames and once at
+    the end with the number of frames of the range covered since its previous
+    call and the hip positions collected so far (a list that keeps growing,
+    not a copy); exceptions it raises abort the analysis.
+    
+    `checkpoint` is called about every ANALYSIS_CHECKPOINT_INTERVAL frames,
+    once the landmarks written so far are on disk, with a state to pass back
+    as `resume_from`: the analysis then keeps those frames of `output_path`
+    and continues from the checkpoint frame instead of `start_frame`.
+    
+    `proxy` receives the decoded frames of the range, i.e. every `stride`th
+    frame, and is closed at the end; resumed ranges discard it, since an
+    encoded video cannot be appended to. `thumbnails` collects the
+    timeline thumbnails of the range from the same frames.
+    
+    Returns the hip-center positions of the analyzed frames for the metrics
+    along with frame counts, stage timings and the stats of Pose wrappers
+    such as CascadePose and RoiPose.
+    """
+    hip_positions = []
+    sampled_frames = 0
+    inference_size = None
+    anchor = None
+    progress_interval = max(1, settings.ANALYSIS_PROGRESS_INTERVAL)
+    checkpoint_interval = max(1, settings.ANALYSIS_CHECKPOINT_INTERVAL)
+    
+    resume_frame = start_frame
+    if resume_from is not None and resume_from["frame"] > start_frame:
+        # Frames before the checkpoint are on disk; only their hip positions are needed again
+        resume_frame = resume_from["frame"]
+        hip_positions = _analyzed_hip_positions(output_path, start_frame, resume_frame - start_frame, stride)
+        sampled_frames = resume_from["sampled_frames"]
+        inference_size = tuple(resume_from["inference_size"]) if resume_from.get("inference_size") else None
+        # Warm-up lets the tracker settle and re-anchors the interpolation across the checkpoint
+        warmup_frames = max(warmup_frames, settings.ANALYSIS_SEGMENT_OVERLAP, stride)
+    reported_frames = resume_frame - start_frame
+    last_checkpoint = resume_frame
+    
+    if proxy is not None and resume_frame > start_frame:
+        proxy.abort()
+        proxy = None
+    frame_sink = frame_sink_for(proxy, thumbnails, end_frame)
+    
+    # Analyze up to the first stride frame past the range so its last skipped frames can be interpolated
+    pipeline_end = end_frame + stride - 1 if end_frame is not None and stride > 1 else end_frame
+    pipeline = FramePipeline(
+        video_path, stride, start_frame=resume_frame, end_frame=pipeline_end,
+        warmup_frames=warmup_frames, max_inference_size=profile.max_inference_size,
+        frame_sink=frame_sink
+    )
+    
+    with LandmarkWriter(output_path, keep_frames=resume_frame - start_frame) as writer:
+        stream = LandmarkStream(writer, resume_frame)
+        if resume_frame > start_frame:
+            stream.detected_frames = resume_from["detected_frames"]
+            stream.interpolated_frames = resume_from["interpolated_frames"]
+        frames = iter(pipeline)
+        try:
+            for frame_index, image, in_range in frames:
+                # Process the image and find pose
+                results = pose.process(image)
+                
+                # Extract landmarks if a pose is detected
+                landmarks = pose_landmarks_array(results)
+                
+                if end_frame is not None and frame_index >= end_frame:
+                    anchor = (frame_index, landmarks)
+                    break
+                stream.add(frame_index, landmarks)
+                if not in_range:
+                    continue
+                
+                if checkpoint is not None and frame_index - last_checkpoint >= checkpoint_interval:
+                    # Every frame before this one is written; make them durable before recording it
+                    writer.sync()
+                    checkpoint({
+                        "frame": stream.next_index,
+                        "sampled_frames": sampled_frames,
+                        "detected_frames": stream.detected_frames,
+                        "interpolated_frames": stream.interpolated_frames,
+                        "inference_size": inference_size,
+                    })
+                    last_checkpoint = frame_index
+                
+                sampled_frames += 1
+                inference_size = image.shape[1], image.shape[0]
+                covered_frames = frame_index + 1 - start_frame
+                if progress is not None and covered_frames - reported_frames >= progress_interval:
+                    progress(covered_frames - reported_frames, hip_positions)
+                    reported_frames = covered_frames
+                center = hip_center(landmarks) if landmarks is not None else None
+                if center is not None:
+                    hip_positions.append(center)
+        except BaseException:
+            if proxy is not None:
+                proxy.abort()
+            raise
+        finally:
+            frames.close()
+        
+        range_end = pipeline.frames_read if end_frame is None else min(pipeline.frames_read, end_frame)
+        stream.finish(max(range_end, start_frame), anchor)
+    
+    if progress is not None and writer.frames_written > reported_frames:
+        progress(writer.frames_written - reported_frames, hip_positions)
+    
+    return {
+        "start_frame": start_frame,
+        "frames": writer.frames_written,
+        "landmarks_path": output_path,
+        "hip_positions": np.array(hip_positions, dtype=np.float64).reshape(-1, 2),
+        "sampled_frames": sampled_frames,
+        "detected_frames": stream.detected_frames,
+        "interpolated_frames": stream.interpolated_frames,
+        "inference_size": inference_size,
+        "stage_timings": pipeline.stage_timings(),
+        "pose_stats": pose_stats(pose),
+        "resumed_from_frame": resume_frame if resume_frame > start_frame else None,
+        "proxy": proxy.close() if proxy is not None else None,
+        "timeline": range_timeline(
+            start_frame, writer.frames_written, resume_frame, pipeline.keyframes, pipeline.timestamps, thumbnails
+        ),
+    }
+
+def plan_segments(total_frames: int, segment_count: int) -> List[tuple]:
+    """
+    Splits [0, total_frames) into contiguous (start, end) frame ranges. The
+    last range is open-ended because container frame counts are estimates.
+    """
+    segment_count = max(1, min(segment_count, total_frames))
+    boundaries = [round(i * total_frames / segment_count) for i in range(segment_count)]
+    return [
+        (start, boundaries[i + 1] if i + 1 < len(boundaries) else None)
+        for i, start in enumerate(boundaries)
+    ]
+
+def stitch_frame_ranges(ranges: List[dict], output_path: str) -> dict:
+    """
+    Joins per-segment results of analyze_frame_range back into one timeline
+    and concatenates their landmark files into `output_path`.
+    """
+    ranges = sorted(ranges, key=lambda r: r["start_frame"])
+    stitched = {
+        "start_frame": 0,
+        "frames": 0,
+        "landmarks_path": output_path,
+        "sampled_frames": 0,
+        "detected_frames": 0,
+        "interpolated_frames": 0,
+        "inference_size": None,
+    }
+    for frame_range in ranges:
+        if stitched["frames"] != frame_range["start_frame"]:
+            raise ValueError(
+                f"Segment starting at frame {frame_range['start_frame']} does not line up "
+                f"with {stitched['frames']} stitched frames"
+            )
+        for key in ("frames", "sampled_frames", "detected_frames", "interpolated_frames"):
+            stitched[key] += frame_range[key]
+        stitched["inference_size"] = stitched["inference_size"] or frame_range["inference_size"]
+    stitched["hip_positions"] = np.concatenate([r["hip_positions"] for r in ranges])
+    stitched["stage_timings"] = merge_stage_timings([r["stage_timings"] for r in ranges])
+    stitched["pose_stats"] = {}
+    for key, merge in POSE_STATS_MERGERS.items():
+        merged = merge([r.get("pose_stats", {}).get(key) for r in ranges])
+        if merged is not None:
+            stitched["pose_stats"][key] = merged
+    stitched["timeline"] = merge_timelines([r.get("timeline") for r in ranges])
+    concatenate_landmark_files([r["landmarks_path"] for r in ranges], output_path)
+    return stitched
+
+class AnalysisResult:
+    """
+    Internal result of a video analysis. Landmarks stay in the landmark file
+    and are memory-mapped on demand; the VideoAnalysis Pydantic model is only
+    built for API responses.
+    """
+    def __init__(self, video_id: str, status: str, total_frames: int, processed_frames: int,
+                 landmarks_path: str, basketball_metrics: BasketballMetrics,
+                 analysis_metadata: dict, timeline: Optional[dict] = None):
+        self.video_id = video_id
+        self.status = status
+        self.total_frames = total_frames
+        self.processed_frames = processed_frames
+        self.landmarks_path = landmarks_path
+        self.basketball_metrics = basketball_metrics
+        self.analysis_metadata = analysis_metadata
+        # Keyframes, timestamps and thumbnails from the decode, written by save_video_analysis
+        self.timeline = timeline
+    
+    @property
+    def landmarks(self) -> LandmarkTrack:
+        return read_landmarks(self.landmarks_path)
+    
+    def summary(self) -> dict:
+        """Summary file contents: everything but the landmarks, plus where they are stored."""
+        frames = len(self.landmarks)
+        return {
+            "video_id": self.video_id,
+            "status": self.status,
+            "total_frames": self.total_frames,
+            "processed_frames": self.processed_frames,
+            "basketball_metrics": self.basketball_metrics.dict(),
+            "analysis_metadata": self.analysis_metadata,
+            "landmarks": {
+                "file": os.path.basename(self.landmarks_path),
+                "format_version": FORMAT_VERSION,
+                "dtype": "float32",
+                "shape": [frames, NUM_LANDMARKS, 4],
+                "fields": list(LANDMARK_FIELDS),
+                "missing": "nan",
+            },
+        }
+    
+    def to_video_analysis(self) -> VideoAnalysis:
+        return VideoAnalysis(
+            video_id=self.video_id,
+            status=self.status,
+            total_frames=self.total_frames,
+            processed_frames=self.processed_frames,
+            pose_landmarks=self.landmarks.to_pydantic(),
+            basketball_metrics=self.basketball_metrics,
+            analysis_metadata=self.analysis_metadata
+        )
+
+def build_video_analysis(video_id: str, properties: dict, profile: AnalysisProfile,
+                         stride: int, frames: dict) -> AnalysisResult:
+    """
+    Turns analyzed frames into an AnalysisResult. Metrics use the analyzed
+    frames only, at the rate they were sampled.
+    """
+    fps = properties["fps"]
+    total_frames = properties["total_frames"]
+    width, height = properties["width"], properties["height"]
+    effective_fps = fps / stride if fps > 0 else 0
+    inference_size = frames["inference_size"]
+    
+    basketball_metrics = compute_metrics_from_positions(
+        frames["hip_positions"], width, height, effective_fps
+    )
+    processed_frames = frames["detected_frames"] + frames["interpolated_frames"]
+    
+    analysis_metadata = {
+        "model_version": "mediapipe_pose",
+        "analysis_duration": total_frames / fps if fps > 0 else 0,
+        "court_dimensions": {"width": width, "height": height},
+        "fps": fps,
+        "pose_detection_rate": (processed_frames / total_frames) * 100 if total_frames > 0 else 0,
+        "analysis_profile": profile.dict(),
+        "frame_stride": stride,
+        "effective_fps": effective_fps,
+        "analyzed_frames": frames["sampled_frames"],
+        "interpolated_frames": frames["interpolated_frames"],
+        "inference_resolution": (
+            {"width": inference_size[0], "height": inference_size[1]} if inference_size else None
+        ),
+        "stage_timings": frames["stage_timings"],
+    }
+    # Tier usage of a model cascade, crop savings of ROI inference
+    analysis_metadata.update(frames.get("pose_stats") or {})
+    if frames.get("resumed_from_frame"):
+        analysis_metadata["resumed_from_frame"] = frames["resumed_from_frame"]
+    if frames.get("proxy"):
+        analysis_metadata["proxy"] = frames["proxy"]
+    
+    return AnalysisResult(
+        video_id=video_id,
+        status="completed",
+        total_frames=total_frames,
+        processed_frames=processed_frames,
+        landmarks_path=frames["landmarks_path"],
+        basketball_metrics=basketball_metrics,
+        analysis_metadata=analysis_metadata,
+        timeline=frames.get("timeline")
+    )
+
+def run_pose_analysis(video_path: str, video_id: str, pose,
+                      profile: Optional[AnalysisProfile] = None,
+                      output_path: Optional[str] = None,
+                      progress: Optional[Callable[[int], None]] = None,
+                      checkpoint: Optional[Callable[[dict], None]] = None,
+                      resume_from: Optional[dict] = None,
+                      proxy_output_path: Optional[str] = None) -> AnalysisResult:
+    """
+    Runs pose estimation over a video according to the analysis profile,
+    streaming landmarks to `output_path` (the video's landmark file by
+    default). The summary is not saved. `checkpoint` and `resume_from` work
+    as in analyze_frame_range. With `proxy_output_path`, a playback proxy
+    of the analyzed frames is written there.
+    """
+    profile = profile or AnalysisProfile.from_settings()
+    properties = read_video_properties(video_path)
+    stride = profile.stride_for(properties["fps"])
+    proxy = None
+    if proxy_output_path:
+        # One proxy frame per analyzed frame keeps the proxy's timeline aligned with the original
+        proxy = ProxyWriter(proxy_output_path, properties["fps"] / stride if properties["fps"] > 0 else 0)
+    thumbnails = None
+    if settings.ANALYSIS_THUMBNAILS:
+        thumbnails = ThumbnailCollector(properties["fps"], properties["total_frames"])
+    frames = analyze_frame_range(
+        video_path, pose, profile, stride, output_path or landmarks_path(video_id),
+        progress=progress, checkpoint=checkpoint, resume_from=resume_from, proxy=proxy,
+        thumbnails=thumbnails
+    )
+    return build_video_analysis(video_id, properties, profile, stride, frames)
+
+def save_video_analysis(analysis_result: AnalysisResult):
+    """
+    Writes the thumbnail sprite and keyframe index, then the summary next
+    to the landmark file, which completes the analysis.
+    """
+    timeline = analysis_result.timeline
+    if timeline is not None:
+        metadata = analysis_result.analysis_metadata
+        metadata["video_index"] = write_video_index(
+            analysis_result.video_id, metadata["fps"], timeline["keyframes"], timeline["timestamps"]
+        )
+        if timeline["thumbnails"] is not None:
+            sprite = write_sprite(analysis_result.video_id, timeline["thumbnails"], metadata["analysis_duration"])
+            if sprite is not None:
+                metadata["thumbnails"] = sprite
+    save_summary(analysis_result.video_id, analysis_result.summary())
+    print(f"Analysis saved to: {summary_path(analysis_result.video_id)}")
+
+def analyze_video_for_pose(video_path: str, video_id: str, pose=None,
+                           profile: Optional[AnalysisProfile] = None):
+    """
+    Analyzes a video file to extract pose landmarks for each frame using MediaPipe.
+    Calculates basketball metrics from pose data.
+    
+    Workers pass in their own Pose instance; when none is given a fresh one is
+    created for this call and closed afterwards.
+    """
+    owns_pose = pose is None
+    if owns_pose:
+        pose = create_pose()
+    try:
+        analysis_result = run_pose_analysis(video_path, video_id, pose, profile)
+        save_video_analysis(analysis_result)
+        return analysis_result
+        
+    except Exception as e:
+        print(f"Error analyzing video: {e}")
+        return None
+    finally:
+        if owns_pose:
+            pose.close()
+
+def calculate_basketball_metrics_from_pose(pose_landmarks: Union[LandmarkTrack, List[Optional[List[PoseLandmark]]]], 
+                                         court_width: float, court_height: float, fps: float,
+                                         **thresholds) -> BasketballMetrics:
+    """
+    Calculate basketball metrics from pose landmark data.
+    Keyword arguments override the thresholds of compute_basketball_metrics.
+    """
+    if not isinstance(pose_landmarks, LandmarkTrack):
+        pose_landmarks = LandmarkTrack.from_list(pose_landmarks or [])
+    return compute_basketball_metrics(pose_landmarks, court_width, court_height, fps, **thresholds)
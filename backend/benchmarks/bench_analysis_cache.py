@@ -0,0 +1,96 @@
+"""
+Latency of GET /videos/{video_id}/analysis with a cold and a hot response cache.
+
+    python -m benchmarks.bench_analysis_cache [--frames 9000] [--requests 50]
+
+Writes a synthetic analysis of `--frames` frames into a temporary analysis
+directory, then times requests through the ASGI app: cold requests clear the
+cache first and load, validate and serialize the analysis; hot requests are
+served from the cached bytes.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+def percentile(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+def write_analysis(video_id: str, frames: int, seed: int):
+    from landmarks import LandmarkTrack
+    from metrics import compute_basketball_metrics
+    from storage import FORMAT_VERSION, LandmarkWriter, landmarks_path, save_summary
+
+    rng = np.random.default_rng(seed)
+    data = rng.random((frames, 33, 4)).astype(np.float32)
+    data[rng.random(frames) < 0.2] = np.nan
+    with LandmarkWriter(landmarks_path(video_id)) as writer:
+        writer.write_frames(data)
+    track = LandmarkTrack(np.nan_to_num(data), ~np.isnan(data[:, 0, 0]))
+    save_summary(video_id, {
+        "video_id": video_id,
+        "status": "completed",
+        "total_frames": frames,
+        "processed_frames": track.detected_count,
+        "basketball_metrics": compute_basketball_metrics(track, 1920, 1080, 30.0).dict(),
+        "analysis_metadata": {"fps": 30.0},
+        "landmarks": {
+            "file": os.path.basename(landmarks_path(video_id)),
+            "format_version": FORMAT_VERSION,
+            "dtype": "<f4",
+            "shape": [frames, 33, 4],
+        },
+    })
+
+def time_requests(client, url: str, requests: int, clear=None) -> list:
+    samples = []
+    for _ in range(requests):
+        if clear is not None:
+            clear()
+        started = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f"GET {url} returned {response.status_code}")
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=5 * 60 * 30, help="frames in the synthetic analysis")
+    parser.add_argument("--requests", type=int, default=50, help="requests per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # The app reads its directories from the environment at import time
+    workdir = tempfile.mkdtemp(prefix="bench_cache_")
+    os.environ["ANALYSIS_DIRECTORY"] = os.path.join(workdir, "analysis_results")
+    os.environ["UPLOAD_DIRECTORY"] = os.path.join(workdir, "uploads")
+    from fastapi.testclient import TestClient
+    from cache import analysis_cache
+    import main as api
+
+    video_id = "bench-analysis"
+    write_analysis(video_id, args.frames, args.seed)
+    url = f"/videos/{video_id}/analysis"
+    client = TestClient(api.app)
+
+    cold = time_requests(client, url, args.requests, clear=analysis_cache.clear)
+    client.get(url)
+    hot = time_requests(client, url, args.requests)
+
+    print(f"analysis of {args.frames} frames, {len(client.get(url).content) / 1e6:.1f} MB response")
+    for name, samples in (("cold", cold), ("hot", hot)):
+        print(
+            f"{name:<5} p50 {percentile(samples, 50):8.2f} ms  p95 {percentile(samples, 95):8.2f} ms  "
+            f"mean {statistics.mean(samples):8.2f} ms"
+        )
+    print(f"speedup (p50): {percentile(cold, 50) / max(percentile(hot, 50), 1e-9):.1f}x")
+    print(f"cache: {analysis_cache.stats()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
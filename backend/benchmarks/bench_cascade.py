@@ -0,0 +1,115 @@
+"""
+Speed and landmark agreement of the Pose model cascade.
+
+    python -m benchmarks.bench_cascade clip1.mp4 [clip2.mp4 ...] [--max-frames 600]
+        [--lite 0] [--heavy 2] [--threshold 0.5]
+
+Every clip is decoded once and run through the lite model alone, the heavy
+model alone and the cascade. The heavy model is the reference: agreement is
+reported as the share of frames where both found (or both missed) a person,
+the mean distance of the hips and ankles in normalized image units and
+PCK@0.05, the share of those landmarks within 0.05 of the heavy result.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from analysis import CASCADE_LANDMARKS, CascadePose, create_pose
+from landmarks import pose_landmarks_array
+
+def decode_clip(video_path: str, max_frames: int) -> list:
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames
+
+def run(pose, frames: list) -> tuple:
+    """Landmarks per frame (None without a detection) and the seconds it took."""
+    landmarks = []
+    started = time.perf_counter()
+    for frame in frames:
+        landmarks.append(pose_landmarks_array(pose.process(frame)))
+    return landmarks, time.perf_counter() - started
+
+def agreement(landmarks: list, reference: list) -> dict:
+    same_detection = sum((a is None) == (b is None) for a, b in zip(landmarks, reference))
+    both = [(a, b) for a, b in zip(landmarks, reference) if a is not None and b is not None]
+    if both:
+        keys = list(CASCADE_LANDMARKS)
+        distances = np.concatenate([
+            np.linalg.norm(a[keys, :2] - b[keys, :2], axis=1) for a, b in both
+        ])
+        mean_error, pck = float(distances.mean()), float((distances < 0.05).mean() * 100)
+    else:
+        mean_error, pck = float("nan"), float("nan")
+    return {
+        "detection_agreement": same_detection / len(reference) * 100 if reference else 0.0,
+        "mean_error": mean_error,
+        "pck": pck,
+    }
+
+def bench_clip(video_path: str, args):
+    frames = decode_clip(video_path, args.max_frames)
+    if not frames:
+        print(f"{video_path}: no frames could be read")
+        return
+    print(f"{video_path}: {len(frames)} frames, {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    heavy = create_pose(args.heavy)
+    try:
+        reference, heavy_seconds = run(heavy, frames)
+    finally:
+        heavy.close()
+    lite = create_pose(args.lite)
+    try:
+        lite_landmarks, lite_seconds = run(lite, frames)
+    finally:
+        lite.close()
+    cascade = CascadePose(
+        create_pose(args.lite), create_pose(args.heavy, static_image_mode=True), args.threshold,
+        lite_complexity=args.lite, heavy_complexity=args.heavy
+    )
+    try:
+        cascade_landmarks, cascade_seconds = run(cascade, frames)
+        stats = cascade.stats()
+    finally:
+        cascade.close()
+
+    print(f"{'model':<16} {'fps':>8} {'speedup':>8} {'detected':>9} {'agree':>7} {'error':>8} {'pck@.05':>8}")
+    for label, landmarks, seconds in (
+        (f"heavy ({args.heavy})", reference, heavy_seconds),
+        (f"lite ({args.lite})", lite_landmarks, lite_seconds),
+        ("cascade", cascade_landmarks, cascade_seconds),
+    ):
+        result = agreement(landmarks, reference)
+        detected = sum(l is not None for l in landmarks) / len(frames) * 100
+        print(
+            f"{label:<16} {len(frames) / seconds:>8.1f} {heavy_seconds / seconds:>7.2f}x "
+            f"{detected:>8.1f}% {result['detection_agreement']:>6.1f}% "
+            f"{result['mean_error']:>8.4f} {result['pck']:>7.1f}%"
+        )
+    print(
+        f"cascade used the heavy model on {stats['heavy_rate'] * 100:.1f}% of frames "
+        f"(escalated {stats['escalation_rate'] * 100:.1f}%: {stats['escalations']})"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+", help="sample clips")
+    parser.add_argument("--max-frames", type=int, default=600)
+    parser.add_argument("--lite", type=int, default=0, help="model_complexity of the lite tier")
+    parser.add_argument("--heavy", type=int, default=2, help="model_complexity of the heavy tier")
+    parser.add_argument("--threshold", type=float, default=0.5, help="hip/ankle visibility that triggers escalation")
+    args = parser.parse_args()
+    for video_path in args.videos:
+        bench_clip(video_path, args)
+
+if __name__ == "__main__":
+    main()
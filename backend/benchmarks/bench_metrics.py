@@ -0,0 +1,88 @@
+"""
+Parity check and timing for the vectorized metrics engine.
+
+    python -m benchmarks.bench_metrics [--frames 86400] [--tracks 200]
+
+Compares compute_basketball_metrics against the loop implementation it
+replaced (reference_basketball_metrics in tests/metrics_reference.py) on
+random landmark tracks (gaps, low visibility, out-of-frame positions, standing
+still) and fails if any metric differs beyond rounding tolerance. The same
+tracks are fed to a MetricsAccumulator frame by frame and in random blocks,
+which must match the batch result. Then times both engines and the per-frame
+accumulator update on a full-game length track.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from landmarks import LandmarkTrack
+from metrics import MetricsAccumulator, compute_basketball_metrics
+from tests.metrics_reference import compare, random_track, reference_basketball_metrics
+
+def stream_frames(track: LandmarkTrack, width: int, height: int, fps: float) -> MetricsAccumulator:
+    accumulator = MetricsAccumulator(width, height, fps)
+    for landmarks, detected in zip(track.data, track.mask):
+        accumulator.add_frame(landmarks if detected else None)
+    return accumulator
+
+def stream_blocks(rng: np.random.Generator, track: LandmarkTrack, width: int, height: int,
+                  fps: float) -> MetricsAccumulator:
+    accumulator = MetricsAccumulator(width, height, fps)
+    hip_centers, hips_visible = track.hip_centers()
+    positions = hip_centers[hips_visible]
+    start = 0
+    while start < len(positions):
+        stop = start + int(rng.integers(1, 500))
+        accumulator.add_positions(positions[start:stop])
+        start = stop
+    return accumulator
+
+def check_parity(tracks: int, seed: int) -> int:
+    rng = np.random.default_rng(seed)
+    failures = 0
+    for i in range(tracks):
+        track = random_track(rng, int(rng.integers(0, 3000)))
+        width, height = int(rng.integers(320, 3840)), int(rng.integers(240, 2160))
+        fps = float(rng.choice([0.0, 24.0, 29.97, 30.0, 60.0]))
+        batch = compute_basketball_metrics(track, width, height, fps)
+        problems = compare(reference_basketball_metrics(track, width, height, fps), batch)
+        problems += [f"per-frame {p}" for p in compare(batch, stream_frames(track, width, height, fps).snapshot())]
+        problems += [f"blocks {p}" for p in compare(batch, stream_blocks(rng, track, width, height, fps).snapshot())]
+        if problems:
+            failures += 1
+            print(f"track {i} ({len(track)} frames, {width}x{height} @ {fps}fps): " + "; ".join(problems))
+    print(f"parity: {tracks - failures}/{tracks} tracks match")
+    return failures
+
+def time_engines(frames: int, seed: int):
+    track = random_track(np.random.default_rng(seed), frames)
+    for name, engine in (("reference", reference_basketball_metrics), ("vectorized", compute_basketball_metrics)):
+        started = time.perf_counter()
+        engine(track, 1920, 1080, 30.0)
+        print(f"{name:<11} {frames} frames: {(time.perf_counter() - started) * 1000:9.1f} ms")
+    
+    started = time.perf_counter()
+    accumulator = stream_frames(track, 1920, 1080, 30.0)
+    elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    accumulator.snapshot()
+    print(
+        f"streaming   {frames} frames: {elapsed * 1000:9.1f} ms "
+        f"({elapsed * 1e6 / frames:.2f} us per frame, snapshot {(time.perf_counter() - started) * 1e6:.0f} us)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=48 * 60 * 30, help="frames in the timing track")
+    parser.add_argument("--tracks", type=int, default=200, help="random tracks for the parity check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    failures = check_parity(args.tracks, args.seed)
+    time_engines(args.frames, args.seed)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
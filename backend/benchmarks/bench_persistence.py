@@ -0,0 +1,133 @@
+"""
+Writing the sessions and player_stats rows of a finished analysis: one bulk
+transaction against one ORM flush and commit per row.
+
+    python -m benchmarks.bench_persistence [--players 10] [--minutes 48] [--jobs 20]
+        [--url sqlite:///stats.sqlite3]
+
+Writes synthetic landmark files of `--players` tracked players over
+`--minutes` of 30 fps video and builds their rows once, then writes them
+`--jobs` times with each method. Reports the rows, the statements sent to
+the database (an executemany counts once) and the write time per job.
+Without --url a temporary SQLite file is used; any SQLAlchemy URL with the
+tables of database.py works.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+FPS = 30.0
+
+def write_players(video_id: str, players: int, frames: int, seed: int) -> list:
+    from landmarks import LEFT_HIP, RIGHT_HIP
+    from storage import LandmarkWriter, landmarks_path, player_landmarks_path
+
+    rng = np.random.default_rng(seed)
+    entries = []
+    for player in range(players):
+        # A random walk of the hips, seen 80% of the time
+        data = np.full((frames, 33, 4), np.nan, dtype=np.float32)
+        walk = np.clip(0.5 + np.cumsum(rng.normal(0, 0.002, (frames, 2)), axis=0), 0, 1)
+        seen = rng.random(frames) < 0.8
+        for hip in (LEFT_HIP, RIGHT_HIP):
+            data[seen, hip, :2] = walk[seen]
+            data[seen, hip, 3] = 0.9
+        path = landmarks_path(video_id) if player == 0 else player_landmarks_path(video_id, player)
+        with LandmarkWriter(path) as writer:
+            writer.write_frames(data)
+        entries.append({"player": player, "landmarks_file": os.path.basename(path), "path": path})
+    return entries
+
+def make_result(video_id: str, entries: list, frames: int):
+    from analysis import AnalysisResult
+    from metrics import compute_metrics_from_positions, empty_basketball_metrics
+    from persistence import _hip_centers
+
+    players = []
+    for entry in entries:
+        _, centers, visible = _hip_centers(entry["path"], 1)
+        metrics = compute_metrics_from_positions(centers[visible], 1280, 720, FPS)
+        players.append({"player": entry["player"], "landmarks_file": entry["landmarks_file"],
+                        "basketball_metrics": metrics.dict()})
+    return AnalysisResult(
+        video_id=video_id, status="completed", total_frames=frames, processed_frames=frames,
+        landmarks_path=entries[0]["path"], basketball_metrics=empty_basketball_metrics(),
+        analysis_metadata={
+            "fps": FPS, "frame_stride": 1, "analysis_duration": frames / FPS,
+            "court_dimensions": {"width": 1280, "height": 720}, "players": players,
+        },
+    )
+
+def write_per_row(engine, session_row: dict, stats: list):
+    """The baseline: ORM objects added and committed one at a time."""
+    from sqlalchemy.orm import sessionmaker
+    from database import PlayerStats, Session
+
+    db = sessionmaker(bind=engine)()
+    try:
+        db.query(PlayerStats).filter(PlayerStats.session_id == session_row["id"]).delete()
+        db.query(Session).filter(Session.id == session_row["id"]).delete()
+        db.commit()
+        db.add(Session(**session_row))
+        db.commit()
+        for row in stats:
+            db.add(PlayerStats(**row))
+            db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--minutes", type=float, default=48)
+    parser.add_argument("--jobs", type=int, default=20, help="analyses persisted per method")
+    parser.add_argument("--url", help="SQLAlchemy database URL; a temporary SQLite file by default")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # database.py and storage read their settings from the environment at import time
+    workdir = tempfile.mkdtemp(prefix="bench_persistence_")
+    os.environ["ANALYSIS_DIRECTORY"] = os.path.join(workdir, "analysis_results")
+    os.environ["DATABASE_URL"] = args.url or f"sqlite:///{os.path.join(workdir, 'stats.sqlite3')}"
+    os.makedirs(os.environ["ANALYSIS_DIRECTORY"])
+    from sqlalchemy import event
+    from database import Base, engine
+    from persistence import analysis_rows, write_rows
+
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *_: statements.append(1))
+
+    video_id = "bench-persistence"
+    frames = int(args.minutes * 60 * FPS)
+    result = make_result(video_id, write_players(video_id, args.players, frames, args.seed), frames)
+    started = time.perf_counter()
+    session_row, stats = analysis_rows(result, os.path.join(workdir, "bench.mp4"))
+    print(
+        f"{args.players} players, {args.minutes:g} min of video: {1 + len(stats)} rows per job "
+        f"({engine.url.get_backend_name()}), built in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+
+    methods = (("bulk", lambda: write_rows(engine, session_row, stats)),
+               ("per-row", lambda: write_per_row(engine, session_row, stats)))
+    for name, persist in methods:
+        persist()
+        statements.clear()
+        samples = []
+        for _ in range(args.jobs):
+            started = time.perf_counter()
+            persist()
+            samples.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{name:<8} {len(statements) / args.jobs:7.1f} statements/job  "
+            f"mean {statistics.mean(samples):8.2f} ms  max {max(samples):8.2f} ms"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
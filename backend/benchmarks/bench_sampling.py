@@ -0,0 +1,122 @@
+"""
+Throughput vs. accuracy benchmark for analysis sampling profiles.
+
+    python -m benchmarks.bench_sampling path/to/video.mp4
+    python -m benchmarks.bench_sampling --from-analysis analysis_results/<id>_summary.json
+
+The first form runs pose inference once per profile and compares the metrics
+of every profile to the full-rate, full-resolution run. The second form replays
+an existing full-rate landmark track through each frame stride, which isolates
+the metric error caused by sampling without re-running inference.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from analysis import calculate_basketball_metrics_from_pose, create_pose, run_pose_analysis
+from landmarks import LandmarkTrack
+from schemas import AnalysisProfile
+from storage import read_landmarks
+
+NUMERIC_METRICS = [
+    "total_distance_covered",
+    "average_speed",
+    "max_speed",
+    "high_intensity_sprints",
+    "court_coverage_percentage",
+    "movement_efficiency",
+    "paint_time_percentage",
+    "acceleration_events",
+    "direction_changes",
+]
+
+def relative_errors(metrics, reference) -> dict:
+    errors = {}
+    for name in NUMERIC_METRICS:
+        ref = float(getattr(reference, name))
+        value = float(getattr(metrics, name))
+        if ref == value:
+            errors[name] = 0.0
+        elif ref:
+            errors[name] = abs(value - ref) / abs(ref) * 100
+        else:
+            errors[name] = float("inf")
+    return errors
+
+def print_row(label: str, seconds: float, speedup: float, errors: dict):
+    worst = max(errors.values()) if errors else 0.0
+    summary = ", ".join(f"{name}={error:.1f}%" for name, error in errors.items() if error > 0)
+    print(f"{label:<24} {seconds:>9.2f}s {speedup:>7.2f}x  worst={worst:6.1f}%  {summary}")
+
+def bench_video(video_path: str, strides, sizes):
+    profiles = [AnalysisProfile(frame_stride=1)]
+    profiles += [
+        AnalysisProfile(frame_stride=stride, max_inference_size=size or None)
+        for stride in strides for size in sizes
+        if not (stride == 1 and not size)
+    ]
+    
+    output_path = os.path.join(tempfile.mkdtemp(), "benchmark.landmarks.f32")
+    reference = None
+    reference_seconds = None
+    print(f"{'profile':<24} {'time':>10} {'speedup':>8}  metric error vs. full rate")
+    for profile in profiles:
+        pose = create_pose()
+        try:
+            started = time.perf_counter()
+            result = run_pose_analysis(video_path, "benchmark", pose, profile, output_path)
+            seconds = time.perf_counter() - started
+        finally:
+            pose.close()
+        if reference is None:
+            reference, reference_seconds = result.basketball_metrics, seconds
+        label = f"stride={profile.frame_stride} size={profile.max_inference_size or 'full'}"
+        frames = result.total_frames or 1
+        print_row(label, seconds, reference_seconds / seconds if seconds else 0.0,
+                  relative_errors(result.basketball_metrics, reference))
+        print(f"{'':<24} {frames / seconds if seconds else 0.0:>9.1f} video fps")
+
+def bench_track(analysis_path: str, strides):
+    with open(analysis_path) as f:
+        analysis = json.load(f)
+    width = analysis["analysis_metadata"]["court_dimensions"]["width"]
+    height = analysis["analysis_metadata"]["court_dimensions"]["height"]
+    fps = analysis["analysis_metadata"]["fps"]
+    if "landmarks" in analysis:
+        landmarks = read_landmarks(os.path.join(os.path.dirname(analysis_path), analysis["landmarks"]["file"]))
+    else:
+        # Analysis from before the columnar format
+        landmarks = LandmarkTrack.from_list(analysis["pose_landmarks"])
+    
+    reference = calculate_basketball_metrics_from_pose(landmarks, width, height, fps)
+    print(f"{'profile':<24} {'time':>10} {'speedup':>8}  metric error vs. full rate")
+    for stride in strides:
+        started = time.perf_counter()
+        metrics = calculate_basketball_metrics_from_pose(
+            landmarks.take(range(0, len(landmarks), stride)), width, height, fps / stride
+        )
+        seconds = time.perf_counter() - started
+        # Inference cost scales with the number of analyzed frames
+        print_row(f"stride={stride}", seconds, float(stride), relative_errors(metrics, reference))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", help="video file to analyze with every profile")
+    parser.add_argument("--from-analysis", help="full-rate analysis summary (or legacy analysis JSON) to resample")
+    parser.add_argument("--strides", default="1,2,3,4", help="comma separated frame strides")
+    parser.add_argument("--sizes", default="0,960,640", help="comma separated max inference sizes, 0 = full")
+    args = parser.parse_args()
+    
+    strides = [int(value) for value in args.strides.split(",")]
+    sizes = [int(value) for value in args.sizes.split(",")]
+    if args.from_analysis:
+        bench_track(args.from_analysis, strides)
+    elif args.video:
+        bench_video(args.video, strides, sizes)
+    else:
+        parser.error("pass a video file or --from-analysis")
+
+if __name__ == "__main__":
+    main()
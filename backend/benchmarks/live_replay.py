@@ -0,0 +1,112 @@
+"""
+Replays a local video into the live ingest endpoint at real-time speed.
+
+    python -m benchmarks.live_replay video.mp4 [--url ws://localhost:8000/live/ws]
+        [--streams 1] [--max-frames 900] [--quality 80] [--fps 30]
+
+Every stream opens its own connection and sends the video's frames as JPEGs
+paced at the video frame rate (or --fps). Reports per stream the end-to-end
+latency percentiles (frame sent -> landmarks received), the sustained rate of
+answered frames and how many frames the server dropped.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+import websockets
+
+from live import FRAME_HEADER
+
+def encode_frames(video_path: str, max_frames: int, quality: int):
+    """JPEG-encodes the frames up front so encoding does not distort the pacing."""
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while len(frames) < max_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    cap.release()
+    return frames, fps
+
+async def replay(url: str, frames: list, fps: float) -> dict:
+    sent_at = {}
+    latencies = []
+    summary = {}
+    async with websockets.connect(url, max_size=None) as websocket:
+        ready = json.loads(await websocket.recv())
+        if ready.get("type") != "ready":
+            raise RuntimeError(f"Unexpected first message: {ready}")
+
+        async def send():
+            started = time.perf_counter()
+            for sequence, payload in enumerate(frames):
+                # Real-time pacing: frame i leaves at i / fps
+                delay = started + sequence / fps - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                captured_at = time.time()
+                sent_at[sequence] = time.perf_counter()
+                await websocket.send(FRAME_HEADER.pack(sequence, captured_at) + payload)
+            await websocket.send(json.dumps({"type": "end"}))
+
+        sender = asyncio.create_task(send())
+        first_answer = last_answer = None
+        async for raw in websocket:
+            message = json.loads(raw)
+            if message["type"] == "frame":
+                now = time.perf_counter()
+                latencies.append((now - sent_at[message["seq"]]) * 1000)
+                first_answer = first_answer or now
+                last_answer = now
+            elif message["type"] == "summary":
+                summary = message
+                break
+        await sender
+
+    duration = (last_answer - first_answer) if first_answer and last_answer else 0.0
+    return {
+        "sent": len(frames),
+        "answered": len(latencies),
+        "dropped": summary.get("frames_late", 0) + summary.get("frames_superseded", 0),
+        "p50": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        "p99": float(np.percentile(latencies, 99)) if latencies else 0.0,
+        "fps": (len(latencies) - 1) / duration if duration > 0 else 0.0,
+    }
+
+async def run(args) -> int:
+    frames, video_fps = encode_frames(args.video, args.max_frames, args.quality)
+    if not frames:
+        print(f"No frames could be read from {args.video}")
+        return 1
+    fps = args.fps or video_fps
+    print(f"replaying {len(frames)} frames at {fps:.1f} fps on {args.streams} stream(s)")
+
+    results = await asyncio.gather(*(replay(args.url, frames, fps) for _ in range(args.streams)))
+    for stream, result in enumerate(results):
+        print(
+            f"stream {stream}: answered {result['answered']}/{result['sent']} "
+            f"(dropped {result['dropped']})  latency p50 {result['p50']:.1f} ms  "
+            f"p95 {result['p95']:.1f} ms  p99 {result['p99']:.1f} ms  sustained {result['fps']:.1f} fps"
+        )
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="video file to replay")
+    parser.add_argument("--url", default="ws://localhost:8000/live/ws")
+    parser.add_argument("--streams", type=int, default=1, help="concurrent connections")
+    parser.add_argument("--max-frames", type=int, default=900)
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    parser.add_argument("--fps", type=float, default=None, help="send rate; defaults to the video frame rate")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
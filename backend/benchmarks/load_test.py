@@ -0,0 +1,186 @@
+"""
+Concurrent load test of the HTTP API with mixed upload, status and analysis traffic.
+
+    python -m benchmarks.load_test [--url http://localhost:8000] [--concurrency 50]
+        [--duration 30] [--mix status=70,analysis=20,upload=5,summary=5] [--video clip.mp4]
+    python -m benchmarks.load_test --serve [--workers 2] ...
+
+Clients run concurrently in one event loop, each sending one request after
+the other with the request type drawn from --mix. Status and analysis
+requests target videos uploaded during a warm-up phase (and by the upload
+traffic), so analyses are both running and finished while the load runs.
+--serve starts a server on a free port with temporary upload and analysis
+directories instead of using --url.
+
+Reports per request type and overall: p50, p95 and p99 latency, requests per
+second and error counts. Without --video a short synthetic clip is generated;
+uploads of identical content reuse their analysis, so every upload gets a
+few random bytes appended to stay unique.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.suite import make_video
+
+def percentile(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {"status", "analysis", "summary", "upload"}
+    if unknown:
+        raise ValueError(f"Unknown request types: {', '.join(sorted(unknown))}")
+    return weights
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, video: bytes, mix: dict):
+        self.client = client
+        self.video = video
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.video_ids = []
+        self.latencies = {kind: [] for kind in self.kinds}
+        self.errors = {kind: 0 for kind in self.kinds}
+
+    async def upload(self) -> httpx.Response:
+        # Random trailing bytes keep the content unique, so every upload is analyzed
+        content = self.video + os.urandom(16)
+        response = await self.client.post(
+            "/videos/upload", files={"file": ("load.mp4", content, "video/mp4")}
+        )
+        if response.status_code == 200:
+            self.video_ids.append(response.json()["video_id"])
+        return response
+
+    async def request(self, kind: str) -> httpx.Response:
+        if kind == "upload" or not self.video_ids:
+            return await self.upload()
+        video_id = random.choice(self.video_ids)
+        if kind == "status":
+            return await self.client.get(f"/videos/{video_id}/status")
+        if kind == "summary":
+            return await self.client.get(f"/videos/{video_id}/summary")
+        return await self.client.get(f"/videos/{video_id}/analysis")
+
+    async def worker(self, deadline: float):
+        while time.perf_counter() < deadline:
+            kind = random.choices(self.kinds, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self.request(kind)
+                # 404 is expected for analyses still running; 429 when the queue is full
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                failed = True
+            self.latencies[kind].append(time.perf_counter() - started)
+            if failed:
+                self.errors[kind] += 1
+
+    async def run(self, concurrency: int, duration: float) -> float:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(self.worker(deadline) for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+def print_report(test: LoadTest, seconds: float):
+    print(f"{'request':<10} {'count':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    rows = [(kind, test.latencies[kind], test.errors[kind]) for kind in test.kinds]
+    rows.append(("all", [l for kind in test.kinds for l in test.latencies[kind]], sum(test.errors.values())))
+    for name, samples, errors in rows:
+        ms = [s * 1000 for s in samples]
+        print(
+            f"{name:<10} {len(ms):>7} {len(ms) / seconds:>8.1f} {percentile(ms, 50):>8.1f} "
+            f"{percentile(ms, 95):>8.1f} {percentile(ms, 99):>8.1f} {max(ms, default=0):>8.1f} {errors:>7}"
+        )
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workdir: str, workers: int) -> tuple:
+    port = free_port()
+    env = {
+        **os.environ,
+        "UPLOAD_DIRECTORY": os.path.join(workdir, "uploads"),
+        "ANALYSIS_DIRECTORY": os.path.join(workdir, "analysis_results"),
+        "JOB_REGISTRY_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "ANALYSIS_WORKERS": str(workers),
+    }
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+async def run_load_test(url: str, video: bytes, args) -> tuple:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        test = LoadTest(client, video, parse_mix(args.mix))
+        for _ in range(args.warmup_uploads):
+            await test.upload()
+        return test, await test.run(args.concurrency, args.duration)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--serve", action="store_true", help="start a server with temporary storage")
+    parser.add_argument("--workers", type=int, default=2, help="ANALYSIS_WORKERS of the --serve server")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--mix", default="status=70,analysis=20,upload=5,summary=5",
+                        help="relative weights of the request types")
+    parser.add_argument("--warmup-uploads", type=int, default=3)
+    parser.add_argument("--video", help="clip to upload; a synthetic one by default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.video:
+            with open(args.video, "rb") as f:
+                video = f.read()
+        else:
+            path = os.path.join(workdir, "load.mp4")
+            make_video(path, 320, 240, 60)
+            with open(path, "rb") as f:
+                video = f.read()
+
+        process = None
+        url = args.url
+        if args.serve:
+            process, url = start_server(workdir, args.workers)
+        try:
+            test, seconds = asyncio.run(run_load_test(url, video, args))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    print(f"{args.concurrency} clients for {seconds:.1f}s against {url}")
+    print_report(test, seconds)
+
+if __name__ == "__main__":
+    main()
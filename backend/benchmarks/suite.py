@@ -0,0 +1,319 @@
+"""
+Offline benchmark suite for the analysis pipeline.
+
+    python -m benchmarks.suite [--quick] [--no-inference] [--repeat 3] [--output results.json]
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json [--tolerance 0.15] [--rss-tolerance 0.25]
+
+Generates its fixtures in a temporary directory and needs no network:
+synthetic videos of several lengths and resolutions (a figure moving over a
+court-colored background) and random landmark tracks of several lengths.
+
+Phases timed per video: decode, BGR->RGB conversion, and the full pose
+analysis (run_pose_analysis with the bundled Pose model) with its busy time
+per pipeline stage. Phases timed per landmark track: metrics, writing the
+analysis (landmark file and summary), reading it back as a VideoAnalysis
+dict, and GET /videos/{id}/analysis with a cold and a hot response cache.
+
+Every phase records frames per second and the peak RSS of the process
+while it ran. The best of --repeat runs is kept. --compare flags phases
+whose throughput dropped by more than --tolerance or whose peak RSS grew
+by more than --rss-tolerance against the baseline, and exits with status 1
+when any did. Baselines are machine specific; compare on the machine that
+recorded them.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+VIDEO_FIXTURES = [(320, 240, 150), (640, 360, 300), (1280, 720, 300)]
+TRACK_FIXTURES = [900, 9000, 27000]
+QUICK_VIDEO_FIXTURES = [(320, 240, 60)]
+QUICK_TRACK_FIXTURES = [900]
+
+def current_rss() -> int:
+    """Resident set size in bytes (Linux), or the peak so far elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class RssSampler:
+    """Samples the RSS in a background thread to find the peak of one phase."""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+def record(results: dict, name: str, frames: int, seconds: float, peak_rss: int, **extra):
+    """Keeps the fastest run of a phase."""
+    entry = {
+        "frames": frames,
+        "seconds": round(seconds, 6),
+        "fps": round(frames / seconds, 2) if seconds > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+        **extra,
+    }
+    previous = results.get(name)
+    if previous is None or entry["seconds"] < previous["seconds"]:
+        results[name] = entry
+
+def make_video(path: str, width: int, height: int, frames: int):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (width, height))
+    scale = height / 240
+    for i in range(frames):
+        frame = np.full((height, width, 3), (40, 90, 160), dtype=np.uint8)
+        x = int((0.1 + 0.8 * (0.5 + 0.5 * np.sin(i / 25))) * width)
+        y = int(height * 0.55)
+        # Stick figure: head, torso, arms and legs
+        cv2.circle(frame, (x, int(y - 60 * scale)), int(10 * scale), (220, 200, 180), -1)
+        cv2.line(frame, (x, int(y - 50 * scale)), (x, y), (30, 30, 200), int(8 * scale))
+        swing = int(15 * scale * np.sin(i / 4))
+        cv2.line(frame, (x, int(y - 40 * scale)), (x - 20 - swing, int(y - 15 * scale)), (220, 200, 180), int(4 * scale))
+        cv2.line(frame, (x, int(y - 40 * scale)), (x + 20 + swing, int(y - 15 * scale)), (220, 200, 180), int(4 * scale))
+        cv2.line(frame, (x, y), (x - swing, int(y + 50 * scale)), (20, 20, 20), int(6 * scale))
+        cv2.line(frame, (x, y), (x + swing, int(y + 50 * scale)), (20, 20, 20), int(6 * scale))
+        writer.write(frame)
+    writer.release()
+
+def make_track(frames: int, seed: int) -> np.ndarray:
+    """(frames, 33, 4) landmarks of a random walk with NaN for undetected frames."""
+    from landmarks import LEFT_HIP, RIGHT_HIP
+    rng = np.random.default_rng(seed)
+    data = rng.random((frames, 33, 4)).astype(np.float32)
+    positions = 0.5 + np.cumsum(rng.normal(0, 0.005, size=(frames, 2)), axis=0)
+    data[:, LEFT_HIP, :2] = positions - 0.02
+    data[:, RIGHT_HIP, :2] = positions + 0.02
+    data[:, :, 3] = rng.uniform(0.4, 1.0, size=(frames, 1))
+    data[rng.random(frames) < 0.15] = np.nan
+    return data
+
+def bench_video(results: dict, workdir: str, width: int, height: int, frames: int, inference: bool):
+    from analysis import create_pose, run_pose_analysis
+    from schemas import AnalysisProfile
+
+    label = f"video/{width}x{height}x{frames}"
+    path = os.path.join(workdir, f"{width}x{height}x{frames}.mp4")
+    if not os.path.exists(path):
+        make_video(path, width, height, frames)
+
+    # Decode and conversion in one pass, timed separately
+    cap = cv2.VideoCapture(path)
+    decode_seconds = convert_seconds = 0.0
+    decoded = 0
+    rgb = None
+    with RssSampler() as sampler:
+        while True:
+            started = time.perf_counter()
+            success, frame = cap.read()
+            decode_seconds += time.perf_counter() - started
+            if not success:
+                break
+            started = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+            convert_seconds += time.perf_counter() - started
+            decoded += 1
+    cap.release()
+    record(results, f"{label}/decode", decoded, decode_seconds, sampler.peak)
+    record(results, f"{label}/convert", decoded, convert_seconds, sampler.peak)
+
+    if not inference:
+        return
+    pose = create_pose()
+    try:
+        with RssSampler() as sampler:
+            started = time.perf_counter()
+            result = run_pose_analysis(
+                path, "bench-video", pose, AnalysisProfile(frame_stride=1),
+                output_path=os.path.join(workdir, "bench-video.landmarks.f32")
+            )
+            seconds = time.perf_counter() - started
+    finally:
+        pose.close()
+    stages = result.analysis_metadata["stage_timings"]["stages"]
+    record(
+        results, f"{label}/analysis", result.total_frames, seconds, sampler.peak,
+        inference_ms_per_frame=stages["inference"]["ms_per_frame"],
+        bottleneck=result.analysis_metadata["stage_timings"]["bottleneck"],
+    )
+
+def bench_track(results: dict, client, frames: int, seed: int):
+    from analysis import AnalysisResult, calculate_basketball_metrics_from_pose, save_video_analysis
+    from cache import analysis_cache
+    from landmarks import LandmarkTrack
+    from storage import LandmarkWriter, landmarks_path, load_analysis_dict
+
+    label = f"track/{frames}"
+    video_id = f"bench-track-{frames}"
+    data = make_track(frames, seed)
+    track = LandmarkTrack(np.nan_to_num(data), ~np.isnan(data[:, 0, 0]))
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        metrics = calculate_basketball_metrics_from_pose(track, 1920, 1080, 30.0)
+        seconds = time.perf_counter() - started
+    record(results, f"{label}/metrics", frames, seconds, sampler.peak)
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        with LandmarkWriter(landmarks_path(video_id)) as writer:
+            writer.write_frames(data)
+        save_video_analysis(AnalysisResult(
+            video_id, "completed", frames, track.detected_count, landmarks_path(video_id), metrics,
+            {"fps": 30.0, "court_dimensions": {"width": 1920, "height": 1080}}
+        ))
+        seconds = time.perf_counter() - started
+    record(results, f"{label}/write", frames, seconds, sampler.peak)
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        load_analysis_dict(video_id)
+        seconds = time.perf_counter() - started
+    record(results, f"{label}/read", frames, seconds, sampler.peak)
+
+    url = f"/videos/{video_id}/analysis"
+    for mode in ("cold", "hot"):
+        if mode == "cold":
+            analysis_cache.clear()
+        else:
+            client.get(url)  # make sure the response is cached
+        with RssSampler() as sampler:
+            started = time.perf_counter()
+            response = client.get(url)
+            seconds = time.perf_counter() - started
+        if response.status_code != 200:
+            raise SystemExit(f"GET {url} returned {response.status_code}")
+        record(results, f"{label}/response_{mode}", frames, seconds, sampler.peak,
+               response_bytes=len(response.content))
+
+def run_suite(args) -> dict:
+    # The app reads its directories from the environment at import time
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    os.environ["ANALYSIS_DIRECTORY"] = os.path.join(workdir, "analysis_results")
+    os.environ["UPLOAD_DIRECTORY"] = os.path.join(workdir, "uploads")
+    from fastapi.testclient import TestClient
+    import main as api
+
+    video_fixtures = QUICK_VIDEO_FIXTURES if args.quick else VIDEO_FIXTURES
+    track_fixtures = QUICK_TRACK_FIXTURES if args.quick else TRACK_FIXTURES
+    client = TestClient(api.app)
+    results = {}
+    for run in range(args.repeat):
+        for width, height, frames in video_fixtures:
+            bench_video(results, workdir, width, height, frames, not args.no_inference)
+        for frames in track_fixtures:
+            bench_track(results, client, frames, seed=frames)
+        print(f"run {run + 1}/{args.repeat} done", file=sys.stderr)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+def print_results(report: dict):
+    print(f"{'phase':<36} {'frames':>7} {'seconds':>9} {'fps':>11} {'peak RSS':>9}")
+    for name, entry in report["results"].items():
+        print(
+            f"{name:<36} {entry['frames']:>7} {entry['seconds']:>9.4f} "
+            f"{entry['fps']:>11.1f} {entry['peak_rss_mb']:>7.1f}MB"
+        )
+
+def compare(report: dict, baseline: dict, tolerance: float, rss_tolerance: float) -> list:
+    """Phases slower or bigger than the baseline beyond the tolerances."""
+    regressions = []
+    print(f"\n{'phase':<36} {'fps':>11} {'baseline':>11} {'change':>8} {'RSS change':>11}")
+    for name, entry in report["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            print(f"{name:<36} {entry['fps']:>11.1f} {'(new)':>11}")
+            continue
+        fps_change = entry["fps"] / reference["fps"] - 1 if reference["fps"] else 0.0
+        rss_change = (
+            entry["peak_rss_mb"] / reference["peak_rss_mb"] - 1 if reference["peak_rss_mb"] else 0.0
+        )
+        flags = []
+        if fps_change < -tolerance:
+            flags.append("SLOWER")
+        if rss_change > rss_tolerance:
+            flags.append("MORE MEMORY")
+        print(
+            f"{name:<36} {entry['fps']:>11.1f} {reference['fps']:>11.1f} "
+            f"{fps_change * 100:>+7.1f}% {rss_change * 100:>+10.1f}%  {' '.join(flags)}"
+        )
+        if flags:
+            regressions.append((name, flags))
+    for name in baseline["results"]:
+        if name not in report["results"]:
+            print(f"{name:<36} {'(missing)':>11}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="one small video and track")
+    parser.add_argument("--no-inference", action="store_true", help="skip the pose analysis phase")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per phase; the fastest is kept")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--save-baseline", help="write the results as the baseline file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed throughput drop (0.15 = 15%%)")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25, help="allowed peak RSS growth")
+    args = parser.parse_args()
+    if args.compare and not os.path.exists(args.compare):
+        parser.error(f"baseline {args.compare} not found")
+
+    report = run_suite(args)
+    print_results(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.rss_tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond tolerance")
+            return 1
+        print("\nno regressions beyond tolerance")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from config import settings
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized responses.
+
+    Entries are keyed by request and tagged with a version (e.g. the mtimes of
+    the files a response was built from); a lookup with a different version is
+    a miss and drops the stale entry. The total size of the cached bytes stays
+    below `max_bytes`, evicting the least recently used entries first.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                self._remove(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, data: bytes):
+        # Responses larger than the whole cache are never stored
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, data = self._entries.pop(key)
+        self._size -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+# Serialized GET /videos/{video_id}/analysis responses
+analysis_cache = ResponseCache(settings.ANALYSIS_CACHE_MAX_BYTES)
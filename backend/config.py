@@ -8,6 +8,15 @@ class Settings:
     
     # Database Configuration (optional, for direct access)
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+    # Connection pool of the SQLAlchemy engine, one per process (API and every analysis worker)
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+    DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", "5"))
+    DATABASE_POOL_TIMEOUT: float = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+    DATABASE_POOL_PRE_PING: bool = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DATABASE_POOL_RECYCLE: int = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))  # seconds; -1 keeps connections forever
+    # Finished analyses are written to the sessions and player_stats tables when DATABASE_URL is set
+    PERSIST_ANALYSIS_STATS: bool = os.getenv("PERSIST_ANALYSIS_STATS", "true").lower() in ("1", "true", "yes")
+    STATS_SAMPLE_INTERVAL: float = float(os.getenv("STATS_SAMPLE_INTERVAL", "60"))  # seconds of video per stats sample
     
     # JWT Configuration
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-jwt-secret-key")
@@ -28,12 +37,99 @@ class Settings:
     
     # File Upload Configuration
     MAX_FILE_SIZE: int = 2 * 1024 * 1024 * 1024  # 2GB
-    ALLOWED_VIDEO_TYPES: list = ["video/mp4", "video/mov", "video/avi", "video/mkv"]
+    ALLOWED_VIDEO_TYPES: list = [
+        "video/mp4", "video/mov", "video/avi", "video/mkv",
+        # Types browsers and mimetypes actually report for .mov, .avi and .mkv files
+        "video/quicktime", "video/x-msvideo", "video/x-matroska",
+    ]
+    UPLOAD_SESSION_CHUNK_SIZE: int = int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE", str(8 * 1024 * 1024)))  # suggested to clients
+    UPLOAD_SESSION_TTL: int = int(os.getenv("UPLOAD_SESSION_TTL", "86400"))  # seconds an idle chunked upload is kept
+    UPLOAD_SESSION_EXPIRY_INTERVAL: float = float(os.getenv("UPLOAD_SESSION_EXPIRY_INTERVAL", "3600"))  # seconds between sweeps
+    
+    # Threads for blocking request handlers and file I/O (anyio's default is 40)
+    API_THREADPOOL_SIZE: int = int(os.getenv("API_THREADPOOL_SIZE", "40"))
+    
+    # Storage Configuration
+    UPLOAD_DIRECTORY: str = os.getenv("UPLOAD_DIRECTORY", "./uploads")
+    ANALYSIS_DIRECTORY: str = os.getenv("ANALYSIS_DIRECTORY", "./analysis_results")
     
     # Video Processing Configuration
     VIDEO_PROCESSING_TIMEOUT: int = 3600  # 1 hour
     FRAME_RATE: int = 30
     
+    # Analysis Worker Pool Configuration
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+    ANALYSIS_QUEUE_SIZE: int = int(os.getenv("ANALYSIS_QUEUE_SIZE", "32"))  # jobs waiting for a worker
+    
+    # Job registry (SQLite) with per-job state and progress
+    # Outside ANALYSIS_DIRECTORY, whose files are served by /analysis/{filename}
+    JOB_REGISTRY_PATH: str = os.getenv("JOB_REGISTRY_PATH", "./data/jobs.sqlite3")
+    ANALYSIS_PROGRESS_INTERVAL: int = int(os.getenv("ANALYSIS_PROGRESS_INTERVAL", "100"))  # frames between progress updates
+    ANALYSIS_PARTIAL_METRICS_INTERVAL: float = float(os.getenv("ANALYSIS_PARTIAL_METRICS_INTERVAL", "2.0"))  # seconds
+    JOB_PROFILE_DIRECTORY: Optional[str] = os.getenv("JOB_PROFILE_DIRECTORY")  # per-job profile summaries, off when unset
+    # Each server process renews a lease on its jobs; jobs of an expired lease are resumed elsewhere
+    JOB_LEASE_INTERVAL: float = float(os.getenv("JOB_LEASE_INTERVAL", "10"))  # seconds between renewals
+    JOB_LEASE_TIMEOUT: float = float(os.getenv("JOB_LEASE_TIMEOUT", "60"))  # seconds without renewal
+    PROGRESS_STREAM_POLL_INTERVAL: float = float(os.getenv("PROGRESS_STREAM_POLL_INTERVAL", "0.5"))  # seconds
+    
+    # Landmarks analyzed so far are checkpointed so jobs resume after a restart
+    ANALYSIS_CHECKPOINT_INTERVAL: int = int(os.getenv("ANALYSIS_CHECKPOINT_INTERVAL", "900"))  # frames, ~30s at 30fps
+    
+    ANALYSIS_PIPELINE_DEPTH: int = int(os.getenv("ANALYSIS_PIPELINE_DEPTH", "4"))  # frame buffers per pipeline stage
+    
+    # Split-and-merge analysis of long videos across workers
+    ANALYSIS_SEGMENT_MIN_FRAMES: int = int(os.getenv("ANALYSIS_SEGMENT_MIN_FRAMES", "9000"))  # ~5 min at 30fps
+    ANALYSIS_SEGMENT_COUNT: int = int(os.getenv("ANALYSIS_SEGMENT_COUNT", "0"))  # 0 = one per worker
+    ANALYSIS_SEGMENT_OVERLAP: int = int(os.getenv("ANALYSIS_SEGMENT_OVERLAP", "30"))  # tracker warm-up frames
+    
+    # LRU cache of serialized analysis responses
+    ANALYSIS_CACHE_MAX_BYTES: int = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    
+    # MediaPipe Pose settings; part of every analysis fingerprint
+    POSE_MODEL_COMPLEXITY: int = int(os.getenv("POSE_MODEL_COMPLEXITY", "1"))
+    POSE_MIN_DETECTION_CONFIDENCE: float = float(os.getenv("POSE_MIN_DETECTION_CONFIDENCE", "0.5"))
+    POSE_MIN_TRACKING_CONFIDENCE: float = float(os.getenv("POSE_MIN_TRACKING_CONFIDENCE", "0.5"))
+    
+    # Model cascade: the lite model on every frame, a heavier one where the lite result is unreliable
+    POSE_CASCADE_LITE_COMPLEXITY: int = int(os.getenv("POSE_CASCADE_LITE_COMPLEXITY", "0"))
+    POSE_CASCADE_HEAVY_COMPLEXITY: int = int(os.getenv("POSE_CASCADE_HEAVY_COMPLEXITY", "2"))
+    POSE_CASCADE_VISIBILITY_THRESHOLD: float = float(os.getenv("POSE_CASCADE_VISIBILITY_THRESHOLD", "0.5"))  # hips and ankles
+    
+    # Live ingest over WebSocket
+    LIVE_MAX_SESSIONS: int = int(os.getenv("LIVE_MAX_SESSIONS", "4"))  # each holds its own Pose instance
+    LIVE_LATENCY_BUDGET_MS: float = float(os.getenv("LIVE_LATENCY_BUDGET_MS", "250"))  # older frames are dropped
+    
+    # Multi-player tracking: people detection on keyframes, Pose on per-player crops.
+    # The ROI_* settings also apply to single-player ROI inference.
+    MULTI_PLAYER_MAX_PLAYERS: int = int(os.getenv("MULTI_PLAYER_MAX_PLAYERS", "10"))
+    MULTI_PLAYER_KEYFRAME_INTERVAL: int = int(os.getenv("MULTI_PLAYER_KEYFRAME_INTERVAL", "15"))  # analyzed frames between detections
+    MULTI_PLAYER_MIN_TRACK_FRAMES: int = int(os.getenv("MULTI_PLAYER_MIN_TRACK_FRAMES", "15"))  # shorter tracks are discarded
+    ROI_PADDING: float = float(os.getenv("ROI_PADDING", "0.25"))  # crop margin around a player, fraction of the box size
+    ROI_MAX_CROP_SIZE: int = int(os.getenv("ROI_MAX_CROP_SIZE", "256"))  # longest crop side fed to Pose, in pixels
+    
+    # Default Analysis Profile (sampling)
+    ANALYSIS_FRAME_STRIDE: int = int(os.getenv("ANALYSIS_FRAME_STRIDE", "1"))
+    ANALYSIS_TARGET_FPS: Optional[float] = (
+        float(os.getenv("ANALYSIS_TARGET_FPS")) if os.getenv("ANALYSIS_TARGET_FPS") else None
+    )
+    ANALYSIS_MAX_INFERENCE_SIZE: Optional[int] = (
+        int(os.getenv("ANALYSIS_MAX_INFERENCE_SIZE")) if os.getenv("ANALYSIS_MAX_INFERENCE_SIZE") else None
+    )
+    ANALYSIS_ROI: bool = os.getenv("ANALYSIS_ROI", "false").lower() in ("1", "true", "yes")
+    ANALYSIS_POSE_CASCADE: bool = os.getenv("ANALYSIS_POSE_CASCADE", "false").lower() in ("1", "true", "yes")
+    
+    # Low-resolution, fast-start playback proxy encoded from the frames analysis decodes
+    ANALYSIS_PROXY: bool = os.getenv("ANALYSIS_PROXY", "true").lower() in ("1", "true", "yes")
+    PROXY_MAX_HEIGHT: int = int(os.getenv("PROXY_MAX_HEIGHT", "360"))  # pixels
+    # Thumbnail sprite and keyframe/timestamp index for the timeline, also from the analysis decode
+    ANALYSIS_THUMBNAILS: bool = os.getenv("ANALYSIS_THUMBNAILS", "true").lower() in ("1", "true", "yes")
+    THUMBNAIL_INTERVAL: float = float(os.getenv("THUMBNAIL_INTERVAL", "2.0"))  # seconds between thumbnails
+    THUMBNAIL_MAX_TILES: int = int(os.getenv("THUMBNAIL_MAX_TILES", "400"))  # longer videos get a longer interval
+    THUMBNAIL_WIDTH: int = int(os.getenv("THUMBNAIL_WIDTH", "160"))  # pixels
+    THUMBNAIL_COLUMNS: int = int(os.getenv("THUMBNAIL_COLUMNS", "10"))
+    THUMBNAIL_JPEG_QUALITY: int = int(os.getenv("THUMBNAIL_JPEG_QUALITY", "70"))
+    VIDEO_STREAM_CHUNK_SIZE: int = int(os.getenv("VIDEO_STREAM_CHUNK_SIZE", str(256 * 1024)))  # bytes per read when serving videos
+    
     # Basketball Court Configuration
     COURT_LENGTH: float = 28.0  # meters
     COURT_WIDTH: float = 15.0   # meters
@@ -0,0 +1,118 @@
+import os
+import shutil
+import struct
+from typing import List, Optional, Tuple
+
+# MP4 "fast start": encoders such as OpenCV's write the media data (mdat)
+# first and the index (moov) last, so a player has to fetch the end of the
+# file before it can show the first frame. Moving moov in front of mdat
+# lets playback and seeking start after the first request. Moving moov
+# shifts every chunk of media data by the size of moov, so the chunk offset
+# tables (stco, co64) of every track are rewritten.
+
+# Boxes on the path from moov to the chunk offset tables
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf"}
+
+COPY_BLOCK_SIZE = 1024 * 1024
+
+def _read_boxes(f, start: int, end: int) -> List[Tuple[bytes, int, int, int]]:
+    """(type, offset, header size, total size) of the boxes in [start, end) of a file."""
+    boxes = []
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            # The box runs to the end of the file
+            size = end - offset
+        if size < header or offset + size > end:
+            raise ValueError(f"Malformed MP4 box {box_type!r} at offset {offset}")
+        boxes.append((box_type, offset, header, size))
+        offset += size
+    return boxes
+
+def _shift_chunk_offsets(moov: bytearray, start: int, end: int, shift: int, moved: Tuple[int, int]):
+    """
+    Adds `shift` to the stco/co64 entries of the boxes in moov[start:end]
+    that point into the `moved` [start, end) byte range, in place.
+    """
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", moov, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", moov, offset + 8)[0]
+            header = 16
+        if size < header or offset + size > end:
+            raise ValueError(f"Malformed MP4 box {box_type!r} in moov")
+        if box_type in _CONTAINERS:
+            _shift_chunk_offsets(moov, offset + header, offset + size, shift, moved)
+        elif box_type in (b"stco", b"co64"):
+            # Full box: version and flags, entry count, then the offsets
+            count = struct.unpack_from(">I", moov, offset + header + 4)[0]
+            table = offset + header + 8
+            entry_format, entry_size = (">I", 4) if box_type == b"stco" else (">Q", 8)
+            for i in range(count):
+                position = table + i * entry_size
+                value = struct.unpack_from(entry_format, moov, position)[0]
+                if not moved[0] <= value < moved[1]:
+                    continue
+                value += shift
+                if box_type == b"stco" and value > 0xFFFFFFFF:
+                    raise ValueError("Chunk offsets do not fit stco once moov is moved")
+                struct.pack_into(entry_format, moov, position, value)
+        offset += size
+
+def is_fast_start(path: str) -> bool:
+    """Whether moov comes before mdat in an MP4 file."""
+    with open(path, "rb") as f:
+        types = [box[0] for box in _read_boxes(f, 0, os.fstat(f.fileno()).st_size)]
+    return b"moov" in types and b"mdat" in types and types.index(b"moov") < types.index(b"mdat")
+
+def make_fast_start(path: str, output_path: Optional[str] = None) -> bool:
+    """
+    Writes `path` with moov moved in front of the first mdat to
+    `output_path` (in place by default, through a temporary file). Returns
+    False when the file already was fast start and nothing was written.
+    Raises ValueError for files that are not MP4/QuickTime.
+    """
+    output_path = output_path or path
+    with open(path, "rb") as f:
+        boxes = _read_boxes(f, 0, os.fstat(f.fileno()).st_size)
+        types = [box[0] for box in boxes]
+        if b"moov" not in types or b"mdat" not in types:
+            raise ValueError(f"{os.path.basename(path)} has no moov or mdat box")
+        moov_index, mdat_index = types.index(b"moov"), types.index(b"mdat")
+        if moov_index < mdat_index:
+            if output_path != path:
+                shutil.copyfile(path, output_path)
+            return False
+
+        _, moov_offset, moov_header, moov_size = boxes[moov_index]
+        mdat_offset = boxes[mdat_index][1]
+        f.seek(moov_offset)
+        moov = bytearray(f.read(moov_size))
+        # Data between the first mdat and moov lands moov_size bytes later; data after moov stays put
+        _shift_chunk_offsets(moov, moov_header, moov_size, moov_size, (mdat_offset, moov_offset))
+
+        temporary_path = f"{output_path}.faststart"
+        with open(temporary_path, "wb") as out:
+            for index, (box_type, offset, _, size) in enumerate(boxes):
+                if index == moov_index:
+                    continue
+                if index == mdat_index:
+                    out.write(moov)
+                f.seek(offset)
+                remaining = size
+                while remaining:
+                    block = f.read(min(COPY_BLOCK_SIZE, remaining))
+                    if not block:
+                        raise ValueError(f"{os.path.basename(path)} is truncated")
+                    out.write(block)
+                    remaining -= len(block)
+    os.replace(temporary_path, output_path)
+    return True
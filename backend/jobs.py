@@ -0,0 +1,279 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from config import settings
+
+# Job lifecycle: queued -> running -> completed | failed; queued/running -> cancelled;
+# running -> queued when another server process claims the job to resume it from its checkpoints
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    video_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    frames_processed INTEGER NOT NULL DEFAULT 0,
+    frames_total INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL,
+    error TEXT,
+    partial_metrics TEXT,
+    video_path TEXT,
+    profile TEXT,
+    frames_resumed INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Last checkpoint of each frame range of a running job (one range, or one per segment)
+_CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    video_id TEXT NOT NULL,
+    range_start INTEGER NOT NULL,
+    range_end INTEGER,
+    frame INTEGER NOT NULL,
+    state TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (video_id, range_start)
+)
+"""
+
+# Server processes that own jobs: each renews its lease while it runs, and the
+# queued and running jobs of an owner whose lease expired can be claimed
+_LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    owner TEXT PRIMARY KEY,
+    renewed_at REAL NOT NULL
+)
+"""
+
+# Columns added after the first release of the registry
+_MIGRATIONS = [
+    "ALTER TABLE jobs ADD COLUMN partial_metrics TEXT",
+    "ALTER TABLE jobs ADD COLUMN video_path TEXT",
+    "ALTER TABLE jobs ADD COLUMN profile TEXT",
+    "ALTER TABLE jobs ADD COLUMN frames_resumed INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "ALTER TABLE jobs ADD COLUMN persistence TEXT",
+]
+
+class JobCancelled(Exception):
+    """Raised inside an analysis when its job was cancelled."""
+
+class JobRegistry:
+    """
+    Analysis jobs in a local SQLite database, shared by the API process and
+    the worker processes.
+
+    Every process and thread opens its own connection. Workers only touch the
+    registry when a job starts, every ANALYSIS_PROGRESS_INTERVAL frames,
+    at checkpoints and when it ends, and status lookups are primary-key
+    reads.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            connection.execute(_CHECKPOINT_SCHEMA)
+            connection.execute(_LEASE_SCHEMA)
+            for migration in _MIGRATIONS:
+                try:
+                    connection.execute(migration)
+                except sqlite3.OperationalError:
+                    pass  # already applied
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def create(self, video_id: str, frames_total: int = 0, video_path: Optional[str] = None,
+               profile: Optional[dict] = None, owner: Optional[str] = None):
+        """
+        Registers a queued job, replacing an earlier job of the same video.
+        The video path and profile let another server process resume it once
+        the lease of `owner` expires.
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute("DELETE FROM checkpoints WHERE video_id = ?", (video_id,))
+        connection.execute(
+            "INSERT OR REPLACE INTO jobs (video_id, status, frames_total, created_at, updated_at, "
+            "video_path, profile, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (video_id, QUEUED, frames_total, now, now, video_path,
+             json.dumps(profile) if profile is not None else None, owner),
+        )
+
+    def start(self, video_id: str):
+        """Marks a queued job as running. Raises JobCancelled if it was cancelled meanwhile."""
+        now = time.time()
+        updated = self._connection().execute(
+            "UPDATE jobs SET status = ?, started_at = ?, updated_at = ? WHERE video_id = ? AND status = ?",
+            (RUNNING, now, now, video_id, QUEUED),
+        ).rowcount
+        if not updated and self.status(video_id) == CANCELLED:
+            raise JobCancelled(video_id)
+
+    def add_progress(self, video_id: str, frames: int, partial_metrics: Optional[dict] = None):
+        """
+        Adds `frames` to the processed count; segments of one video report
+        their own increments. `partial_metrics` replaces the rolling metrics
+        when given. Raises JobCancelled if the job was cancelled.
+        """
+        connection = self._connection()
+        updated = connection.execute(
+            "UPDATE jobs SET frames_processed = frames_processed + ?, updated_at = ?, "
+            "partial_metrics = COALESCE(?, partial_metrics) WHERE video_id = ? AND status = ?",
+            (frames, time.time(), json.dumps(partial_metrics) if partial_metrics is not None else None,
+             video_id, RUNNING),
+        ).rowcount
+        if not updated and self.status(video_id) == CANCELLED:
+            raise JobCancelled(video_id)
+
+    def plan_ranges(self, video_id: str, ranges: List[tuple]):
+        """
+        Records the (start, end) frame ranges a job is analyzed in, each
+        without progress yet. Ranges that already exist keep their checkpoint.
+        """
+        now = time.time()
+        self._connection().executemany(
+            "INSERT OR IGNORE INTO checkpoints (video_id, range_start, range_end, frame, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(video_id, start, end, start, now) for start, end in ranges],
+        )
+    
+    def save_checkpoint(self, video_id: str, range_start: int, state: dict):
+        """Records how far the range starting at `range_start` got; `state` has the frame reached."""
+        self._connection().execute(
+            "UPDATE checkpoints SET frame = ?, state = ?, updated_at = ? WHERE video_id = ? AND range_start = ?",
+            (state["frame"], json.dumps(state), time.time(), video_id, range_start),
+        )
+    
+    def checkpoints(self, video_id: str) -> List[dict]:
+        """Planned ranges of a job in frame order, with the state of their last checkpoint or None."""
+        rows = self._connection().execute(
+            "SELECT range_start, range_end, frame, state FROM checkpoints WHERE video_id = ? "
+            "ORDER BY range_start",
+            (video_id,),
+        ).fetchall()
+        return [
+            {**dict(row), "state": json.loads(row["state"]) if row["state"] else None} for row in rows
+        ]
+    
+    def renew_lease(self, owner: str):
+        """Keeps the jobs of `owner` from being claimed for another JOB_LEASE_TIMEOUT seconds."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO leases (owner, renewed_at) VALUES (?, ?)", (owner, time.time())
+        )
+    
+    def claim_unfinished(self, owner: str) -> List[dict]:
+        """
+        Claims the jobs other server processes left queued or running and
+        whose lease expired, and puts them back in the queue for `owner`.
+        Frames covered up to their checkpoints count as processed but not
+        towards their throughput. One UPDATE claims them all, so of several
+        processes claiming at once each job goes to exactly one; only the
+        returned jobs belong to the caller.
+
+        Multi-player jobs save no checkpoints (their player tracks and Pose
+        instances have no resumable state), so they start again from frame 0
+        and count no processed or resumed frames.
+        """
+        now = time.time()
+        rows = self._connection().execute(
+            "UPDATE jobs SET owner = ?, status = ?, started_at = NULL, updated_at = ?, "
+            "frames_processed = (SELECT COALESCE(SUM(frame - range_start), 0) FROM checkpoints "
+            "WHERE checkpoints.video_id = jobs.video_id), "
+            "frames_resumed = (SELECT COALESCE(SUM(frame - range_start), 0) FROM checkpoints "
+            "WHERE checkpoints.video_id = jobs.video_id) "
+            "WHERE status IN (?, ?) AND (owner IS NULL OR owner NOT IN "
+            "(SELECT owner FROM leases WHERE renewed_at >= ?)) "
+            "RETURNING *",
+            (owner, QUEUED, now, QUEUED, RUNNING, now - settings.JOB_LEASE_TIMEOUT),
+        ).fetchall()
+        return sorted((dict(row) for row in rows), key=lambda row: row["created_at"])
+    
+    def _finish(self, video_id: str, status: str, error: Optional[str] = None) -> bool:
+        now = time.time()
+        connection = self._connection()
+        finished = connection.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ? "
+            "WHERE video_id = ? AND status IN (?, ?)",
+            (status, error, now, now, video_id, QUEUED, RUNNING),
+        ).rowcount > 0
+        if finished:
+            connection.execute("DELETE FROM checkpoints WHERE video_id = ?", (video_id,))
+        return finished
+
+    def complete(self, video_id: str, persistence: Optional[dict] = None):
+        """
+        Marks a running job as completed. `persistence` is what writing its
+        stats to the database returned: the rows written or the error.
+        """
+        # Container frame counts are estimates; the analyzed frames are the real total
+        self._connection().execute(
+            "UPDATE jobs SET frames_total = frames_processed, persistence = ? WHERE video_id = ? AND status = ?",
+            (json.dumps(persistence) if persistence is not None else None, video_id, RUNNING),
+        )
+        self._finish(video_id, COMPLETED)
+
+    def fail(self, video_id: str, error: str):
+        self._finish(video_id, FAILED, error)
+
+    def cancel(self, video_id: str) -> bool:
+        """Cancels a queued or running job; returns False when it already finished."""
+        return self._finish(video_id, CANCELLED)
+
+    def status(self, video_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT status FROM jobs WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        return row["status"] if row else None
+
+    def get(self, video_id: str) -> Optional[dict]:
+        """
+        Job state with throughput (frames per second since the job started),
+        the estimated seconds left and the latest partial metrics, or None
+        for unknown videos.
+        """
+        row = self._connection().execute(
+            "SELECT * FROM jobs WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["partial_metrics"] = json.loads(job["partial_metrics"]) if job["partial_metrics"] else None
+        job["profile"] = json.loads(job["profile"]) if job["profile"] else None
+        job["persistence"] = json.loads(job["persistence"]) if job["persistence"] else None
+        end = job["finished_at"] or time.time()
+        elapsed = end - job["started_at"] if job["started_at"] else 0.0
+        # Frames restored from checkpoints took no time in this run
+        fps = (job["frames_processed"] - job["frames_resumed"]) / elapsed if elapsed > 0 else 0.0
+        remaining = max(job["frames_total"] - job["frames_processed"], 0)
+        job["elapsed_seconds"] = round(elapsed, 2)
+        job["fps"] = round(fps, 2)
+        job["eta_seconds"] = round(remaining / fps, 1) if job["status"] == RUNNING and fps > 0 else None
+        job["progress"] = (
+            round(min(job["frames_processed"] / job["frames_total"], 1.0), 4) if job["frames_total"] else 0.0
+        )
+        return job
+
+job_registry = JobRegistry(settings.JOB_REGISTRY_PATH)
@@ -0,0 +1,222 @@
+import numpy as np
+from typing import List, Optional
+
+from schemas import PoseLandmark
+
+# MediaPipe Pose landmark layout
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ("x", "y", "z", "visibility")
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Both hips must be seen with more than this visibility to place a player
+HIP_VISIBILITY_THRESHOLD = 0.5
+
+# Landmark names in MediaPipe Pose order (mp.solutions.pose.PoseLandmark)
+LANDMARK_NAMES = [
+    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye",
+    "right_eye_outer", "left_ear", "right_ear", "mouth_left", "mouth_right",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow", "left_wrist", "right_wrist",
+    "left_pinky", "right_pinky", "left_index", "right_index", "left_thumb", "right_thumb",
+    "left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle",
+    "left_heel", "right_heel", "left_foot_index", "right_foot_index",
+]
+
+# Shorthands accepted wherever a landmark subset is requested
+LANDMARK_GROUPS = {
+    "shoulders": ["left_shoulder", "right_shoulder"],
+    "elbows": ["left_elbow", "right_elbow"],
+    "wrists": ["left_wrist", "right_wrist"],
+    "hips": ["left_hip", "right_hip"],
+    "knees": ["left_knee", "right_knee"],
+    "ankles": ["left_ankle", "right_ankle"],
+    "feet": ["left_heel", "right_heel", "left_foot_index", "right_foot_index"],
+}
+
+def resolve_landmark_subset(spec: Optional[str]) -> List[int]:
+    """
+    Landmark indices for a comma separated list of landmark names, group
+    names (see LANDMARK_GROUPS) or indices. All landmarks when empty.
+    Raises ValueError for unknown entries and for specs that select none.
+    """
+    if not spec:
+        return list(range(NUM_LANDMARKS))
+    indices = []
+    for item in (part.strip().lower() for part in spec.split(",")):
+        if not item:
+            continue
+        if item.isdigit() and int(item) < NUM_LANDMARKS:
+            names = [LANDMARK_NAMES[int(item)]]
+        elif item in LANDMARK_GROUPS:
+            names = LANDMARK_GROUPS[item]
+        elif item in LANDMARK_NAMES:
+            names = [item]
+        else:
+            raise ValueError(f"Unknown landmark '{item}'")
+        for name in names:
+            index = LANDMARK_NAMES.index(name)
+            if index not in indices:
+                indices.append(index)
+    if not indices:
+        raise ValueError("No landmarks selected")
+    return indices
+
+def pose_landmarks_array(results) -> Optional[np.ndarray]:
+    """(33, 4) float32 landmarks of a MediaPipe Pose result, or None without a detection."""
+    if not results.pose_landmarks:
+        return None
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in results.pose_landmarks.landmark],
+        dtype=np.float32
+    )
+
+def hip_center(landmarks: np.ndarray,
+               visibility_threshold: float = HIP_VISIBILITY_THRESHOLD) -> Optional[tuple]:
+    """(x, y) midpoint of the hips of one frame's (33, 4) landmarks, or None when a hip is not visible."""
+    left_hip, right_hip = landmarks[LEFT_HIP].tolist(), landmarks[RIGHT_HIP].tolist()
+    if left_hip[3] > visibility_threshold and right_hip[3] > visibility_threshold:
+        return (left_hip[0] + right_hip[0]) / 2, (left_hip[1] + right_hip[1]) / 2
+    return None
+
+def hip_centers(data: np.ndarray, visibility_threshold: float = HIP_VISIBILITY_THRESHOLD) -> tuple:
+    """
+    hip_center of every frame of a (frames, 33, 4) array: the (frames, 2)
+    centers and a mask of the frames where both hips are visible. NaN
+    landmarks (no detection) are never visible.
+    """
+    hips = data[:, [LEFT_HIP, RIGHT_HIP]].astype(np.float64)
+    visible = (hips[:, 0, 3] > visibility_threshold) & (hips[:, 1, 3] > visibility_threshold)
+    centers = (hips[:, 0, :2] + hips[:, 1, :2]) / 2
+    return centers, visible
+
+class LandmarkTrack:
+    """
+    Pose landmarks of a sequence of frames.
+
+    Landmarks live in one (frames, 33, 4) float32 array holding x, y, z and
+    visibility, and a boolean mask marks the frames with a detected pose.
+    Frames without a detection hold no meaningful values (zeros in memory,
+    NaN in stored files). The track grows in place like a list; Pydantic
+    PoseLandmark objects are only built by to_pydantic().
+    """
+    def __init__(self, data: Optional[np.ndarray] = None, mask: Optional[np.ndarray] = None,
+                 capacity: int = 0):
+        if data is None:
+            self._data = np.zeros((max(capacity, 0), NUM_LANDMARKS, 4), dtype=np.float32)
+            self._mask = np.zeros(max(capacity, 0), dtype=bool)
+            self._length = 0
+        else:
+            self._data = np.ascontiguousarray(data, dtype=np.float32)
+            self._mask = (
+                np.asarray(mask, dtype=bool) if mask is not None
+                else np.ones(len(self._data), dtype=bool)
+            )
+            self._length = len(self._data)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def data(self) -> np.ndarray:
+        """(frames, 33, 4) view of the landmarks."""
+        return self._data[:self._length]
+
+    @property
+    def mask(self) -> np.ndarray:
+        """(frames,) view of the detection mask."""
+        return self._mask[:self._length]
+
+    @property
+    def detected_count(self) -> int:
+        return int(self.mask.sum())
+
+    def _reserve(self, extra: int):
+        needed = self._length + extra
+        if needed <= len(self._data):
+            return
+        capacity = max(needed, 2 * len(self._data), 64)
+        data = np.zeros((capacity, NUM_LANDMARKS, 4), dtype=np.float32)
+        mask = np.zeros(capacity, dtype=bool)
+        data[:self._length] = self._data[:self._length]
+        mask[:self._length] = self._mask[:self._length]
+        self._data, self._mask = data, mask
+
+    def append(self, landmarks=None):
+        """
+        Adds one frame. `landmarks` is a (33, 4) array, a sequence of objects
+        with x/y/z/visibility attributes (MediaPipe or PoseLandmark), or None
+        when no pose was detected.
+        """
+        self._reserve(1)
+        index = self._length
+        if landmarks is None:
+            self._data[index] = 0.0
+            self._mask[index] = False
+        else:
+            if not isinstance(landmarks, np.ndarray):
+                landmarks = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks]
+            self._data[index] = landmarks
+            self._mask[index] = True
+        self._length += 1
+
+    def append_missing(self, count: int):
+        """Adds `count` frames without a detection."""
+        if count <= 0:
+            return
+        self._reserve(count)
+        self._data[self._length:self._length + count] = 0.0
+        self._mask[self._length:self._length + count] = False
+        self._length += count
+
+    def extend(self, other: "LandmarkTrack"):
+        count = len(other)
+        self._reserve(count)
+        self._data[self._length:self._length + count] = other.data
+        self._mask[self._length:self._length + count] = other.mask
+        self._length += count
+
+    def take(self, indices) -> "LandmarkTrack":
+        """New track with the frames at `indices`."""
+        indices = np.asarray(indices, dtype=np.intp)
+        return LandmarkTrack(self.data[indices], self.mask[indices])
+
+    def hip_centers(self, visibility_threshold: float = HIP_VISIBILITY_THRESHOLD):
+        """
+        Hip center (x, y) per frame and a mask of the detected frames where
+        both hips are visible above `visibility_threshold`.
+        """
+        centers, visible = hip_centers(self.data, visibility_threshold)
+        return centers, self.mask & visible
+
+    def to_list(self) -> List[Optional[list]]:
+        """JSON-ready landmarks: a list of per-landmark dicts per frame, None when undetected."""
+        rows = self.data.tolist()
+        return [
+            [dict(zip(LANDMARK_FIELDS, landmark)) for landmark in rows[i]] if detected else None
+            for i, detected in enumerate(self.mask.tolist())
+        ]
+
+    def to_pydantic(self) -> List[Optional[List[PoseLandmark]]]:
+        """PoseLandmark models per frame, for API responses."""
+        return [
+            [PoseLandmark(**landmark) for landmark in frame] if frame is not None else None
+            for frame in self.to_list()
+        ]
+
+    @classmethod
+    def from_list(cls, frames: List[Optional[list]]) -> "LandmarkTrack":
+        """
+        Builds a track from per-frame landmark lists whose entries are dicts or
+        objects with x/y/z/visibility (e.g. loaded JSON or PoseLandmark models).
+        """
+        track = cls(capacity=len(frames))
+        for frame in frames:
+            if not frame:
+                track.append(None)
+            elif isinstance(frame[0], dict):
+                track.append(np.array([[lm[field] for field in LANDMARK_FIELDS] for lm in frame], dtype=np.float32))
+            else:
+                track.append(frame)
+        return track
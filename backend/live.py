@@ -0,0 +1,215 @@
+import asyncio
+import json
+import struct
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+
+from analysis import create_pose
+from config import settings
+from landmarks import hip_center, pose_landmarks_array
+from metrics import MetricsAccumulator, empty_basketball_metrics
+
+# Live ingest protocol (WebSocket /live/ws)
+#   client -> server  binary: FRAME_HEADER + JPEG/PNG bytes of one camera frame
+#                     text:   {"type": "end"} to finish the session
+#   server -> client  {"type": "ready"} once the session's Pose is loaded,
+#                     {"type": "frame", ...} per analyzed frame,
+#                     {"type": "summary", ...} when the session ends
+FRAME_HEADER = struct.Struct("<Id")  # sequence number, capture time in seconds on the client clock
+
+# Sessions with their own Pose instance running at once
+_active_sessions = 0
+
+class LiveSession:
+    """
+    Pose and metrics state of one live connection.
+
+    Frames are analyzed one at a time with the session's own Pose instance,
+    so tracking carries over between frames. A frame whose age exceeds the
+    latency budget by the time it could be analyzed is dropped. Client and
+    server clocks differ, so ages are measured against the smallest observed
+    (arrival - capture) offset, i.e. relative to the fastest frame seen.
+    """
+    def __init__(self, pose, latency_budget_ms: float, fps: Optional[float] = None,
+                 landmark_indices: Optional[List[int]] = None):
+        self.pose = pose
+        self.latency_budget = latency_budget_ms / 1000
+        self.declared_fps = fps
+        self.landmark_indices = landmark_indices
+        self.clock_offset = None
+        self.first_capture = None
+        self.last_capture = None
+        self.frame_size = None
+        self.metrics = None
+        self.last_position_capture = None
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_late = 0
+        self.frames_superseded = 0
+        self.frames_invalid = 0
+
+    def observe_arrival(self, captured_at: float, received_at: float):
+        self.frames_received += 1
+        offset = received_at - captured_at
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+
+    def age(self, captured_at: float, now: float) -> float:
+        """Seconds since capture, assuming the fastest frame arrived without delay."""
+        return now - captured_at - self.clock_offset
+
+    def is_late(self, captured_at: float, now: float) -> bool:
+        return self.age(captured_at, now) > self.latency_budget
+
+    def effective_fps(self) -> float:
+        """Rate of the analyzed frames, from their capture times."""
+        if self.frames_processed > 1 and self.last_capture > self.first_capture:
+            return (self.frames_processed - 1) / (self.last_capture - self.first_capture)
+        return self.declared_fps or settings.FRAME_RATE
+
+    def process(self, sequence: int, captured_at: float, payload: bytes) -> Optional[dict]:
+        """
+        Decodes and analyzes one frame; returns the frame message, or None
+        when the payload is not an image.
+        """
+        started = time.perf_counter()
+        image = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self.frames_invalid += 1
+            return None
+        height, width = image.shape[:2]
+        if self.metrics is None:
+            self.frame_size = width, height
+            self.metrics = MetricsAccumulator(width, height, self.declared_fps or settings.FRAME_RATE)
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        rgb.flags.writeable = False
+        results = self.pose.process(rgb)
+
+        landmarks = pose_landmarks_array(results)
+        center = hip_center(landmarks) if landmarks is not None else None
+        if center is not None:
+            # Steps take as long as the capture times say; frames may have been dropped in between
+            time_diff = (
+                captured_at - self.last_position_capture if self.last_position_capture is not None else None
+            )
+            self.metrics.add_position(*center, time_diff=time_diff if time_diff and time_diff > 0 else None)
+            self.last_position_capture = captured_at
+
+        self.frames_processed += 1
+        if self.first_capture is None:
+            self.first_capture = captured_at
+        self.last_capture = captured_at
+
+        if landmarks is not None and self.landmark_indices is not None:
+            landmarks = landmarks[self.landmark_indices]
+        return {
+            "type": "frame",
+            "seq": sequence,
+            "landmarks": np.round(landmarks.astype(np.float64), 5).tolist() if landmarks is not None else None,
+            "basketball_metrics": self.metrics.snapshot().dict(),
+            "processing_ms": round((time.perf_counter() - started) * 1000, 2),
+            "dropped_frames": self.frames_late + self.frames_superseded,
+        }
+
+    def summary(self) -> dict:
+        metrics = self.metrics.snapshot() if self.metrics is not None else empty_basketball_metrics()
+        return {
+            "type": "summary",
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_late": self.frames_late,
+            "frames_superseded": self.frames_superseded,
+            "frames_invalid": self.frames_invalid,
+            "effective_fps": round(self.effective_fps(), 2),
+            "basketball_metrics": metrics.dict(),
+        }
+
+async def run_live_session(websocket: WebSocket, fps: Optional[float] = None,
+                           latency_budget_ms: Optional[float] = None,
+                           landmark_indices: Optional[List[int]] = None):
+    """
+    Serves one live connection. A receiver keeps only the newest unprocessed
+    frame, so frames that arrive while Pose is busy replace each other
+    instead of queueing; the analyzer drops the frame it picks up when it is
+    already over the latency budget. Inference runs in a thread so the event
+    loop keeps serving other connections.
+    """
+    global _active_sessions
+    await websocket.accept()
+    if _active_sessions >= settings.LIVE_MAX_SESSIONS:
+        await websocket.close(code=1013, reason="Too many live sessions")
+        return
+    _active_sessions += 1
+
+    loop = asyncio.get_running_loop()
+    pose = None
+    try:
+        pose = await loop.run_in_executor(None, create_pose)
+        session = LiveSession(
+            pose, latency_budget_ms or settings.LIVE_LATENCY_BUDGET_MS, fps, landmark_indices
+        )
+        await websocket.send_text(json.dumps({"type": "ready"}))
+
+        latest = None
+        frame_ready = asyncio.Event()
+        finished = False
+
+        async def receive():
+            nonlocal latest, finished
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    if message.get("bytes") is not None:
+                        data = message["bytes"]
+                        if len(data) <= FRAME_HEADER.size:
+                            session.frames_invalid += 1
+                            continue
+                        sequence, captured_at = FRAME_HEADER.unpack_from(data)
+                        session.observe_arrival(captured_at, time.time())
+                        if latest is not None:
+                            session.frames_superseded += 1
+                        latest = (sequence, captured_at, data[FRAME_HEADER.size:])
+                        frame_ready.set()
+                    elif message.get("text") is not None:
+                        if json.loads(message["text"]).get("type") == "end":
+                            break
+            except (WebSocketDisconnect, ValueError):
+                pass
+            finally:
+                finished = True
+                frame_ready.set()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            while True:
+                if latest is None:
+                    if finished:
+                        break
+                    await frame_ready.wait()
+                    frame_ready.clear()
+                    continue
+                sequence, captured_at, payload = latest
+                latest = None
+                if session.is_late(captured_at, time.time()):
+                    session.frames_late += 1
+                    continue
+                result = await loop.run_in_executor(None, session.process, sequence, captured_at, payload)
+                if result is not None:
+                    await websocket.send_text(json.dumps(result))
+            await websocket.send_text(json.dumps(session.summary()))
+            await websocket.close()
+        finally:
+            receiver.cancel()
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away mid-send
+        pass
+    finally:
+        _active_sessions -= 1
+        if pose is not None:
+            pose.close()
@@ -1,16 +1,40 @@
+import asyncio
+import hashlib
+import json
 import os
 import shutil
-import json
+import time
 import uuid
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from anyio import to_thread
+from fastapi import FastAPI, File, Form, Query, Request, UploadFile, HTTPException, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
 import cv2
-import mediapipe as mp
+import numpy as np
 from datetime import datetime
 
+from cache import analysis_cache
+from config import settings
+from jobs import COMPLETED, FINISHED_STATES, QUEUED, RUNNING, job_registry
+from schemas import VideoAnalysis, AnalysisProfile
+import live
+from live import run_live_session
+from landmarks import LANDMARK_FIELDS, LANDMARK_NAMES, resolve_landmark_subset
+from storage import (
+    analysis_exists, analysis_version, find_content_entry, load_analysis_dict, load_analysis_summary,
+    load_summary, open_analysis_landmarks, proxy_path, register_content, resolve_video_id, save_alias,
+    sprite_path, video_index_path
+)
+from telemetry import CONTENT_TYPE, http_request_duration, registry
+from media import range_file_response
+from timeline import frame_at, frame_time, keyframe_before, thumbnail_tile
+import uploads
+from uploads import UploadError, check_video_size, check_video_type
+from workers import analysis_pool, QueueFullError
+
 app = FastAPI(
     title="Basketball Movement Intelligence API",
     description="Real-time and post-session analytics for basketball performance with pose estimation",
@@ -34,20 +58,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates, not raw paths, keep the label set small
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            method=request.method, route=route.path if route is not None else "unmatched", status=status
+        )
+
+# Gauges read when /metrics is scraped
+registry.gauge("analysis_queue_depth", "Analysis jobs waiting for a worker",
+               function=lambda: analysis_pool.queue_depth)
+registry.gauge("analysis_active_jobs", "Analysis jobs running on a worker",
+               function=lambda: analysis_pool.active_jobs)
+registry.gauge("analysis_queue_capacity", "Running plus waiting analysis jobs the pool accepts",
+               function=lambda: analysis_pool.capacity)
+registry.gauge("analysis_workers", "Analysis worker processes", function=lambda: analysis_pool.max_workers)
+registry.gauge("analysis_cache_entries", "Responses in the analysis cache",
+               function=lambda: analysis_cache.stats()["entries"])
+registry.gauge("analysis_cache_bytes", "Size of the responses in the analysis cache",
+               function=lambda: analysis_cache.stats()["size_bytes"])
+registry.gauge("analysis_cache_hits", "Analysis cache hits since startup",
+               function=lambda: analysis_cache.hits)
+registry.gauge("analysis_cache_misses", "Analysis cache misses since startup",
+               function=lambda: analysis_cache.misses)
+registry.gauge("live_sessions", "Open live ingest sessions", function=lambda: live._active_sessions)
+
 # Define directories
-UPLOAD_DIRECTORY = "./uploads"
-ANALYSIS_DIRECTORY = "./analysis_results"
+UPLOAD_DIRECTORY = settings.UPLOAD_DIRECTORY
+ANALYSIS_DIRECTORY = settings.ANALYSIS_DIRECTORY
 os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
 os.makedirs(ANALYSIS_DIRECTORY, exist_ok=True)
 
-# Initialize MediaPipe Pose solution
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    min_detection_confidence=0.5, 
-    min_tracking_confidence=0.5,
-    model_complexity=1
-)
-
 # Pydantic models
 class HealthResponse(BaseModel):
     status: str
@@ -60,342 +110,204 @@ class VideoUploadResponse(BaseModel):
     filename: str
     safe_filename: str
     file_size: int
+    duplicate_of: Optional[str] = None  # video whose analysis is reused for identical content
 
-class PoseLandmark(BaseModel):
-    x: float
-    y: float
-    z: float
-    visibility: float
-
-class BasketballMetrics(BaseModel):
-    # Core Movement Metrics
-    total_distance_covered: float  # Total distance in feet
-    average_speed: float          # Average speed in mph
-    max_speed: float              # Maximum speed in mph
-    high_intensity_sprints: int   # Number of sprints > 15 mph
-    
-    # Trajectory Analysis
-    court_coverage_percentage: float  # Percentage of court area covered
-    movement_efficiency: float        # Direct vs. total distance ratio
-    
-    # Court Zone Distribution
-    court_zone_distribution: dict     # Time spent in each zone
-    paint_time_percentage: float      # Time in paint area
-    three_point_time_percentage: float # Time in 3-point area
-    
-    # Performance Indicators
-    acceleration_events: int          # Number of rapid speed changes
-    direction_changes: int            # Number of significant direction changes
+class UploadSessionRequest(BaseModel):
+    filename: str
+    total_size: int                              # bytes of the whole video
+    content_type: Optional[str] = None           # guessed from the filename when missing
+    frame_stride: Optional[int] = None
+    target_fps: Optional[float] = None
+    max_inference_size: Optional[int] = None
+    multi_player: bool = False
+    roi: Optional[bool] = None
+    pose_cascade: Optional[bool] = None
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    content_type: str
+    total_size: int
+    offset: int                   # bytes received so far; the next chunk starts here
+    chunk_size: int               # suggested chunk size in bytes
 
-class VideoAnalysis(BaseModel):
+class LandmarkRangeResponse(BaseModel):
     video_id: str
-    status: str
+    fps: float
     total_frames: int
-    processed_frames: int
-    pose_landmarks: List[Optional[List[PoseLandmark]]]
-    basketball_metrics: BasketballMetrics
-    analysis_metadata: dict
+    start_frame: int
+    end_frame: int                # exclusive
+    step: int
+    landmarks: List[str]          # names of the returned landmarks, in order
+    fields: List[str]             # value order within each landmark
+    frames: List[Optional[List[List[float]]]]  # per frame: one [x, y, z, visibility] per landmark, null if no pose
 
-def analyze_video_for_pose(video_path: str, video_id: str):
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def save_upload(upload: UploadFile, file_path: str) -> str:
     """
-    Analyzes a video file to extract pose landmarks for each frame using MediaPipe.
-    Calculates basketball metrics from pose data.
+    Streams an upload to disk and returns the SHA-256 of its content,
+    hashed chunk by chunk as it is written. Blocks, so it runs in the
+    threadpool; raises UploadError once the upload exceeds MAX_FILE_SIZE.
     """
+    digest = hashlib.sha256()
+    size = 0
     try:
-        cap = cv2.VideoCapture(video_path)
-        all_frames_landmarks = []
-        
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        frame_count = 0
-        processed_frames = 0
-        
-        while cap.isOpened():
-            success, frame = cap.read()
-            if not success:
-                break
-            
-            frame_count += 1
-            
-            # Convert the BGR image to RGB
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            
-            # Process the image and find pose
-            results = pose.process(image)
-            
-            # Extract landmarks if a pose is detected
-            if results.pose_landmarks:
-                frame_landmarks = []
-                for landmark in results.pose_landmarks.landmark:
-                    frame_landmarks.append(PoseLandmark(
-                        x=landmark.x,
-                        y=landmark.y,
-                        z=landmark.z,
-                        visibility=landmark.visibility
-                    ))
-                all_frames_landmarks.append(frame_landmarks)
-                processed_frames += 1
-            else:
-                all_frames_landmarks.append(None)  # Add null if no pose detected
-        
-        cap.release()
-        
-        # Calculate basketball metrics from pose data
-        basketball_metrics = calculate_basketball_metrics_from_pose(
-            all_frames_landmarks, width, height, fps
-        )
-        
-        # Create analysis result
-        analysis_result = VideoAnalysis(
-            video_id=video_id,
-            status="completed",
-            total_frames=total_frames,
-            processed_frames=processed_frames,
-            pose_landmarks=all_frames_landmarks,
-            basketball_metrics=basketball_metrics,
-            analysis_metadata={
-                "model_version": "mediapipe_pose",
-                "analysis_duration": total_frames / fps if fps > 0 else 0,
-                "court_dimensions": {"width": width, "height": height},
-                "fps": fps,
-                "pose_detection_rate": (processed_frames / total_frames) * 100 if total_frames > 0 else 0
-            }
-        )
-        
-        # Save analysis results
-        analysis_file = os.path.join(ANALYSIS_DIRECTORY, f"{video_id}_analysis.json")
-        try:
-            with open(analysis_file, 'w') as f:
-                json.dump(analysis_result.dict(), f, indent=2, default=str)
-            print(f"Analysis saved to: {analysis_file}")
-        except Exception as e:
-            print(f"Error saving analysis file: {e}")
-            # Create a minimal analysis file if the full one fails
-            minimal_analysis = {
-                "video_id": video_id,
-                "status": "completed",
-                "total_frames": total_frames,
-                "processed_frames": processed_frames,
-                "pose_landmarks": [],
-                "basketball_metrics": basketball_metrics.dict(),
-                "analysis_metadata": analysis_result.analysis_metadata
-            }
-            with open(analysis_file, 'w') as f:
-                json.dump(minimal_analysis, f, indent=2, default=str)
-        
-        return analysis_result
-        
-    except Exception as e:
-        print(f"Error analyzing video: {e}")
-        return None
+        with open(file_path, "wb") as buffer:
+            while True:
+                chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                check_video_size(size)
+                digest.update(chunk)
+                buffer.write(chunk)
+    except UploadError:
+        os.remove(file_path)
+        raise
+    return digest.hexdigest()
 
-def calculate_basketball_metrics_from_pose(pose_landmarks: List[Optional[List[PoseLandmark]]], 
-                                         court_width: float, court_height: float, fps: float) -> BasketballMetrics:
-    """
-    Calculate basketball metrics from pose landmark data
-    """
-    if not pose_landmarks or len(pose_landmarks) < 2:
-        return BasketballMetrics(
-            total_distance_covered=0.0,
-            average_speed=0.0,
-            max_speed=0.0,
-            high_intensity_sprints=0,
-            court_coverage_percentage=0.0,
-            movement_efficiency=0.0,
-            court_zone_distribution={"paint": 0, "mid_range": 0, "three_point": 0, "baseline": 0},
-            paint_time_percentage=0.0,
-            three_point_time_percentage=0.0,
-            acceleration_events=0,
-            direction_changes=0
+def build_profile(frame_stride: Optional[int], target_fps: Optional[float],
+                  max_inference_size: Optional[int], multi_player: bool,
+                  roi: Optional[bool], pose_cascade: Optional[bool]) -> AnalysisProfile:
+    """The default analysis profile with the options a client set, or HTTP 422."""
+    default_profile = AnalysisProfile.from_settings()
+    try:
+        return AnalysisProfile(
+            frame_stride=frame_stride or default_profile.frame_stride,
+            target_fps=target_fps or default_profile.target_fps,
+            max_inference_size=max_inference_size or default_profile.max_inference_size,
+            multi_player=multi_player,
+            roi=default_profile.roi if roi is None else roi,
+            pose_cascade=default_profile.pose_cascade if pose_cascade is None else pose_cascade
         )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+def queue_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Analysis queue is full. Please retry later.",
+        headers={"Retry-After": "30"}
+    )
+
+def check_queue_capacity():
+    # Refuse early instead of accepting a large upload we cannot analyze
+    if analysis_pool.is_full():
+        raise queue_full_error()
+
+def start_analysis(video_id: str, file_path: str, filename: str, content_hash: str,
+                   profile: AnalysisProfile) -> VideoUploadResponse:
+    """
+    Hands a stored upload to the analysis worker pool, or points it at the
+    analysis of identical content uploaded earlier with the same profile.
+    Reads the video and the content index, so it runs in the threadpool.
+    Raises QueueFullError with the upload left in place, for the caller to
+    discard or keep for a retry.
+    """
+    safe_filename = os.path.basename(file_path)
+    file_size = os.path.getsize(file_path)
     
-    # Court Calibration Constants (NBA regulation court)
-    REAL_COURT_LENGTH = 94.0  # feet
-    REAL_COURT_WIDTH = 50.0   # feet
-    PIXELS_PER_FOOT_X = court_width / REAL_COURT_LENGTH
-    PIXELS_PER_FOOT_Y = court_height / REAL_COURT_WIDTH
-    
-    # Extract hip center positions (landmarks 23 and 24 are hips)
-    hip_positions = []
-    for frame_landmarks in pose_landmarks:
-        if frame_landmarks and len(frame_landmarks) > 24:
-            # Use average of left and right hip for center of mass
-            left_hip = frame_landmarks[23]
-            right_hip = frame_landmarks[24]
-            if left_hip.visibility > 0.5 and right_hip.visibility > 0.5:
-                center_x = (left_hip.x + right_hip.x) / 2
-                center_y = (left_hip.y + right_hip.y) / 2
-                hip_positions.append((center_x, center_y))
-            else:
-                hip_positions.append(None)
+    # Identical content with an identical profile reuses the existing analysis
+    reusable = find_reusable_analysis(content_hash, profile)
+    if reusable is not None:
+        original_id = reusable["video_id"]
+        link_upload(reusable["upload_path"], file_path)
+        save_alias(video_id, original_id)
+        if analysis_exists(original_id):
+            job_status = "completed"
+            message = "Identical video already analyzed. Reusing its analysis."
         else:
-            hip_positions.append(None)
-    
-    # Filter out None positions
-    valid_positions = [pos for pos in hip_positions if pos is not None]
-    
-    if len(valid_positions) < 2:
-        return BasketballMetrics(
-            total_distance_covered=0.0,
-            average_speed=0.0,
-            max_speed=0.0,
-            high_intensity_sprints=0,
-            court_coverage_percentage=0.0,
-            movement_efficiency=0.0,
-            court_zone_distribution={"paint": 0, "mid_range": 0, "three_point": 0, "baseline": 0},
-            paint_time_percentage=0.0,
-            three_point_time_percentage=0.0,
-            acceleration_events=0,
-            direction_changes=0
+            job_status = job_registry.status(original_id)
+            message = "Identical video is already being analyzed. Sharing its analysis."
+        return VideoUploadResponse(
+            video_id=video_id,
+            status=job_status,
+            message=message,
+            filename=filename,
+            safe_filename=safe_filename,
+            file_size=file_size,
+            duplicate_of=original_id
         )
     
-    # Calculate distances and speeds in real-world units
-    distances = []
-    speeds = []
-    direction_changes = 0
+    # Hand the video to the analysis worker pool
+    job_status = analysis_pool.submit(file_path, video_id, profile)
+    register_content(content_hash, profile.fingerprint(), video_id, file_path)
     
-    for i in range(1, len(valid_positions)):
-        prev = valid_positions[i-1]
-        curr = valid_positions[i]
-        
-        # Convert pixel distances to real-world feet
-        pixel_distance = ((curr[0] - prev[0])**2 + (curr[1] - prev[1])**2)**0.5
-        real_distance = pixel_distance / ((PIXELS_PER_FOOT_X + PIXELS_PER_FOOT_Y) / 2)
-        distances.append(real_distance)
-        
-        # Calculate speed in mph
-        time_diff = 1.0 / fps if fps > 0 else 0.033  # seconds per frame
-        speed_fps = real_distance / time_diff  # feet per second
-        speed_mph = speed_fps * 0.681818  # Convert to mph
-        speeds.append(speed_mph)
-        
-        # Detect direction changes
-        if i > 1:
-            prev_prev = valid_positions[i-2]
-            # Calculate direction vectors
-            dir1_x = prev[0] - prev_prev[0]
-            dir1_y = prev[1] - prev_prev[1]
-            dir2_x = curr[0] - prev[0]
-            dir2_y = curr[1] - prev[1]
-            
-            # Calculate angle between directions
-            if (dir1_x != 0 or dir1_y != 0) and (dir2_x != 0 or dir2_y != 0):
-                dot_product = dir1_x * dir2_x + dir1_y * dir2_y
-                mag1 = (dir1_x**2 + dir1_y**2)**0.5
-                mag2 = (dir2_x**2 + dir2_y**2)**0.5
-                if mag1 > 0 and mag2 > 0:
-                    cos_angle = dot_product / (mag1 * mag2)
-                    cos_angle = max(-1, min(1, cos_angle))
-                    import math
-                    angle = math.acos(cos_angle)
-                    if angle > math.pi / 3:  # 60 degrees threshold
-                        direction_changes += 1
-    
-    # Calculate core metrics
-    total_distance = sum(distances)
-    avg_speed = sum(speeds) / len(speeds) if speeds else 0
-    max_speed = max(speeds) if speeds else 0
-    
-    # Calculate high-intensity sprints (> 15 mph)
-    high_intensity_sprints = sum(1 for speed in speeds if speed > 15.0)
-    
-    # Calculate acceleration events
-    acceleration_threshold = 3.0  # mph/s
-    acceleration_events = 0
-    for i in range(1, len(speeds)):
-        time_diff = 1.0 / fps if fps > 0 else 0.033
-        if time_diff > 0:
-            acceleration = abs(speeds[i] - speeds[i-1]) / time_diff
-            if acceleration > acceleration_threshold:
-                acceleration_events += 1
-    
-    # Calculate court zone distribution
-    zone_counts = {"paint": 0, "mid_range": 0, "three_point": 0, "baseline": 0}
-    paint_time = 0
-    three_point_time = 0
-    
-    for pos in valid_positions:
-        x, y = pos[0] * court_width, pos[1] * court_height  # Convert to pixel coordinates
-        
-        # Convert to real court coordinates
-        real_x = x / PIXELS_PER_FOOT_X
-        real_y = y / PIXELS_PER_FOOT_Y
-        
-        # Define court zones based on NBA dimensions
-        if real_x < 19:  # Left side
-            if real_y < 8 or real_y > 42:
-                zone_counts["baseline"] += 1
-            elif 8 <= real_y <= 42:
-                zone_counts["paint"] += 1
-                paint_time += 1
-            else:
-                zone_counts["three_point"] += 1
-                three_point_time += 1
-        elif real_x < 75:  # Center court
-            if 8 <= real_y <= 42:
-                zone_counts["paint"] += 1
-                paint_time += 1
-            else:
-                zone_counts["mid_range"] += 1
-        else:  # Right side
-            if real_y < 8 or real_y > 42:
-                zone_counts["baseline"] += 1
-            elif 8 <= real_y <= 42:
-                zone_counts["paint"] += 1
-                paint_time += 1
-            else:
-                zone_counts["three_point"] += 1
-                three_point_time += 1
-    
-    # Convert to percentages
-    total_points = len(valid_positions)
-    zone_distribution = {zone: (count / total_points) * 100 for zone, count in zone_counts.items()}
-    paint_time_percentage = (paint_time / total_points) * 100
-    three_point_time_percentage = (three_point_time / total_points) * 100
-    
-    # Calculate court coverage percentage
-    grid_size = 10
-    covered_cells = set()
-    for pos in valid_positions:
-        x, y = pos[0] * court_width, pos[1] * court_height
-        grid_x = int((x / court_width) * grid_size)
-        grid_y = int((y / court_height) * grid_size)
-        covered_cells.add((grid_x, grid_y))
-    
-    court_coverage_percentage = (len(covered_cells) / (grid_size * grid_size)) * 100
-    
-    # Calculate movement efficiency
-    if len(valid_positions) > 1:
-        start = valid_positions[0]
-        end = valid_positions[-1]
-        start_real_x = start[0] * court_width / PIXELS_PER_FOOT_X
-        start_real_y = start[1] * court_height / PIXELS_PER_FOOT_Y
-        end_real_x = end[0] * court_width / PIXELS_PER_FOOT_X
-        end_real_y = end[1] * court_height / PIXELS_PER_FOOT_Y
-        straight_line_distance = ((end_real_x - start_real_x)**2 + (end_real_y - start_real_y)**2)**0.5
-        movement_efficiency = (straight_line_distance / total_distance) * 100 if total_distance > 0 else 0
+    if job_status == "queued":
+        message = "Video uploaded successfully. Pose analysis is queued."
     else:
-        movement_efficiency = 0
+        message = "Video uploaded successfully. Pose analysis started."
     
-    return BasketballMetrics(
-        total_distance_covered=round(total_distance, 2),
-        average_speed=round(avg_speed, 2),
-        max_speed=round(max_speed, 2),
-        high_intensity_sprints=high_intensity_sprints,
-        court_coverage_percentage=round(court_coverage_percentage, 1),
-        movement_efficiency=round(movement_efficiency, 1),
-        court_zone_distribution=zone_distribution,
-        paint_time_percentage=round(paint_time_percentage, 1),
-        three_point_time_percentage=round(three_point_time_percentage, 1),
-        acceleration_events=acceleration_events,
-        direction_changes=direction_changes
+    return VideoUploadResponse(
+        video_id=video_id,
+        status="uploaded" if job_status == "processing" else job_status,
+        message=message,
+        filename=filename,
+        safe_filename=safe_filename,
+        file_size=file_size
     )
 
+def find_reusable_analysis(content_hash: str, profile: AnalysisProfile) -> Optional[dict]:
+    """
+    Content index entry of an earlier upload with the same content and
+    profile whose analysis finished or is still on its way. Entries of
+    failed analyses are ignored, so the content is analyzed again.
+    """
+    entry = find_content_entry(content_hash, profile.fingerprint())
+    if entry is None:
+        return None
+    if analysis_exists(entry["video_id"]) or job_registry.status(entry["video_id"]) in (QUEUED, RUNNING):
+        return entry
+    return None
+
+def link_upload(source_path: str, file_path: str):
+    """Replaces a duplicate upload with a hard link to the stored original."""
+    if not os.path.exists(source_path):
+        return
+    os.remove(file_path)
+    try:
+        os.link(source_path, file_path)
+    except OSError:
+        # e.g. another filesystem; keep a copy so the upload stays servable
+        shutil.copyfile(source_path, file_path)
+
+@app.on_event("startup")
+async def size_threadpool():
+    # Blocking handlers and file I/O share this threadpool; size it for concurrent status polling
+    to_thread.current_default_thread_limiter().total_tokens = settings.API_THREADPOOL_SIZE
+
+def expire_upload_sessions() -> List[str]:
+    expired = uploads.expire_sessions()
+    for upload_id in expired:
+        _upload_session_locks.pop(upload_id, None)
+    return expired
+
+@app.on_event("startup")
+async def schedule_upload_session_expiry():
+    async def expire_periodically():
+        while True:
+            try:
+                await run_in_threadpool(expire_upload_sessions)
+            except Exception as e:
+                print(f"Could not expire upload sessions: {e}")
+            await asyncio.sleep(settings.UPLOAD_SESSION_EXPIRY_INTERVAL)
+    # Kept referenced so the task is not garbage collected
+    app.state.upload_session_expiry = asyncio.create_task(expire_periodically())
+
+@app.on_event("startup")
+def start_analysis_workers():
+    analysis_pool.start()
+    # Jobs of server processes whose lease expired continue from their last
+    # checkpoint; the pool keeps claiming such jobs while it runs
+    resumed, failed = analysis_pool.resume_unfinished()
+    if resumed or failed:
+        print(f"Resumed {resumed} interrupted analysis jobs, marked {failed} as failed")
+
+@app.on_event("shutdown")
+def stop_analysis_workers():
+    analysis_pool.shutdown(wait=False)
+
 # Routes
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -413,64 +325,216 @@ async def health_check():
 
 @app.post("/videos/upload", response_model=VideoUploadResponse)
 async def upload_video(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    frame_stride: Optional[int] = Form(None),
+    target_fps: Optional[float] = Form(None),
+    max_inference_size: Optional[int] = Form(None),
+    multi_player: bool = Form(False),
+    roi: Optional[bool] = Form(None),
+    pose_cascade: Optional[bool] = Form(None)
 ):
     """
-    Upload a video file for pose analysis
+    Upload a video file for pose analysis.
+    Optional form fields override the default analysis profile.
+    Large videos are better sent through /videos/upload-sessions, which
+    resumes after a dropped connection.
     """
+    profile = build_profile(frame_stride, target_fps, max_inference_size, multi_player, roi, pose_cascade)
+    try:
+        check_video_type(file.content_type, file.filename)
+        if file.size is not None:
+            check_video_size(file.size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    check_queue_capacity()
+    
     try:
         # Generate unique video ID
         video_id = str(uuid.uuid4())
         
         # Create filename with video ID
         file_extension = os.path.splitext(file.filename)[1]
-        safe_filename = f"{video_id}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIRECTORY, safe_filename)
-        
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Get file size
-        file_size = os.path.getsize(file_path)
+        file_path = os.path.join(UPLOAD_DIRECTORY, f"{video_id}{file_extension}")
         
-        # Start background pose analysis
-        background_tasks.add_task(analyze_video_for_pose, file_path, video_id)
-        
-        return VideoUploadResponse(
-            video_id=video_id,
-            status="uploaded",
-            message=f"Video uploaded successfully. Pose analysis started.",
-            filename=file.filename,
-            safe_filename=safe_filename,
-            file_size=file_size
-        )
+        # Save uploaded file off the event loop, hashing it on the way
+        content_hash = await run_in_threadpool(save_upload, file, file_path)
+        try:
+            return await run_in_threadpool(start_analysis, video_id, file_path, file.filename, content_hash, profile)
+        except QueueFullError:
+            os.remove(file_path)
+            raise queue_full_error()
         
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error uploading video: {str(e)}"
         )
 
+def _session_response(session: dict) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        upload_id=session["upload_id"],
+        filename=session["filename"],
+        content_type=session["content_type"],
+        total_size=session["total_size"],
+        offset=session.get("offset", 0),
+        chunk_size=settings.UPLOAD_SESSION_CHUNK_SIZE
+    )
+
+def _get_upload_session(upload_id: str) -> dict:
+    session = uploads.load_session(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+# Chunks of one session are written one request at a time
+_upload_session_locks: dict = {}
+
+async def _upload_session_lock(upload_id: str) -> asyncio.Lock:
+    """Lock of an existing upload session; 404 without creating one for unknown ids."""
+    await run_in_threadpool(_get_upload_session, upload_id)
+    return _upload_session_locks.setdefault(upload_id, asyncio.Lock())
+
+async def _get_locked_upload_session(upload_id: str) -> dict:
+    """The session, read again under its lock; drops the lock when it was deleted meanwhile."""
+    try:
+        return await run_in_threadpool(_get_upload_session, upload_id)
+    except HTTPException:
+        _upload_session_locks.pop(upload_id, None)
+        raise
+
+@app.post("/videos/upload-sessions", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(request: UploadSessionRequest):
+    """
+    Start a chunked upload. The type, size and analysis profile are checked
+    here, before any video bytes are sent. Chunks then go to
+    PUT /videos/upload-sessions/{upload_id}?offset=N.
+    """
+    profile = build_profile(
+        request.frame_stride, request.target_fps, request.max_inference_size,
+        request.multi_player, request.roi, request.pose_cascade
+    )
+    check_queue_capacity()
+    try:
+        session = await run_in_threadpool(
+            uploads.create_session, request.filename, request.content_type, request.total_size, profile.dict()
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return _session_response(session)
+
+@app.get("/videos/upload-sessions/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str):
+    """
+    State of a chunked upload. After a dropped connection, resume by
+    sending the bytes from `offset` on.
+    """
+    return _session_response(await run_in_threadpool(_get_upload_session, upload_id))
+
+@app.put("/videos/upload-sessions/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """
+    Write the request body at byte `offset` of the upload. The body is
+    streamed to disk in UPLOAD_CHUNK_SIZE pieces off the event loop.
+    Answers 409 with the current offset when `offset` leaves a gap.
+    """
+    async with await _upload_session_lock(upload_id):
+        session = await _get_locked_upload_session(upload_id)
+        try:
+            if offset > session["offset"]:
+                raise UploadError(409, f"Offset {offset} is past the {session['offset']} bytes received so far")
+            position = offset
+            pending = bytearray()
+            async for data in request.stream():
+                pending += data
+                if len(pending) >= UPLOAD_CHUNK_SIZE:
+                    position = await run_in_threadpool(uploads.write_chunk, session, position, bytes(pending))
+                    pending.clear()
+            if pending:
+                await run_in_threadpool(uploads.write_chunk, session, position, bytes(pending))
+        except UploadError as e:
+            # Bytes written before the error are kept; the client resumes from Upload-Offset
+            headers = {"Upload-Offset": str(session["offset"])}
+            raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+    return _session_response(session)
+
+@app.post("/videos/upload-sessions/{upload_id}/complete", response_model=VideoUploadResponse)
+async def complete_upload_session(upload_id: str):
+    """
+    Finish a chunked upload once every byte arrived and start its analysis,
+    exactly like a single-request upload. When the analysis queue is full
+    the answer is 429 and the session stays, so /complete can be retried.
+    """
+    async with await _upload_session_lock(upload_id):
+        session = await _get_locked_upload_session(upload_id)
+        check_queue_capacity()
+        profile = AnalysisProfile(**session["profile"])
+        video_id = str(uuid.uuid4())
+        file_extension = os.path.splitext(session["filename"])[1]
+        file_path = os.path.join(UPLOAD_DIRECTORY, f"{video_id}{file_extension}")
+        try:
+            content_hash = await run_in_threadpool(uploads.finalize_session, session, file_path)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        try:
+            response = await run_in_threadpool(
+                start_analysis, video_id, file_path, session["filename"], content_hash, profile
+            )
+        except QueueFullError:
+            # The queue filled up since the check: put the video back into the session
+            await run_in_threadpool(uploads.restore_session, session, file_path)
+            raise queue_full_error()
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error uploading video: {str(e)}"
+            )
+        await run_in_threadpool(uploads.delete_session, upload_id)
+        _upload_session_locks.pop(upload_id, None)
+    return response
+
+@app.delete("/videos/upload-sessions/{upload_id}")
+async def delete_upload_session(upload_id: str):
+    """Abandon a chunked upload and drop the bytes received so far."""
+    await run_in_threadpool(_get_upload_session, upload_id)
+    await run_in_threadpool(uploads.delete_session, upload_id)
+    _upload_session_locks.pop(upload_id, None)
+    return {"upload_id": upload_id, "status": "deleted"}
+
+# Handlers that read analysis files or the job registry are plain functions:
+# FastAPI runs them in its threadpool, so slow disk reads never block the event loop.
+
 @app.get("/videos/{video_id}/analysis", response_model=VideoAnalysis)
-async def get_video_analysis(video_id: str):
+def get_video_analysis(video_id: str):
     """
-    Get pose analysis results for a video
+    Get pose analysis results for a video.
+    Serialized responses are cached until the analysis files change.
     """
     try:
-        analysis_file = os.path.join(ANALYSIS_DIRECTORY, f"{video_id}_analysis.json")
-        
-        if not os.path.exists(analysis_file):
+        version = analysis_version(video_id)
+        if version is None:
             raise HTTPException(
                 status_code=404,
                 detail="Analysis not found. Video may still be processing."
             )
         
-        with open(analysis_file, 'r') as f:
-            analysis_data = json.load(f)
+        body = analysis_cache.get(video_id, version)
+        if body is None:
+            analysis_data = load_analysis_dict(video_id)
+            if analysis_data is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Analysis not found. Video may still be processing."
+                )
+            body = VideoAnalysis(**analysis_data).model_dump_json().encode()
+            analysis_cache.put(video_id, version, body)
         
-        return VideoAnalysis(**analysis_data)
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -480,37 +544,381 @@ async def get_video_analysis(video_id: str):
             detail=f"Error retrieving analysis: {str(e)}"
         )
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text format metrics: request latency per route, queue depth,
+    active jobs and per-stage timings of finished analysis jobs
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/cache/analysis")
+async def get_analysis_cache_stats():
+    """
+    Hit, miss and eviction counters of the analysis response cache
+    """
+    return analysis_cache.stats()
+
+@app.get("/videos/{video_id}/summary")
+def get_video_summary(
+    video_id: str,
+    fields: Optional[str] = Query(None, description="Comma separated top-level fields, e.g. basketball_metrics")
+):
+    """
+    Get analysis metrics and metadata without landmarks, optionally
+    projected to the requested fields
+    """
+    summary = load_analysis_summary(video_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Analysis not found. Video may still be processing."
+        )
+    summary.pop("landmarks", None)
+    
+    if not fields:
+        return summary
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in summary]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {"video_id": video_id, **{field: summary[field] for field in requested}}
+
+@app.get("/videos/{video_id}/landmarks", response_model=LandmarkRangeResponse)
+def get_video_landmarks(
+    video_id: str,
+    start_frame: Optional[int] = Query(None, ge=0),
+    end_frame: Optional[int] = Query(None, ge=0, description="Exclusive"),
+    start_time: Optional[float] = Query(None, ge=0, description="Seconds; used when start_frame is not given"),
+    end_time: Optional[float] = Query(None, ge=0, description="Seconds, exclusive; used when end_frame is not given"),
+    landmarks: Optional[str] = Query(None, description="Comma separated names, groups (hips, ankles, ...) or indices"),
+    step: int = Query(1, ge=1, description="Return every Nth frame"),
+    precision: int = Query(5, ge=1, le=8, description="Decimal places of returned values"),
+    player: Optional[int] = Query(None, ge=0, description="Player of a multi-player analysis")
+):
+    """
+    Get the landmarks of a frame or time range, for a subset of landmarks and
+    decimated by `step`. Reads only the requested slice of the stored analysis.
+    Multi-player analyses return the primary player unless `player` is given.
+    """
+    try:
+        landmark_indices = resolve_landmark_subset(landmarks)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    summary = load_analysis_summary(video_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Analysis not found. Video may still be processing."
+        )
+    data = open_analysis_landmarks(video_id, player)
+    if data is None:
+        if player is not None:
+            raise HTTPException(status_code=404, detail=f"Player {player} not found in this analysis")
+        raise HTTPException(status_code=404, detail="Analysis has no pose landmarks")
+    
+    fps = summary.get("analysis_metadata", {}).get("fps") or 0
+    total_frames = len(data)
+    if start_frame is None:
+        start_frame = int(start_time * fps) if start_time is not None and fps > 0 else 0
+    if end_frame is None:
+        end_frame = int(np.ceil(end_time * fps)) if end_time is not None and fps > 0 else total_frames
+    start_frame = min(start_frame, total_frames)
+    end_frame = max(start_frame, min(end_frame, total_frames))
+    
+    window = np.round(data[start_frame:end_frame:step][:, landmark_indices].astype(np.float64), precision)
+    detected = ~np.isnan(window[:, 0, 0])
+    rows = window.tolist()
+    
+    return LandmarkRangeResponse(
+        video_id=video_id,
+        fps=fps,
+        total_frames=total_frames,
+        start_frame=start_frame,
+        end_frame=end_frame,
+        step=step,
+        landmarks=[LANDMARK_NAMES[i] for i in landmark_indices],
+        fields=list(LANDMARK_FIELDS),
+        frames=[row if is_detected else None for row, is_detected in zip(rows, detected.tolist())]
+    )
+
+@app.get("/videos/{video_id}/players")
+def get_video_players(video_id: str):
+    """
+    Get the tracked players of a multi-player analysis with their frame
+    ranges and basketball metrics
+    """
+    summary = load_analysis_summary(video_id)
+    if summary is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Analysis not found. Video may still be processing."
+        )
+    metadata = summary.get("analysis_metadata", {})
+    if "players" not in metadata:
+        raise HTTPException(status_code=404, detail="Video was not analyzed for multiple players")
+    return {
+        "video_id": video_id,
+        "players": metadata["players"],
+        "tracking": metadata.get("tracking"),
+    }
+
+STATUS_MESSAGES = {
+    "queued": "Waiting for an analysis worker",
+    "running": "Pose analysis in progress",
+    "completed": "Pose analysis finished",
+    "failed": "Pose analysis failed",
+    "cancelled": "Pose analysis was cancelled",
+}
+
+def job_status_payload(job: dict) -> dict:
+    return {
+        "status": job["status"],
+        "message": STATUS_MESSAGES[job["status"]],
+        "frames_processed": job["frames_processed"],
+        "frames_total": job["frames_total"],
+        "progress": job["progress"],
+        "fps": job["fps"],
+        "eta_seconds": job["eta_seconds"],
+        "elapsed_seconds": job["elapsed_seconds"],
+        "error": job["error"],
+        # Rows written to DATABASE_URL or the error; None when persistence is off
+        "persistence": job["persistence"],
+    }
+
 @app.get("/videos/{video_id}/status")
-async def get_video_status(video_id: str):
+def get_video_status(video_id: str):
     """
-    Get the processing status of a video
+    Get the processing status of a video with its progress, throughput and ETA
     """
-    analysis_file = os.path.join(ANALYSIS_DIRECTORY, f"{video_id}_analysis.json")
+    video_id = resolve_video_id(video_id)
+    job = job_registry.get(video_id)
+    if job is None:
+        # Analyses from before the job registry
+        if analysis_exists(video_id):
+            return {"status": "completed", "message": STATUS_MESSAGES["completed"]}
+        raise HTTPException(status_code=404, detail="Video not found.")
     
-    if os.path.exists(analysis_file):
-        return {"status": "completed", "message": "Pose analysis finished"}
-    else:
-        return {"status": "processing", "message": "Pose analysis in progress"}
+    return job_status_payload(job)
+
+def server_sent_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def analysis_events(video_id: str, job_id: str):
+    """
+    Progress, partial metrics and final result of an analysis as server-sent
+    events. Reads the job registry every PROGRESS_STREAM_POLL_INTERVAL seconds
+    and only sends what changed.
+    """
+    last_state = None
+    last_metrics = None
+    idle_polls = 0
+    keepalive_polls = max(1, int(15 / settings.PROGRESS_STREAM_POLL_INTERVAL))
+    while True:
+        job = await run_in_threadpool(job_registry.get, job_id)
+        if job is None:
+            return
+        
+        # fps and ETA drift between polls; only state and frame count changes are news
+        state = (job["status"], job["frames_processed"])
+        if state != last_state:
+            last_state = state
+            yield server_sent_event("progress", {"video_id": video_id, **job_status_payload(job)})
+            idle_polls = 0
+        
+        if job["partial_metrics"] is not None and job["partial_metrics"] != last_metrics:
+            last_metrics = job["partial_metrics"]
+            yield server_sent_event("metrics", {
+                "video_id": video_id,
+                "frames_processed": job["frames_processed"],
+                "partial": True,
+                "basketball_metrics": last_metrics,
+            })
+        
+        if job["status"] in FINISHED_STATES:
+            summary = await run_in_threadpool(load_analysis_summary, video_id) if job["status"] == COMPLETED else None
+            if summary is not None:
+                summary.pop("landmarks", None)
+                yield server_sent_event("result", summary)
+            yield server_sent_event("end", {"video_id": video_id, "status": job["status"]})
+            return
+        
+        idle_polls += 1
+        if idle_polls >= keepalive_polls:
+            yield ": keep-alive\n\n"
+            idle_polls = 0
+        await asyncio.sleep(settings.PROGRESS_STREAM_POLL_INTERVAL)
+
+@app.get("/videos/{video_id}/events")
+async def stream_video_events(video_id: str):
+    """
+    Server-sent events for a video: `progress` while it is analyzed, `metrics`
+    with rolling partial BasketballMetrics, then `result` with the final
+    metrics and metadata and `end`. Replaces polling /status.
+    """
+    job_id = await run_in_threadpool(resolve_video_id, video_id)
+    if await run_in_threadpool(job_registry.status, job_id) is None:
+        summary = await run_in_threadpool(load_analysis_summary, video_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Video not found.")
+        # Analyses from before the job registry are already complete
+        summary.pop("landmarks", None)
+        body = server_sent_event("result", summary) + server_sent_event(
+            "end", {"video_id": video_id, "status": "completed"}
+        )
+        return Response(content=body, media_type="text/event-stream")
+    
+    return StreamingResponse(
+        analysis_events(video_id, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/videos/{video_id}/cancel")
+def cancel_video_analysis(video_id: str):
+    """
+    Cancel a queued or running analysis
+    """
+    if resolve_video_id(video_id) != video_id:
+        raise HTTPException(
+            status_code=409,
+            detail="This upload shares the analysis of an identical video and cannot be cancelled."
+        )
+    if job_registry.status(video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found.")
+    if not analysis_pool.cancel(video_id):
+        raise HTTPException(status_code=409, detail="Analysis already finished.")
+    return {"status": "cancelled", "message": STATUS_MESSAGES["cancelled"]}
+
+@app.websocket("/live/ws")
+async def live_session(
+    websocket: WebSocket,
+    fps: Optional[float] = Query(None, gt=0, description="Camera frame rate, until it can be measured"),
+    latency_budget_ms: Optional[float] = Query(None, gt=0),
+    landmarks: Optional[str] = Query(None, description="Comma separated names, groups or indices to return")
+):
+    """
+    Live session: binary messages carry camera frames (see live.FRAME_HEADER),
+    every analyzed frame is answered with its landmarks and updated metrics.
+    """
+    try:
+        landmark_indices = resolve_landmark_subset(landmarks) if landmarks else None
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await run_live_session(websocket, fps, latency_budget_ms, landmark_indices)
+
+# Analysis files /analysis/{filename} serves; landmark files, proxies and anything
+# else kept in ANALYSIS_DIRECTORY have their own endpoints or are not served
+ANALYSIS_DATA_SUFFIXES = ("_summary.json", "_analysis.json", "_index.json")
 
 @app.get("/analysis/{pose_data_filename}")
 def get_analysis_data(pose_data_filename: str):
     """
     Get raw pose data for a specific video
     """
+    if (os.path.basename(pose_data_filename) != pose_data_filename
+            or not pose_data_filename.endswith(ANALYSIS_DATA_SUFFIXES)):
+        raise HTTPException(status_code=404, detail="Analysis data not found.")
     file_path = os.path.join(ANALYSIS_DIRECTORY, pose_data_filename)
     if os.path.exists(file_path):
         return FileResponse(file_path)
     raise HTTPException(status_code=404, detail="Analysis data not found.")
 
-@app.get("/uploads/{video_filename}")
-def get_video_file(video_filename: str):
+@app.api_route("/uploads/{video_filename}", methods=["GET", "HEAD"])
+def get_video_file(video_filename: str, request: Request):
     """
-    Serve uploaded video files
+    Serve uploaded video files, with byte ranges for seeking
     """
-    file_path = os.path.join(UPLOAD_DIRECTORY, video_filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path, media_type="video/mp4")
-    raise HTTPException(status_code=404, detail="Video file not found.")
+    return range_file_response(request, os.path.join(UPLOAD_DIRECTORY, video_filename))
+
+@app.api_route("/videos/{video_id}/proxy", methods=["GET", "HEAD"])
+def get_video_proxy(video_id: str, request: Request):
+    """
+    Serve the low-resolution, fast-start playback proxy written during
+    analysis, with byte ranges for seeking. It has one frame per analyzed
+    frame and the timeline of the original video.
+    """
+    path = proxy_path(resolve_video_id(video_id))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No playback proxy for this video.")
+    return range_file_response(request, path, media_type="video/mp4")
+
+def load_thumbnail_layout(video_id: str) -> dict:
+    summary = load_summary(video_id)
+    layout = (summary or {}).get("analysis_metadata", {}).get("thumbnails")
+    if layout is None or not os.path.exists(sprite_path(resolve_video_id(video_id))):
+        raise HTTPException(status_code=404, detail="No thumbnails for this video.")
+    return layout
+
+@app.get("/videos/{video_id}/thumbnails")
+def get_thumbnails(video_id: str):
+    """
+    Layout of the thumbnail sprite written during analysis: tile n shows
+    the video at n * interval seconds and sits at row n // columns,
+    column n % columns of the sprite.
+    """
+    layout = load_thumbnail_layout(video_id)
+    return {**layout, "video_id": video_id, "sprite_url": f"/videos/{video_id}/thumbnails/sprite.jpg"}
+
+@app.get("/videos/{video_id}/thumbnails/sprite.jpg")
+def get_thumbnail_sprite(video_id: str):
+    """
+    Serve the thumbnail sprite sheet
+    """
+    load_thumbnail_layout(video_id)
+    return FileResponse(sprite_path(resolve_video_id(video_id)), media_type="image/jpeg")
+
+@app.get("/videos/{video_id}/thumbnails/tile")
+def get_thumbnail_tile(
+    video_id: str,
+    time: float = Query(..., ge=0, description="Seconds into the video"),
+    format: str = Query("json", pattern="^(json|jpeg)$")
+):
+    """
+    The thumbnail covering `time`: its position in the sprite as JSON, or
+    the tile itself as a JPEG for clients that do not crop sprites.
+    """
+    layout = load_thumbnail_layout(video_id)
+    tile = thumbnail_tile(layout, time)
+    if format == "json":
+        return tile
+    sprite = cv2.imread(sprite_path(resolve_video_id(video_id)))
+    if sprite is None:
+        raise HTTPException(status_code=404, detail="No thumbnails for this video.")
+    image = sprite[tile["y"]:tile["y"] + tile["height"], tile["x"]:tile["x"] + tile["width"]]
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, settings.THUMBNAIL_JPEG_QUALITY])
+    return Response(content=encoded.tobytes(), media_type="image/jpeg")
+
+@app.get("/videos/{video_id}/keyframes")
+def get_keyframes(
+    video_id: str,
+    time: Optional[float] = Query(None, ge=0, description="Seconds into the video to look up")
+):
+    """
+    Keyframe index recorded while analyzing. With `time`, returns the frame
+    shown at that time and the keyframe a seek to it has to decode from;
+    without, the whole index.
+    """
+    path = video_index_path(resolve_video_id(video_id))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No keyframe index for this video.")
+    with open(path) as f:
+        index = json.load(f)
+    if time is None:
+        return {"video_id": video_id, **index}
+    frame = frame_at(index, time)
+    keyframe = keyframe_before(index, frame)
+    return {
+        "video_id": video_id,
+        "time": time,
+        "frame": frame,
+        "frame_time": round(frame_time(index, frame), 4),
+        "keyframe": keyframe,
+        "keyframe_time": round(frame_time(index, keyframe), 4) if keyframe is not None else None,
+        "complete": index["complete"],
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,95 @@
+import mimetypes
+import os
+from email.utils import formatdate
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from config import settings
+
+# Byte-range serving of video files (RFC 7233), so players can seek without
+# downloading the whole file. Starlette's FileResponse always sends everything.
+
+def video_media_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """
+    The (start, end) byte range, end inclusive, of a Range header, or None
+    when the whole file should be sent: no header, a malformed one or
+    several ranges, which are allowed to be answered with the full file.
+    Raises ValueError when the range lies outside the file.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, dash, end = header[len("bytes="):].strip().partition("-")
+    if not dash or not (start.isdigit() or start == "") or not (end.isdigit() or end == ""):
+        return None
+    if not start:
+        if not end:
+            return None
+        # Suffix range: the last N bytes
+        if int(end) == 0 or size == 0:
+            raise ValueError(f"Range {header} selects no bytes")
+        return max(0, size - int(end)), size - 1
+    start = int(start)
+    if start >= size:
+        raise ValueError(f"Range {header} is outside the {size} byte file")
+    end = min(int(end), size - 1) if end else size - 1
+    if end < start:
+        return None
+    return start, end
+
+def _read_file(path: str, start: int, length: int):
+    # A sync generator: StreamingResponse iterates it in the threadpool
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(settings.VIDEO_STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def range_file_response(request: Request, path: str, media_type: Optional[str] = None) -> Response:
+    """
+    Serves a file with Range support: 206 with the requested bytes, 416
+    for ranges outside the file, 200 with everything otherwise. HEAD
+    requests get the headers only. If-Range falls back to the full file
+    once the file changed.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Video file not found.")
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    media_type = media_type or video_media_type(path)
+
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = None
+        if not if_range or if_range in (etag, headers["Last-Modified"]):
+            byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    status_code, start, length = 200, 0, size
+    if byte_range is not None:
+        start, end = byte_range
+        status_code, length = 206, end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        _read_file(path, start, length), status_code=status_code, headers=headers, media_type=media_type
+    )
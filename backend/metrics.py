@@ -0,0 +1,266 @@
+import math
+import numpy as np
+from typing import Optional
+
+from landmarks import HIP_VISIBILITY_THRESHOLD, LandmarkTrack, hip_center
+from schemas import BasketballMetrics
+
+# Court Calibration Constants (NBA regulation court)
+REAL_COURT_LENGTH = 94.0  # feet
+REAL_COURT_WIDTH = 50.0   # feet
+
+FEET_PER_SECOND_TO_MPH = 0.681818
+DEFAULT_FRAME_INTERVAL = 0.033  # seconds, used when the fps is unknown
+
+def empty_basketball_metrics() -> BasketballMetrics:
+    return BasketballMetrics(
+        total_distance_covered=0.0,
+        average_speed=0.0,
+        max_speed=0.0,
+        high_intensity_sprints=0,
+        court_coverage_percentage=0.0,
+        movement_efficiency=0.0,
+        court_zone_distribution={"paint": 0, "mid_range": 0, "three_point": 0, "baseline": 0},
+        paint_time_percentage=0.0,
+        three_point_time_percentage=0.0,
+        acceleration_events=0,
+        direction_changes=0
+    )
+
+def compute_basketball_metrics(pose_landmarks: LandmarkTrack, court_width: float, court_height: float,
+                               fps: float, visibility_threshold: float = HIP_VISIBILITY_THRESHOLD,
+                               sprint_speed_mph: float = 15.0, acceleration_threshold: float = 3.0,
+                               direction_change_degrees: float = 60.0,
+                               coverage_grid_size: int = 10) -> BasketballMetrics:
+    """
+    Computes all BasketballMetrics with array operations over the hip-center
+    track. Gives the same results as the frame-by-frame loop it replaced
+    (tests/metrics_reference.py); the thresholds are parameters so metrics can be recomputed cheaply.
+    """
+    if len(pose_landmarks) < 2:
+        return empty_basketball_metrics()
+    
+    # Hip center positions (landmarks 23 and 24 are hips) where both hips are visible
+    hip_centers, hips_visible = pose_landmarks.hip_centers(visibility_threshold=visibility_threshold)
+    return compute_metrics_from_positions(
+        hip_centers[hips_visible], court_width, court_height, fps,
+        sprint_speed_mph=sprint_speed_mph, acceleration_threshold=acceleration_threshold,
+        direction_change_degrees=direction_change_degrees, coverage_grid_size=coverage_grid_size
+    )
+
+def compute_metrics_from_positions(positions: np.ndarray, court_width: float, court_height: float,
+                                   fps: float, sprint_speed_mph: float = 15.0,
+                                   acceleration_threshold: float = 3.0,
+                                   direction_change_degrees: float = 60.0,
+                                   coverage_grid_size: int = 10) -> BasketballMetrics:
+    """
+    Metrics from an (n, 2) array of normalized hip-center positions of the
+    frames where the player was visible, in frame order.
+    """
+    accumulator = MetricsAccumulator(
+        court_width, court_height, fps, sprint_speed_mph=sprint_speed_mph,
+        acceleration_threshold=acceleration_threshold,
+        direction_change_degrees=direction_change_degrees, coverage_grid_size=coverage_grid_size
+    )
+    accumulator.add_positions(positions)
+    return accumulator.snapshot()
+
+# Coverage cells are stored as one integer key per (x, y) grid cell
+_CELL_OFFSET = 2 ** 31
+
+class MetricsAccumulator:
+    """
+    Running state of all BasketballMetrics over a hip-center track.
+    
+    Positions are fed one at a time with add_position (constant time) or in
+    blocks with add_positions (vectorized), and snapshot() returns the
+    metrics of everything fed so far at any moment. Both paths update the
+    same state, so streaming and batch results agree; batch metrics
+    (compute_metrics_from_positions) are computed with this class.
+    
+    Every step between consecutive positions takes one frame interval at
+    `fps`, like in the batch metrics; add_position takes an explicit interval
+    for sources with irregular timing (e.g. live sessions).
+    """
+    def __init__(self, court_width: float, court_height: float, fps: float,
+                 visibility_threshold: float = HIP_VISIBILITY_THRESHOLD, sprint_speed_mph: float = 15.0,
+                 acceleration_threshold: float = 3.0, direction_change_degrees: float = 60.0,
+                 coverage_grid_size: int = 10):
+        self.court_width = court_width
+        self.court_height = court_height
+        self.visibility_threshold = visibility_threshold
+        self.sprint_speed_mph = sprint_speed_mph
+        self.acceleration_threshold = acceleration_threshold
+        self.direction_change_radians = math.radians(direction_change_degrees)
+        self.coverage_grid_size = coverage_grid_size
+        self.time_diff = 1.0 / fps if fps > 0 else DEFAULT_FRAME_INTERVAL
+        
+        self.pixels_per_foot_x = court_width / REAL_COURT_LENGTH
+        self.pixels_per_foot_y = court_height / REAL_COURT_WIDTH
+        self.feet_per_unit = 1 / ((self.pixels_per_foot_x + self.pixels_per_foot_y) / 2)
+        
+        self.positions = 0
+        self.first_position = None
+        self.last_position = None
+        self.last_step = None
+        self.last_speed = None
+        self.total_distance = 0.0
+        self.speed_sum = 0.0
+        self.max_speed = 0.0
+        self.high_intensity_sprints = 0
+        self.acceleration_events = 0
+        self.direction_changes = 0
+        self.zone_counts = {"paint": 0, "mid_range": 0, "three_point": 0, "baseline": 0}
+        self.covered_cells = set()
+    
+    def add_frame(self, landmarks: Optional[np.ndarray]):
+        """
+        Feeds one frame's (33, 4) landmarks; frames without a pose or with a
+        hip below the visibility threshold are skipped.
+        """
+        if landmarks is None:
+            return
+        center = hip_center(landmarks, self.visibility_threshold)
+        if center is not None:
+            self.add_position(*center)
+    
+    def add_position(self, x: float, y: float, time_diff: Optional[float] = None):
+        """Feeds one hip-center position; `time_diff` overrides the frame interval of this step."""
+        real_x = x * self.court_width / self.pixels_per_foot_x
+        real_y = y * self.court_height / self.pixels_per_foot_y
+        in_lane_band = 8 <= real_y <= 42
+        center_court = 19 <= real_x < 75
+        if in_lane_band:
+            self.zone_counts["paint"] += 1
+        elif center_court:
+            self.zone_counts["mid_range"] += 1
+        else:
+            self.zone_counts["baseline"] += 1
+        
+        grid_x = int((x * self.court_width / self.court_width) * self.coverage_grid_size)
+        grid_y = int((y * self.court_height / self.court_height) * self.coverage_grid_size)
+        self.covered_cells.add(((grid_x + _CELL_OFFSET) << 32) | (grid_y + _CELL_OFFSET))
+        
+        if self.last_position is not None:
+            step = (x - self.last_position[0], y - self.last_position[1])
+            distance = math.sqrt(step[0] ** 2 + step[1] ** 2) * self.feet_per_unit
+            interval = time_diff if time_diff else self.time_diff
+            speed = distance / interval * FEET_PER_SECOND_TO_MPH
+            self.total_distance += distance
+            self.speed_sum += speed
+            self.max_speed = max(self.max_speed, speed)
+            if speed > self.sprint_speed_mph:
+                self.high_intensity_sprints += 1
+            if self.last_speed is not None and abs(speed - self.last_speed) / interval > self.acceleration_threshold:
+                self.acceleration_events += 1
+            if self.last_step is not None:
+                magnitude_before = math.sqrt(self.last_step[0] ** 2 + self.last_step[1] ** 2)
+                magnitude_after = math.sqrt(step[0] ** 2 + step[1] ** 2)
+                if magnitude_before > 0 and magnitude_after > 0:
+                    cos_angle = (
+                        (self.last_step[0] * step[0] + self.last_step[1] * step[1])
+                        / (magnitude_before * magnitude_after)
+                    )
+                    if math.acos(max(-1.0, min(1.0, cos_angle))) > self.direction_change_radians:
+                        self.direction_changes += 1
+            self.last_step = step
+            self.last_speed = speed
+        else:
+            self.first_position = (x, y)
+        self.last_position = (x, y)
+        self.positions += 1
+    
+    def add_positions(self, positions: np.ndarray):
+        """Feeds an (n, 2) block of hip-center positions in frame order."""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if len(positions) == 0:
+            return
+        
+        # Court zones based on NBA dimensions
+        real_x = positions[:, 0] * self.court_width / self.pixels_per_foot_x
+        real_y = positions[:, 1] * self.court_height / self.pixels_per_foot_y
+        in_lane_band = (real_y >= 8) & (real_y <= 42)
+        center_court = (real_x >= 19) & (real_x < 75)
+        self.zone_counts["paint"] += int(in_lane_band.sum())
+        self.zone_counts["mid_range"] += int((center_court & ~in_lane_band).sum())
+        self.zone_counts["baseline"] += int((~center_court & ~in_lane_band).sum())
+        
+        # Coverage grid cells; positions can fall outside the frame
+        grid_x = ((positions[:, 0] * self.court_width / self.court_width) * self.coverage_grid_size).astype(np.int64)
+        grid_y = ((positions[:, 1] * self.court_height / self.court_height) * self.coverage_grid_size).astype(np.int64)
+        keys = ((grid_x + _CELL_OFFSET).astype(np.uint64) << np.uint64(32)) | (grid_y + _CELL_OFFSET).astype(np.uint64)
+        self.covered_cells.update(np.unique(keys).tolist())
+        
+        # Steps continue from the last position fed before this block
+        track = positions if self.last_position is None else np.vstack([self.last_position, positions])
+        steps = np.diff(track, axis=0)
+        if len(steps):
+            distances = np.sqrt(steps[:, 0] ** 2 + steps[:, 1] ** 2) * self.feet_per_unit
+            speeds = distances / self.time_diff * FEET_PER_SECOND_TO_MPH
+            self.total_distance += float(distances.sum())
+            self.speed_sum += float(speeds.sum())
+            self.max_speed = max(self.max_speed, float(speeds.max()))
+            self.high_intensity_sprints += int((speeds > self.sprint_speed_mph).sum())
+            
+            speed_track = speeds if self.last_speed is None else np.concatenate([[self.last_speed], speeds])
+            self.acceleration_events += int(
+                (np.abs(np.diff(speed_track)) / self.time_diff > self.acceleration_threshold).sum()
+            )
+            
+            # Direction changes: angle between consecutive non-zero steps
+            step_track = steps if self.last_step is None else np.vstack([self.last_step, steps])
+            before, after = step_track[:-1], step_track[1:]
+            magnitudes_before = np.sqrt(before[:, 0] ** 2 + before[:, 1] ** 2)
+            magnitudes_after = np.sqrt(after[:, 0] ** 2 + after[:, 1] ** 2)
+            moving = (magnitudes_before > 0) & (magnitudes_after > 0)
+            cos_angles = (
+                (before[moving] * after[moving]).sum(axis=1)
+                / (magnitudes_before[moving] * magnitudes_after[moving])
+            )
+            angles = np.arccos(np.clip(cos_angles, -1, 1))
+            self.direction_changes += int((angles > self.direction_change_radians).sum())
+            
+            self.last_step = tuple(steps[-1].tolist())
+            self.last_speed = float(speeds[-1])
+        
+        if self.first_position is None:
+            self.first_position = tuple(positions[0].tolist())
+        self.last_position = tuple(positions[-1].tolist())
+        self.positions += len(positions)
+    
+    def snapshot(self) -> BasketballMetrics:
+        """Metrics of all positions fed so far."""
+        if self.positions < 2:
+            return empty_basketball_metrics()
+        
+        # Convert to percentages
+        total_points = self.positions
+        zone_distribution = {zone: (count / total_points) * 100 for zone, count in self.zone_counts.items()}
+        paint_time_percentage = (self.zone_counts["paint"] / total_points) * 100
+        three_point_time_percentage = (self.zone_counts["three_point"] / total_points) * 100
+        
+        grid_cells = self.coverage_grid_size * self.coverage_grid_size
+        court_coverage_percentage = (len(self.covered_cells) / grid_cells) * 100
+        
+        # Movement efficiency: straight-line vs. travelled distance
+        start_x = self.first_position[0] * self.court_width / self.pixels_per_foot_x
+        start_y = self.first_position[1] * self.court_height / self.pixels_per_foot_y
+        end_x = self.last_position[0] * self.court_width / self.pixels_per_foot_x
+        end_y = self.last_position[1] * self.court_height / self.pixels_per_foot_y
+        straight_line_distance = ((end_x - start_x) ** 2 + (end_y - start_y) ** 2) ** 0.5
+        total_distance = self.total_distance
+        movement_efficiency = (straight_line_distance / total_distance) * 100 if total_distance > 0 else 0
+        
+        return BasketballMetrics(
+            total_distance_covered=round(total_distance, 2),
+            average_speed=round(self.speed_sum / (total_points - 1), 2),
+            max_speed=round(self.max_speed, 2),
+            high_intensity_sprints=self.high_intensity_sprints,
+            court_coverage_percentage=round(court_coverage_percentage, 1),
+            movement_efficiency=round(movement_efficiency, 1),
+            court_zone_distribution=zone_distribution,
+            paint_time_percentage=round(paint_time_percentage, 1),
+            three_point_time_percentage=round(three_point_time_percentage, 1),
+            acceleration_events=self.acceleration_events,
+            direction_changes=self.direction_changes
+        )
@@ -0,0 +1,180 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from config import settings
+from landmarks import hip_centers
+from metrics import compute_metrics_from_positions
+from storage import open_landmark_array
+
+# Finished analyses written to the sessions and player_stats tables of
+# database.py: one session row, one totals row per tracked player and one
+# row per STATS_SAMPLE_INTERVAL of video in which the player was seen. All
+# rows of a job go in one transaction with a statement per table, not one
+# per row. SQLAlchemy is only imported when DATABASE_URL is set.
+
+FEET_TO_METERS = 0.3048
+MPH_TO_KMH = 1.609344
+
+def persistence_enabled() -> bool:
+    return bool(settings.DATABASE_URL) and settings.PERSIST_ANALYSIS_STATS
+
+def session_id_for(video_id: str) -> uuid.UUID:
+    """Session id of a video: the video id itself when it is a UUID, a stable UUID derived from it otherwise."""
+    try:
+        return uuid.UUID(video_id)
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_URL, f"basketball-video:{video_id}")
+
+def _stats_columns(metrics: dict) -> dict:
+    # Metrics are in feet and mph; player_stats stores meters and km/h
+    return {
+        "distance_covered": round(metrics["total_distance_covered"] * FEET_TO_METERS, 2),
+        "speed_max": round(metrics["max_speed"] * MPH_TO_KMH, 2),
+        "speed_avg": round(metrics["average_speed"] * MPH_TO_KMH, 2),
+        "acceleration_bursts": metrics["acceleration_events"],
+    }
+
+def _hip_centers(path: str, stride: int) -> tuple:
+    """
+    Frame indices, hip-center positions and hip visibility of the analyzed
+    frames of a landmark file, with the visibility threshold used for the
+    analysis metrics.
+    """
+    data = open_landmark_array(path)
+    centers, visible = hip_centers(data[::stride])
+    return np.arange(0, len(data), stride), centers, visible
+
+def player_stats_rows(session_id: uuid.UUID, started_at: datetime, path: str, player_index: int,
+                      metrics: dict, properties: dict) -> List[dict]:
+    """
+    player_stats rows of one tracked player: the totals of the analysis
+    (`metrics`) and a sample per STATS_SAMPLE_INTERVAL of video computed
+    from the player's landmark file. Intervals without the player are left
+    out. minutes_played is the time the player was visible.
+    """
+    fps, stride = properties["fps"], properties["stride"]
+    if fps <= 0:
+        return []
+    effective_fps = fps / stride
+    frames, centers, visible = _hip_centers(path, stride)
+    rows = [{
+        "session_id": session_id,
+        "player_index": player_index,
+        "timestamp": started_at,
+        "video_timestamp": None,
+        "minutes_played": round(visible.sum() / effective_fps / 60, 2),
+        **_stats_columns(metrics),
+    }]
+
+    sample_frames = max(1, round(settings.STATS_SAMPLE_INTERVAL * fps))
+    samples = frames // sample_frames
+    # Analyzed frames are in order, so every sample is a contiguous run
+    boundaries = np.flatnonzero(np.diff(samples)) + 1
+    for run in np.split(np.arange(len(frames)), boundaries):
+        if not len(run) or not visible[run].any():
+            continue
+        offset = samples[run[0]] * sample_frames / fps
+        sample_metrics = compute_metrics_from_positions(
+            centers[run][visible[run]], properties["width"], properties["height"], effective_fps
+        )
+        rows.append({
+            "session_id": session_id,
+            "player_index": player_index,
+            "timestamp": started_at + timedelta(seconds=offset),
+            "video_timestamp": round(offset, 2),
+            "minutes_played": round(visible[run].sum() / effective_fps / 60, 2),
+            **_stats_columns(sample_metrics.dict()),
+        })
+    return rows
+
+def analysis_rows(analysis_result, video_path: str, created_at: Optional[float] = None) -> tuple:
+    """The sessions row and player_stats rows of a finished analysis."""
+    metadata = analysis_result.analysis_metadata
+    session_id = session_id_for(analysis_result.video_id)
+    now = datetime.now(timezone.utc)
+    started_at = datetime.fromtimestamp(created_at, timezone.utc) if created_at else now
+    properties = {
+        "fps": metadata["fps"],
+        "stride": metadata["frame_stride"],
+        "width": metadata["court_dimensions"]["width"],
+        "height": metadata["court_dimensions"]["height"],
+    }
+    filename = os.path.basename(video_path)
+    session = {
+        "id": session_id,
+        "name": filename,
+        "session_type": "uploaded",
+        "video_url": f"/uploads/{filename}",
+        "status": "completed",
+        "started_at": started_at,
+        "ended_at": now,
+        "duration": round(metadata["analysis_duration"], 2),
+    }
+
+    directory = os.path.dirname(analysis_result.landmarks_path)
+    players = metadata.get("players")
+    if players is None:
+        # Single-player analysis: the video's landmark file and metrics
+        players = [{
+            "player": 0,
+            "landmarks_file": os.path.basename(analysis_result.landmarks_path),
+            "basketball_metrics": analysis_result.basketball_metrics.dict(),
+        }]
+    stats = []
+    for player in players:
+        stats.extend(player_stats_rows(
+            session_id, started_at, os.path.join(directory, player["landmarks_file"]), player["player"],
+            player["basketball_metrics"], properties
+        ))
+    return session, stats
+
+def write_rows(engine, session: dict, stats: List[dict]):
+    """
+    Writes a sessions row and its player_stats rows in one transaction,
+    replacing the rows of an earlier run of the same video. Statements: two
+    deletes, the session insert and one executemany insert of every
+    player_stats row, which the driver batches.
+    """
+    from sqlalchemy import delete, insert
+    from database import PlayerStats, Session
+
+    sessions_table, stats_table = Session.__table__, PlayerStats.__table__
+    with engine.begin() as connection:
+        connection.execute(delete(stats_table).where(stats_table.c.session_id == session["id"]))
+        connection.execute(delete(sessions_table).where(sessions_table.c.id == session["id"]))
+        connection.execute(insert(sessions_table), [session])
+        if stats:
+            connection.execute(insert(stats_table), stats)
+
+def save_analysis_stats(analysis_result, video_path: str, created_at: Optional[float] = None) -> dict:
+    """Writes the session and player stats of a finished analysis to the DATABASE_URL database."""
+    from database import engine
+
+    started = time.perf_counter()
+    session, stats = analysis_rows(analysis_result, video_path, created_at)
+    write_rows(engine, session, stats)
+    return {
+        "session_id": str(session["id"]),
+        "player_stats_rows": len(stats),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+def persist_analysis(analysis_result, video_path: str, created_at: Optional[float] = None) -> Optional[dict]:
+    """
+    save_analysis_stats when persistence is configured, None otherwise. The
+    analysis files are the source of truth, so database errors are returned
+    as {"error": ...} for the job registry, not raised.
+    """
+    if not persistence_enabled():
+        return None
+    try:
+        return save_analysis_stats(analysis_result, video_path, created_at)
+    except Exception as e:
+        # SQLAlchemy errors go on with the statement and its parameters
+        message = str(e).splitlines()[0] if str(e) else ""
+        return {"error": f"{type(e).__name__}: {message}"}
@@ -0,0 +1,279 @@
+import queue
+import threading
+import time
+from array import array
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+from config import settings
+
+# Marks the end of a stage's output
+_END = object()
+
+def inference_size(width: int, height: int, max_size: Optional[int]) -> tuple:
+    """
+    Size (width, height) a frame is shrunk to so its longest side is at most
+    `max_size` pixels. Landmarks are normalized to the image size, so they
+    need no rescaling afterwards.
+    """
+    longest = max(width, height)
+    if not max_size or longest <= max_size:
+        return width, height
+    scale = max_size / longest
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+class StageTimer:
+    """Accumulated busy time of one pipeline stage."""
+    def __init__(self):
+        self.seconds = 0.0
+        self.frames = 0
+
+    def add(self, seconds: float):
+        self.seconds += seconds
+        self.frames += 1
+
+    def summary(self) -> dict:
+        return {
+            "seconds": round(self.seconds, 4),
+            "frames": self.frames,
+            "ms_per_frame": round(self.seconds * 1000 / self.frames, 3) if self.frames else 0.0,
+        }
+
+def merge_stage_timings(timings: List[dict]) -> dict:
+    """
+    Adds up the stage timings of several pipelines (e.g. video segments).
+    """
+    merged = {}
+    for timing in timings:
+        for stage, values in timing.get("stages", {}).items():
+            total = merged.setdefault(stage, {"seconds": 0.0, "frames": 0})
+            total["seconds"] += values["seconds"]
+            total["frames"] += values["frames"]
+    for values in merged.values():
+        values["seconds"] = round(values["seconds"], 4)
+        values["ms_per_frame"] = (
+            round(values["seconds"] * 1000 / values["frames"], 3) if values["frames"] else 0.0
+        )
+    return {
+        "stages": merged,
+        "bottleneck": max(merged, key=lambda stage: merged[stage]["seconds"]) if merged else None,
+        "wall_seconds": round(sum(timing.get("wall_seconds", 0.0) for timing in timings), 4),
+    }
+
+def frame_sink_for(proxy=None, thumbnails=None, end_frame: Optional[int] = None) -> Optional[Callable]:
+    """
+    FramePipeline frame_sink that feeds decoded frames to a ProxyWriter and a
+    ThumbnailCollector, or None when there is neither. Frames from
+    `end_frame` on are left out.
+    """
+    if proxy is None and thumbnails is None:
+        return None
+
+    def sink(frame_index: int, image: np.ndarray):
+        # The frame past the range that anchors interpolation belongs to the next range
+        if end_frame is not None and frame_index >= end_frame:
+            return
+        if proxy is not None:
+            proxy.write(image)
+        if thumbnails is not None:
+            thumbnails.add(frame_index, image)
+    return sink
+
+class FramePipeline:
+    """
+    Decodes, converts and hands out the frames of a video for pose inference.
+
+    A decoder thread reads frames into a ring of preallocated BGR buffers and
+    a converter thread resizes them and writes RGB into a second ring through
+    the cvtColor `dst` argument, while the caller runs inference on the frames
+    it iterates over. A stage only proceeds when the next ring has a free
+    slot, so memory stays bounded and decoding overlaps with inference.
+
+    Iterating yields (frame_index, rgb_image, in_range) for every analyzed
+    frame. `rgb_image` is a ring buffer that is reused once the loop moves on,
+    so it must not be kept. Frames before `start_frame` are warm-up frames
+    (in_range is False). Frames not on the stride are only grabbed: they
+    are still decoded, but never retrieved, converted or analyzed, so a
+    larger stride saves inference and conversion, not decoding.
+
+    `frame_sink`, when given, is called on the converter thread with the
+    index and full-size BGR image of every in-range frame, e.g. to encode a
+    playback proxy from frames that are decoded anyway. The image is a
+    ring buffer too.
+
+    The decoder also records, for every frame from `start_frame` on, its
+    presentation timestamp in milliseconds (`timestamps`) and whether it is
+    a keyframe (`keyframes`, frame indices), at no extra decoding cost.
+    """
+    def __init__(self, video_path: str, stride: int = 1, start_frame: int = 0,
+                 end_frame: Optional[int] = None, warmup_frames: int = 0,
+                 max_inference_size: Optional[int] = None, depth: Optional[int] = None,
+                 frame_sink: Optional[Callable[[int, np.ndarray], None]] = None):
+        self.video_path = video_path
+        self.stride = max(1, stride)
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.warmup_frames = warmup_frames
+        self.max_inference_size = max_inference_size
+        self.depth = max(1, depth or settings.ANALYSIS_PIPELINE_DEPTH)
+        self.frame_sink = frame_sink
+
+        # Index one past the last frame read from the video
+        self.frames_read = 0
+        self.keyframes: List[int] = []
+        self.timestamps = array("d")
+        self.timers = {"decode": StageTimer(), "convert": StageTimer(), "inference": StageTimer()}
+        self.wall_seconds = 0.0
+
+        # Buffer rings; slots are filled on first use once the frame size is known
+        self._bgr = [None] * self.depth
+        self._rgb = [None] * self.depth
+        self._resized = None
+        self._free_bgr = queue.Queue()
+        self._free_rgb = queue.Queue()
+        for slot in range(self.depth):
+            self._free_bgr.put(slot)
+            self._free_rgb.put(slot)
+        self._decoded = queue.Queue(maxsize=self.depth)
+        self._converted = queue.Queue(maxsize=self.depth)
+
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _get(self, source: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _put(self, target: queue.Queue, item):
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _decode(self):
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            frame_index = max(0, self.start_frame - self.warmup_frames)
+            if frame_index > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+            while not self._stop.is_set() and (self.end_frame is None or frame_index < self.end_frame):
+                if frame_index % self.stride != 0:
+                    # grab() still decodes skipped frames (inter frames need their
+                    # references); only the copy out and the colour conversion are saved
+                    started = time.perf_counter()
+                    if not cap.grab():
+                        break
+                    self._index_frame(cap, frame_index)
+                    self.timers["decode"].add(time.perf_counter() - started)
+                    frame_index += 1
+                    self.frames_read = frame_index
+                    continue
+
+                slot = self._get(self._free_bgr)
+                if slot is _END:
+                    break
+                started = time.perf_counter()
+                buffer = self._bgr[slot]
+                success, frame = cap.read() if buffer is None else cap.read(buffer)
+                if not success:
+                    self._free_bgr.put(slot)
+                    break
+                self._bgr[slot] = frame
+                self._index_frame(cap, frame_index)
+                self.timers["decode"].add(time.perf_counter() - started)
+
+                self._put(self._decoded, (frame_index, slot, frame_index >= self.start_frame))
+                frame_index += 1
+                self.frames_read = frame_index
+        except BaseException as e:
+            self._error = e
+        finally:
+            cap.release()
+            self._put(self._decoded, _END)
+
+    def _index_frame(self, cap: cv2.VideoCapture, frame_index: int):
+        if frame_index < self.start_frame:
+            return
+        self.timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            self.keyframes.append(frame_index)
+
+    def _convert(self):
+        try:
+            while True:
+                item = self._get(self._decoded)
+                if item is _END:
+                    break
+                frame_index, bgr_slot, in_range = item
+                rgb_slot = self._get(self._free_rgb)
+                if rgb_slot is _END:
+                    break
+
+                started = time.perf_counter()
+                frame = self._bgr[bgr_slot]
+                if self.frame_sink is not None and in_range:
+                    self.frame_sink(frame_index, frame)
+                height, width = frame.shape[:2]
+                size = inference_size(width, height, self.max_inference_size)
+                if size != (width, height):
+                    self._resized = cv2.resize(frame, size, dst=self._resized, interpolation=cv2.INTER_AREA)
+                    frame = self._resized
+                # Convert the BGR image to RGB straight into the ring buffer
+                self._rgb[rgb_slot] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb[rgb_slot])
+                self._free_bgr.put(bgr_slot)
+                self.timers["convert"].add(time.perf_counter() - started)
+
+                self._put(self._converted, (frame_index, rgb_slot, in_range))
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._put(self._converted, _END)
+
+    def __iter__(self):
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._decode, name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._convert, name="pipeline-convert", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(self._converted)
+                if item is _END:
+                    break
+                frame_index, slot, in_range = item
+                image = self._rgb[slot]
+                image.flags.writeable = False
+                inference_started = time.perf_counter()
+                yield frame_index, image, in_range
+                self.timers["inference"].add(time.perf_counter() - inference_started)
+                image.flags.writeable = True
+                self._free_rgb.put(slot)
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.wall_seconds = time.perf_counter() - started
+
+    def stage_timings(self) -> dict:
+        """
+        Busy time per stage; the stage with the most busy time is the bottleneck.
+        """
+        stages = {name: timer.summary() for name, timer in self.timers.items()}
+        return {
+            "stages": stages,
+            "bottleneck": max(stages, key=lambda stage: stages[stage]["seconds"]),
+            "wall_seconds": round(self.wall_seconds, 4),
+        }
@@ -0,0 +1,341 @@
+import os
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+from config import settings
+from landmarks import hip_center, pose_landmarks_array
+from metrics import compute_metrics_from_positions
+from pipeline import FramePipeline, frame_sink_for
+from proxy import ProxyWriter
+from timeline import ThumbnailCollector, range_timeline
+from roi import box_iou, crop_region, expand_box, landmark_box, landmarks_to_frame
+from schemas import AnalysisProfile
+from storage import LandmarkWriter, landmarks_path, open_landmark_array, player_landmarks_path
+
+# A detection continues a track when their boxes overlap at least this much
+MATCH_IOU = 0.3
+# Two tracks overlapping this much follow the same person; the younger one is dropped
+DUPLICATE_IOU = 0.7
+# Keyframes in a row without a matching detection before a track ends
+MAX_KEYFRAME_MISSES = 2
+# Frames copied at a time when a kept track is padded to the whole video
+PAD_COPY_FRAMES = 4096
+
+class HogPersonDetector:
+    """
+    People detector for keyframes: OpenCV's HOG descriptor with its default
+    pedestrian SVM. CPU only and needs no model files. Frames are shrunk to
+    at most `max_width` pixels wide first, which bounds the cost per keyframe.
+    """
+    def __init__(self, max_width: int = 640, min_confidence: float = 0.3,
+                 nms_threshold: float = 0.4):
+        self.max_width = max_width
+        self.min_confidence = min_confidence
+        self.nms_threshold = nms_threshold
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, image: np.ndarray) -> List[tuple]:
+        """Person boxes (x0, y0, x1, y1) in pixels of `image`."""
+        height, width = image.shape[:2]
+        scale = min(1.0, self.max_width / width)
+        if scale < 1.0:
+            image = cv2.resize(image, (round(width * scale), round(height * scale)),
+                               interpolation=cv2.INTER_AREA)
+        rects, weights = self.hog.detectMultiScale(image, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return []
+        rects = [[int(v) for v in rect] for rect in rects]
+        scores = [float(w) for w in np.ravel(weights)]
+        keep = cv2.dnn.NMSBoxes(rects, scores, self.min_confidence, self.nms_threshold)
+        return [
+            (x / scale, y / scale, (x + w) / scale, (y + h) / scale)
+            for x, y, w, h in (rects[i] for i in np.ravel(keep))
+        ]
+
+class PlayerTrack:
+    """
+    One tracked player: the box to crop around in the next frame, a Pose
+    instance of its own (so tracking state never mixes between players) and
+    a landmark file. While tracked, the file holds the frames from
+    `first_frame` on; write_padded() turns a kept track into a file covering
+    the whole video, NaN where the player was not seen.
+    """
+    def __init__(self, track_id: int, box: tuple, first_frame: int, pose, output_path: str):
+        self.track_id = track_id
+        self.box = box
+        self.pose = pose
+        self.first_frame = first_frame
+        self.last_frame = first_frame
+        self.output_path = output_path
+        self.writer = LandmarkWriter(output_path)
+        self.next_frame = first_frame  # next frame the file will hold
+        self.hip_positions = []
+        self.detected_frames = 0
+        self.lost_frames = 0       # analyzed frames in a row without landmarks
+        self.keyframe_misses = 0   # keyframes in a row without a matching detection
+        self.crop_buffer = None
+
+    def write(self, frame_index: int, landmarks: Optional[np.ndarray]):
+        # Frames skipped by the stride stay empty
+        self.writer.write_missing(frame_index - self.next_frame)
+        self.writer.write_frame(landmarks)
+        self.next_frame = frame_index + 1
+        if landmarks is None:
+            self.lost_frames += 1
+            return
+        self.lost_frames = 0
+        self.detected_frames += 1
+        self.last_frame = frame_index
+        center = hip_center(landmarks)
+        if center is not None:
+            self.hip_positions.append(center)
+
+    def close(self):
+        """Flushes and closes the track's file once it ends."""
+        self.writer.close()
+
+    def write_padded(self, path: str, total_frames: int):
+        """
+        Writes the closed track to `path` as a file of all `total_frames`
+        frames of the video and removes the track's own file.
+        """
+        frames = open_landmark_array(self.output_path)
+        with LandmarkWriter(path) as writer:
+            writer.write_missing(self.first_frame)
+            for start in range(0, len(frames), PAD_COPY_FRAMES):
+                writer.write_frames(frames[start:start + PAD_COPY_FRAMES])
+            writer.write_missing(total_frames - self.next_frame)
+        del frames
+        os.remove(self.output_path)
+
+class MultiPlayerTracker:
+    """
+    Follows several players through a video.
+
+    People are detected only on keyframes. Detections are matched to the
+    existing tracks by box overlap; unmatched ones start new tracks. Between
+    keyframes a track's box follows its own landmarks from the previous
+    frame, so every frame costs one Pose call per player on a small crop and
+    the detector runs only every `keyframe_interval` analyzed frames.
+
+    A track's file is closed as soon as the track ends, and tracks seen on
+    fewer than `min_track_frames` analyzed frames are deleted right away as
+    false detections; they never hold a file handle or disk space until the
+    end of the video.
+    """
+    def __init__(self, video_id: str, frame_width: int, frame_height: int,
+                 pose_factory: Callable, detector=None,
+                 keyframe_interval: Optional[int] = None, max_players: Optional[int] = None,
+                 padding: Optional[float] = None, max_crop_size: Optional[int] = None,
+                 min_track_frames: Optional[int] = None):
+        self.video_id = video_id
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.pose_factory = pose_factory
+        self.detector = detector or HogPersonDetector()
+        self.keyframe_interval = max(1, keyframe_interval or settings.MULTI_PLAYER_KEYFRAME_INTERVAL)
+        self.max_players = max_players or settings.MULTI_PLAYER_MAX_PLAYERS
+        self.padding = settings.ROI_PADDING if padding is None else padding
+        self.max_crop_size = max_crop_size or settings.ROI_MAX_CROP_SIZE
+        self.min_track_frames = (
+            settings.MULTI_PLAYER_MIN_TRACK_FRAMES if min_track_frames is None else min_track_frames
+        )
+        self.active: List[PlayerTrack] = []
+        self.ended: List[PlayerTrack] = []
+        self._idle_poses = []
+        self._next_track_id = 0
+        self.analyzed_frames = 0
+        self.keyframes = 0
+        self.detections = 0
+        self.tracks_discarded = 0
+
+    def _start_track(self, box: tuple, frame_index: int):
+        pose = self._idle_poses.pop() if self._idle_poses else self.pose_factory()
+        track = PlayerTrack(
+            self._next_track_id, box, frame_index, pose,
+            f"{player_landmarks_path(self.video_id, self._next_track_id)}.tmp"
+        )
+        self._next_track_id += 1
+        self.active.append(track)
+
+    @property
+    def tracks_started(self) -> int:
+        return self._next_track_id
+
+    def _end_track(self, track: PlayerTrack):
+        self.active.remove(track)
+        track.close()
+        if track.detected_frames < self.min_track_frames:
+            os.remove(track.output_path)
+            self.tracks_discarded += 1
+        else:
+            self.ended.append(track)
+        # Pose instances are reused by later tracks once their tracking state is dropped
+        track.pose.reset()
+        self._idle_poses.append(track.pose)
+        track.pose = None
+
+    def _associate(self, detections: List[tuple], frame_index: int):
+        """Greedily matches detections to tracks by box overlap, best overlaps first."""
+        pairs = sorted(
+            ((box_iou(track.box, detection), t, d)
+             for t, track in enumerate(self.active) for d, detection in enumerate(detections)),
+            reverse=True
+        )
+        matched_tracks, matched_detections = set(), set()
+        for iou, t, d in pairs:
+            if iou < MATCH_IOU:
+                break
+            if t in matched_tracks or d in matched_detections:
+                continue
+            matched_tracks.add(t)
+            matched_detections.add(d)
+            track = self.active[t]
+            track.keyframe_misses = 0
+            if track.lost_frames:
+                # Landmarks were lost; the detection shows where the player went
+                track.box = detections[d]
+
+        for t, track in enumerate(list(self.active)):
+            if t not in matched_tracks:
+                track.keyframe_misses += 1
+        for d, detection in enumerate(detections):
+            if d not in matched_detections and len(self.active) < self.max_players:
+                self._start_track(detection, frame_index)
+
+    def _drop_stale_tracks(self):
+        for track in list(self.active):
+            if track.keyframe_misses > MAX_KEYFRAME_MISSES or track.lost_frames > self.keyframe_interval:
+                self._end_track(track)
+        # Tracks that converged onto the same player: keep the one with more history
+        for track in sorted(self.active, key=lambda t: t.detected_frames):
+            if any(other is not track and box_iou(track.box, other.box) > DUPLICATE_IOU
+                   for other in self.active):
+                self._end_track(track)
+
+    def process(self, frame_index: int, image: np.ndarray):
+        """Runs detection (on keyframes) and per-player Pose on one analyzed RGB frame."""
+        if self.analyzed_frames % self.keyframe_interval == 0:
+            detections = self.detector.detect(image)
+            self.keyframes += 1
+            self.detections += len(detections)
+            self._associate(detections, frame_index)
+        self.analyzed_frames += 1
+
+        for track in self.active:
+            crop_box = expand_box(track.box, self.padding, self.frame_width, self.frame_height)
+            if crop_box is None:
+                track.write(frame_index, None)
+                continue
+            crop = crop_region(image, crop_box, self.max_crop_size, dst=track.crop_buffer)
+            track.crop_buffer = crop
+            crop.flags.writeable = False
+            landmarks = pose_landmarks_array(track.pose.process(crop))
+            crop.flags.writeable = True
+            if landmarks is not None:
+                landmarks = landmarks_to_frame(landmarks, crop_box, self.frame_width, self.frame_height)
+                box = landmark_box(landmarks, self.frame_width, self.frame_height)
+                if box is not None:
+                    track.box = box
+            # Without landmarks the box stays where it was until the next keyframe
+            track.write(frame_index, landmarks)
+        self._drop_stale_tracks()
+
+    def finish(self) -> List[PlayerTrack]:
+        """Ends every track and returns the kept ones in the order they started."""
+        for track in list(self.active):
+            self._end_track(track)
+        for pose in self._idle_poses:
+            pose.close()
+        self._idle_poses = []
+        return sorted(self.ended, key=lambda t: t.track_id)
+
+def run_multi_player_analysis(video_path: str, video_id: str, profile: AnalysisProfile,
+                              properties: dict, pose_factory: Callable, detector=None,
+                              progress: Optional[Callable[[int, list], None]] = None,
+                              proxy: Optional[ProxyWriter] = None,
+                              thumbnails: Optional[ThumbnailCollector] = None) -> dict:
+    """
+    Tracks every player of a video and writes one landmark file per player.
+
+    Tracks seen on fewer than MULTI_PLAYER_MIN_TRACK_FRAMES analyzed frames
+    are discarded as false detections when they end. The player seen the longest is the
+    primary player; their landmarks go to the video's regular landmark file
+    so single-player readers keep working. Returns the primary player's
+    frames in the layout of analyze_frame_range plus a "players" list with
+    every player's landmark file and metrics. `proxy` and `thumbnails`
+    receive the decoded frames; the proxy is closed at the end.
+    """
+    stride = profile.stride_for(properties["fps"])
+    width, height = properties["width"], properties["height"]
+    effective_fps = properties["fps"] / stride if properties["fps"] > 0 else 0
+    tracker = MultiPlayerTracker(video_id, width, height, pose_factory, detector)
+    pipeline = FramePipeline(video_path, stride, frame_sink=frame_sink_for(proxy, thumbnails))
+    reported_frames = 0
+    progress_interval = max(1, settings.ANALYSIS_PROGRESS_INTERVAL)
+
+    try:
+        for frame_index, image, _ in pipeline:
+            tracker.process(frame_index, image)
+            if progress is not None and frame_index + 1 - reported_frames >= progress_interval:
+                progress(frame_index + 1 - reported_frames, [])
+                reported_frames = frame_index + 1
+    except BaseException:
+        for track in tracker.finish():
+            os.remove(track.output_path)
+        if proxy is not None:
+            proxy.abort()
+        raise
+    kept = tracker.finish()
+    total_frames = pipeline.frames_read
+    if progress is not None and total_frames > reported_frames:
+        progress(total_frames - reported_frames, [])
+
+    primary = max(kept, key=lambda t: t.detected_frames, default=None)
+
+    players = []
+    for player, track in enumerate(kept):
+        path = landmarks_path(video_id) if track is primary else player_landmarks_path(video_id, player)
+        track.write_padded(path, total_frames)
+        players.append({
+            "player": player,
+            "primary": track is primary,
+            "landmarks_file": os.path.basename(path),
+            "first_frame": track.first_frame,
+            "last_frame": track.last_frame,
+            "detected_frames": track.detected_frames,
+            "basketball_metrics": compute_metrics_from_positions(
+                track.hip_positions, width, height, effective_fps
+            ).dict(),
+        })
+    if primary is None:
+        # Nobody was tracked: the landmark file is all empty frames
+        with LandmarkWriter(landmarks_path(video_id)) as writer:
+            writer.write_missing(total_frames)
+
+    return {
+        "start_frame": 0,
+        "frames": total_frames,
+        "landmarks_path": landmarks_path(video_id),
+        "hip_positions": np.array(primary.hip_positions if primary else [], dtype=np.float64).reshape(-1, 2),
+        "sampled_frames": tracker.analyzed_frames,
+        "detected_frames": primary.detected_frames if primary else 0,
+        "interpolated_frames": 0,
+        "inference_size": None,
+        "stage_timings": pipeline.stage_timings(),
+        "proxy": proxy.close() if proxy is not None else None,
+        "timeline": range_timeline(
+            0, total_frames, 0, pipeline.keyframes, pipeline.timestamps, thumbnails
+        ),
+        "players": players,
+        "tracking": {
+            "keyframe_interval": tracker.keyframe_interval,
+            "keyframes": tracker.keyframes,
+            "detections": tracker.detections,
+            "tracks_started": tracker.tracks_started,
+            "tracks_discarded": tracker.tracks_discarded,
+        },
+    }
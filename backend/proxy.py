@@ -0,0 +1,170 @@
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from config import settings
+from faststart import make_fast_start
+
+# Codecs tried in order: H.264 plays in every browser but needs an OpenCV
+# build with an H.264 encoder; MPEG-4 Part 2 is available in every build
+PROXY_CODECS = ("avc1", "mp4v")
+
+# First codec that opened in this process, so later proxies skip failing ones
+_working_codec: Optional[str] = None
+
+_END = object()
+
+def proxy_size(width: int, height: int, max_height: int) -> tuple:
+    """Frame size of the proxy: at most `max_height` tall, same aspect ratio, even sides."""
+    if height > max_height:
+        width, height = width * max_height / height, max_height
+    return max(2, int(width) // 2 * 2), max(2, int(height) // 2 * 2)
+
+def _open_writer(path: str, fps: float, size: tuple):
+    global _working_codec
+    codecs = (_working_codec,) if _working_codec else PROXY_CODECS
+    for codec in codecs:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if writer.isOpened():
+            _working_codec = codec
+            return writer, codec
+        writer.release()
+    raise RuntimeError(f"No video encoder available for {', '.join(codecs)}")
+
+class ProxyWriter:
+    """
+    Writes a low-resolution playback rendition of a video from frames that
+    are decoded anyway, e.g. by the analysis pipeline.
+
+    Frames are shrunk to PROXY_MAX_HEIGHT on the caller's thread and encoded
+    on a writer thread, so encoding overlaps decoding; a bounded queue keeps
+    memory flat. On close the file is made fast start (moov first) and moved
+    to `path`. Encoder failures are recorded instead of raised: a missing
+    proxy must not fail the analysis that feeds it.
+    """
+    def __init__(self, path: str, fps: float, max_height: Optional[int] = None,
+                 fast_start: bool = True, depth: int = 8):
+        self.path = path
+        self.fps = fps if fps > 0 else settings.FRAME_RATE
+        self.max_height = max_height or settings.PROXY_MAX_HEIGHT
+        self.fast_start = fast_start
+        self.frames_written = 0
+        self.encode_seconds = 0.0
+        self.codec = None
+        self.size = None
+        self.error: Optional[str] = None
+        self._temporary_path = f"{path}.tmp.mp4"
+        self._queue = queue.Queue(maxsize=depth)
+        self._thread = threading.Thread(target=self._run, name="proxy-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, frame: np.ndarray):
+        """Queues a BGR frame. The frame is not kept, so ring buffers can be passed."""
+        if self.error is not None:
+            return
+        if self.size is None:
+            self.size = proxy_size(frame.shape[1], frame.shape[0], self.max_height)
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        self._queue.put(frame)
+
+    def _run(self):
+        writer = None
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _END:
+                    break
+                if self.error is not None:
+                    continue
+                started = time.perf_counter()
+                if writer is None:
+                    writer, self.codec = _open_writer(self._temporary_path, self.fps, self.size)
+                writer.write(frame)
+                self.frames_written += 1
+                self.encode_seconds += time.perf_counter() - started
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            # Keep draining so write() never blocks on a full queue
+            while self._queue.get() is not _END:
+                pass
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def close(self) -> Optional[dict]:
+        """
+        Finishes the proxy and returns its description for the analysis
+        metadata, or None when no proxy could be written.
+        """
+        self._queue.put(_END)
+        self._thread.join()
+        if self.error is None and self.frames_written:
+            try:
+                started = time.perf_counter()
+                if self.fast_start:
+                    make_fast_start(self._temporary_path)
+                os.replace(self._temporary_path, self.path)
+                self.encode_seconds += time.perf_counter() - started
+            except (OSError, ValueError) as e:
+                self.error = f"{type(e).__name__}: {e}"
+        if self.error is not None or not self.frames_written:
+            if self.error is not None:
+                print(f"Could not write proxy {os.path.basename(self.path)}: {self.error}")
+            self._remove_temporary()
+            return None
+        return {
+            "file": os.path.basename(self.path),
+            "codec": self.codec,
+            "width": self.size[0],
+            "height": self.size[1],
+            "fps": round(self.fps, 4),
+            "frames": self.frames_written,
+            "bytes": os.path.getsize(self.path),
+            "encode_seconds": round(self.encode_seconds, 4),
+        }
+
+    def abort(self):
+        """Stops writing and removes what was written."""
+        self.error = self.error or "aborted"
+        self._queue.put(_END)
+        self._thread.join()
+        self._remove_temporary()
+
+    def _remove_temporary(self):
+        if os.path.exists(self._temporary_path):
+            os.remove(self._temporary_path)
+
+def concatenate_proxies(part_paths: List[str], path: str, fps: float) -> Optional[dict]:
+    """
+    Joins the proxies of consecutive segments into one fast-start proxy and
+    removes the parts. The parts are already small, so decoding and
+    re-encoding them costs a fraction of the analysis.
+    """
+    writer = ProxyWriter(path, fps)
+    try:
+        for part_path in part_paths:
+            cap = cv2.VideoCapture(part_path)
+            try:
+                while True:
+                    success, frame = cap.read()
+                    if not success:
+                        break
+                    writer.write(frame)
+            finally:
+                cap.release()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+    return writer.close()
@@ -0,0 +1,87 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Boxes are (x0, y0, x1, y1) in pixels of the full frame, x1/y1 exclusive
+
+def box_iou(a: tuple, b: tuple) -> float:
+    """Intersection over union of two boxes."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def expand_box(box: tuple, padding: float, frame_width: int, frame_height: int,
+               square: bool = True, min_size: int = 32) -> Optional[tuple]:
+    """
+    Grows a box by `padding` (a fraction of its size on every side), makes it
+    square so the person keeps their aspect ratio once the crop is resized,
+    and clips it to the frame. Returns None when nothing of it is in the frame.
+    """
+    x0, y0, x1, y1 = box
+    width, height = max(x1 - x0, 1), max(y1 - y0, 1)
+    center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+    width, height = width * (1 + 2 * padding), height * (1 + 2 * padding)
+    if square:
+        width = height = max(width, height)
+    width, height = max(width, min_size), max(height, min_size)
+    x0 = int(max(0, round(center_x - width / 2)))
+    y0 = int(max(0, round(center_y - height / 2)))
+    x1 = int(min(frame_width, round(center_x + width / 2)))
+    y1 = int(min(frame_height, round(center_y + height / 2)))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return x0, y0, x1, y1
+
+def landmark_box(landmarks: np.ndarray, frame_width: int, frame_height: int,
+                 visibility_threshold: float = 0.3) -> Optional[tuple]:
+    """
+    Pixel bounding box of the landmarks above `visibility_threshold` from
+    (33, 4) full-frame normalized landmarks, or None when too few are visible.
+    """
+    visible = landmarks[landmarks[:, 3] > visibility_threshold]
+    if len(visible) < 4:
+        return None
+    x0, y0 = visible[:, 0].min() * frame_width, visible[:, 1].min() * frame_height
+    x1, y1 = visible[:, 0].max() * frame_width, visible[:, 1].max() * frame_height
+    return x0, y0, x1, y1
+
+def crop_region(image: np.ndarray, box: tuple, max_size: Optional[int] = None,
+                dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The part of `image` inside `box`, shrunk so its longest side is at most
+    `max_size` pixels. The result is a copy in `dst` when the sizes match,
+    so callers can keep reusing one buffer per track.
+    """
+    x0, y0, x1, y1 = box
+    region = image[y0:y1, x0:x1]
+    height, width = region.shape[:2]
+    longest = max(width, height)
+    if max_size and longest > max_size:
+        scale = max_size / longest
+        size = max(1, round(width * scale)), max(1, round(height * scale))
+        if dst is not None and dst.shape[:2] != (size[1], size[0]):
+            dst = None
+        return cv2.resize(region, size, dst=dst, interpolation=cv2.INTER_AREA)
+    if dst is not None and dst.shape == region.shape:
+        np.copyto(dst, region)
+        return dst
+    return np.ascontiguousarray(region)
+
+def landmarks_to_frame(landmarks: np.ndarray, box: tuple, frame_width: int,
+                       frame_height: int) -> np.ndarray:
+    """
+    Maps (33, 4) landmarks normalized to a crop back to coordinates
+    normalized to the full frame. z is scaled like x, as MediaPipe does.
+    """
+    x0, y0, x1, y1 = box
+    crop_width, crop_height = x1 - x0, y1 - y0
+    mapped = landmarks.copy()
+    mapped[:, 0] = (landmarks[:, 0] * crop_width + x0) / frame_width
+    mapped[:, 1] = (landmarks[:, 1] * crop_height + y0) / frame_height
+    mapped[:, 2] = landmarks[:, 2] * crop_width / frame_width
+    return mapped
@@ -0,0 +1,99 @@
+import hashlib
+import json
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from config import settings
+
+# Pydantic models shared by the API and the analysis workers
+class PoseLandmark(BaseModel):
+    x: float
+    y: float
+    z: float
+    visibility: float
+
+class BasketballMetrics(BaseModel):
+    # Core Movement Metrics
+    total_distance_covered: float  # Total distance in feet
+    average_speed: float          # Average speed in mph
+    max_speed: float              # Maximum speed in mph
+    high_intensity_sprints: int   # Number of sprints > 15 mph
+    
+    # Trajectory Analysis
+    court_coverage_percentage: float  # Percentage of court area covered
+    movement_efficiency: float        # Direct vs. total distance ratio
+    
+    # Court Zone Distribution
+    court_zone_distribution: dict     # Time spent in each zone
+    paint_time_percentage: float      # Time in paint area
+    three_point_time_percentage: float # Time in 3-point area
+    
+    # Performance Indicators
+    acceleration_events: int          # Number of rapid speed changes
+    direction_changes: int            # Number of significant direction changes
+
+class VideoAnalysis(BaseModel):
+    video_id: str
+    status: str
+    total_frames: int
+    processed_frames: int
+    pose_landmarks: List[Optional[List[PoseLandmark]]]
+    basketball_metrics: BasketballMetrics
+    analysis_metadata: dict
+
+class AnalysisProfile(BaseModel):
+    """
+    Controls how much of a video is pushed through pose inference.
+    """
+    frame_stride: int = Field(1, ge=1)                   # Analyze every Nth frame
+    target_fps: Optional[float] = Field(None, gt=0)      # Overrides frame_stride when set
+    max_inference_size: Optional[int] = Field(None, ge=64)  # Longest frame side fed to Pose, in pixels
+    multi_player: bool = False                           # Track every player instead of the most prominent one
+    roi: bool = False                                    # Crop to the player's region of the previous frame
+    pose_cascade: bool = False                           # Lite Pose model, heavier one only where it is unsure
+    
+    @classmethod
+    def from_settings(cls) -> "AnalysisProfile":
+        return cls(
+            frame_stride=settings.ANALYSIS_FRAME_STRIDE,
+            target_fps=settings.ANALYSIS_TARGET_FPS,
+            max_inference_size=settings.ANALYSIS_MAX_INFERENCE_SIZE,
+            roi=settings.ANALYSIS_ROI,
+            pose_cascade=settings.ANALYSIS_POSE_CASCADE,
+        )
+    
+    def stride_for(self, fps: float) -> int:
+        """Frame stride to use for a video recorded at `fps`."""
+        if self.target_fps and fps > 0:
+            return max(1, round(fps / self.target_fps))
+        return self.frame_stride
+    
+    def fingerprint(self) -> str:
+        """
+        Hash of everything that shapes an analysis besides the video itself:
+        this profile and the Pose model settings.
+        """
+        parameters = {
+            **self.dict(),
+            "model_complexity": settings.POSE_MODEL_COMPLEXITY,
+            "min_detection_confidence": settings.POSE_MIN_DETECTION_CONFIDENCE,
+            "min_tracking_confidence": settings.POSE_MIN_TRACKING_CONFIDENCE,
+        }
+        if self.multi_player:
+            parameters.update(
+                max_players=settings.MULTI_PLAYER_MAX_PLAYERS,
+                keyframe_interval=settings.MULTI_PLAYER_KEYFRAME_INTERVAL,
+                min_track_frames=settings.MULTI_PLAYER_MIN_TRACK_FRAMES,
+            )
+        if self.multi_player or self.roi:
+            parameters.update(
+                roi_padding=settings.ROI_PADDING,
+                roi_max_crop_size=settings.ROI_MAX_CROP_SIZE,
+            )
+        if self.pose_cascade:
+            parameters.update(
+                cascade_lite_complexity=settings.POSE_CASCADE_LITE_COMPLEXITY,
+                cascade_heavy_complexity=settings.POSE_CASCADE_HEAVY_COMPLEXITY,
+                cascade_visibility_threshold=settings.POSE_CASCADE_VISIBILITY_THRESHOLD,
+            )
+        return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:16]
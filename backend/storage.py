@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+from typing import List, Optional
+
+import numpy as np
+
+from config import settings
+from landmarks import LandmarkTrack, NUM_LANDMARKS
+
+# On-disk analysis layout (format version 1):
+#   {video_id}.landmarks.f32  raw little-endian float32, (frames, 33, 4) = x, y, z, visibility;
+#                             frames without a detected pose are NaN
+#   {video_id}_summary.json   metrics and metadata; written last, marks the analysis complete
+# Analyses from before the columnar format live in {video_id}_analysis.json.
+#
+# Uploads of identical content with an identical analysis profile share one
+# analysis: content_index/{sha256}-{profile fingerprint}.json names the video
+# that owns it, and {video_id}_alias.json points a later upload at that video.
+FORMAT_VERSION = 1
+LANDMARK_DTYPE = np.dtype("<f4")
+FRAME_BYTES = NUM_LANDMARKS * 4 * LANDMARK_DTYPE.itemsize
+
+def landmarks_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}.landmarks.f32")
+
+def player_landmarks_path(video_id: str, player: int) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}.player{player}.landmarks.f32")
+
+def proxy_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}_proxy.mp4")
+
+def sprite_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}_sprite.jpg")
+
+def video_index_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}_index.json")
+
+def summary_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}_summary.json")
+
+def legacy_analysis_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}_analysis.json")
+
+def alias_path(video_id: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, f"{video_id}_alias.json")
+
+def content_index_path(content_hash: str, profile_fingerprint: str) -> str:
+    return os.path.join(settings.ANALYSIS_DIRECTORY, "content_index", f"{content_hash}-{profile_fingerprint}.json")
+
+def _file_version(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def analysis_version(video_id: str) -> Optional[tuple]:
+    """
+    Modification times and sizes of the files an analysis is read from, or
+    None when it does not exist. Changes whenever the analysis is rewritten.
+    """
+    resolved_id = resolve_video_id(video_id)
+    summary_version = _file_version(summary_path(resolved_id))
+    if summary_version is not None:
+        return (resolved_id, summary_version, _file_version(landmarks_path(resolved_id)))
+    legacy_version = _file_version(legacy_analysis_path(resolved_id))
+    if legacy_version is not None:
+        return (resolved_id, legacy_version)
+    return None
+
+def _write_json_atomic(path: str, data: dict):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, default=str)
+    os.replace(temp_path, path)
+
+def resolve_video_id(video_id: str) -> str:
+    """The video whose analysis `video_id` uses: itself, or the one it is an alias of."""
+    path = alias_path(video_id)
+    if not os.path.exists(path):
+        return video_id
+    with open(path) as f:
+        return json.load(f)["video_id"]
+
+def save_alias(video_id: str, target_video_id: str):
+    """Makes `video_id` resolve to the analysis of `target_video_id`."""
+    _write_json_atomic(alias_path(video_id), {"video_id": target_video_id})
+
+def find_content_entry(content_hash: str, profile_fingerprint: str) -> Optional[dict]:
+    """
+    Content index entry ({"video_id", "upload_path"}) of an earlier upload
+    with the same content and analysis profile, or None.
+    """
+    path = content_index_path(content_hash, profile_fingerprint)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def register_content(content_hash: str, profile_fingerprint: str, video_id: str, upload_path: str):
+    path = content_index_path(content_hash, profile_fingerprint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_json_atomic(path, {"video_id": video_id, "upload_path": upload_path})
+
+def analysis_exists(video_id: str) -> bool:
+    video_id = resolve_video_id(video_id)
+    return os.path.exists(summary_path(video_id)) or os.path.exists(legacy_analysis_path(video_id))
+
+class LandmarkWriter:
+    """
+    Appends frames to a landmark file as they are analyzed, so a session
+    never has to be held in memory. Writes are batched in `buffer_frames`
+    chunks.
+    
+    With `keep_frames`, the first that many frames of an existing file are
+    kept and writing continues after them (e.g. when resuming from a
+    checkpoint); anything the file held beyond them is cut off.
+    """
+    def __init__(self, path: str, buffer_frames: int = 256, keep_frames: int = 0):
+        self.path = path
+        if keep_frames > 0:
+            if not os.path.exists(path) or os.path.getsize(path) < keep_frames * FRAME_BYTES:
+                raise ValueError(f"{os.path.basename(path)} holds fewer than {keep_frames} frames")
+            self._file = open(path, "r+b")
+            self._file.truncate(keep_frames * FRAME_BYTES)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, "wb")
+        self._buffer = np.full((buffer_frames, NUM_LANDMARKS, 4), np.nan, dtype=LANDMARK_DTYPE)
+        self._buffered = 0
+        self.frames_written = max(keep_frames, 0)
+
+    def _reserve(self) -> int:
+        if self._buffered == len(self._buffer):
+            self.flush()
+        index = self._buffered
+        self._buffered += 1
+        return index
+
+    def write_frame(self, landmarks: Optional[np.ndarray]):
+        """Appends one (33, 4) frame, or a frame without a detection when None."""
+        index = self._reserve()
+        self._buffer[index] = np.nan if landmarks is None else landmarks
+
+    def write_frames(self, frames: np.ndarray):
+        """Appends a (n, 33, 4) block; NaN rows mark frames without a detection."""
+        self.flush()
+        self._file.write(np.ascontiguousarray(frames, dtype=LANDMARK_DTYPE).tobytes())
+        self.frames_written += len(frames)
+
+    def write_missing(self, count: int):
+        for _ in range(max(count, 0)):
+            self.write_frame(None)
+
+    def flush(self):
+        if self._buffered:
+            self._file.write(self._buffer[:self._buffered].tobytes())
+            self.frames_written += self._buffered
+            self._buffered = 0
+        self._file.flush()
+
+    def sync(self):
+        """Flushes and forces the frames written so far to disk."""
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def concatenate_landmark_files(part_paths: List[str], path: str):
+    """Joins per-segment landmark files in order and removes the parts."""
+    with open(path, "wb") as target:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part:
+                shutil.copyfileobj(part, target, 1024 * 1024)
+    for part_path in part_paths:
+        os.remove(part_path)
+
+def open_landmark_array(path: str) -> np.ndarray:
+    """Memory-maps a landmark file as a read-only (frames, 33, 4) array."""
+    frames = os.path.getsize(path) // FRAME_BYTES
+    if frames == 0:
+        return np.empty((0, NUM_LANDMARKS, 4), dtype=LANDMARK_DTYPE)
+    return np.memmap(path, dtype=LANDMARK_DTYPE, mode="r", shape=(frames, NUM_LANDMARKS, 4))
+
+def read_landmarks(path: str, start: int = 0, stop: Optional[int] = None) -> LandmarkTrack:
+    """
+    LandmarkTrack over frames [start, stop) of a landmark file. Only the
+    requested slice is paged in from disk.
+    """
+    data = open_landmark_array(path)[start:stop]
+    return LandmarkTrack(data, ~np.isnan(data[:, 0, 0]))
+
+def save_summary(video_id: str, summary: dict):
+    """Writes the summary atomically; its presence marks the analysis as complete."""
+    _write_json_atomic(summary_path(video_id), summary)
+
+def load_summary(video_id: str) -> Optional[dict]:
+    """Summary of a columnar analysis; aliases resolve to the analysis they share."""
+    path = summary_path(resolve_video_id(video_id))
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        summary = json.load(f)
+    summary["video_id"] = video_id
+    return summary
+
+def _load_legacy_analysis(video_id: str) -> Optional[dict]:
+    path = legacy_analysis_path(resolve_video_id(video_id))
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        analysis = json.load(f)
+    analysis["video_id"] = video_id
+    return analysis
+
+def load_analysis_summary(video_id: str) -> Optional[dict]:
+    """
+    Metrics and metadata of an analysis without its landmarks. Legacy JSON
+    analyses have to be parsed in full to get there.
+    """
+    summary = load_summary(video_id)
+    if summary is not None:
+        return summary
+    analysis = _load_legacy_analysis(video_id)
+    if analysis is not None:
+        analysis.pop("pose_landmarks", None)
+    return analysis
+
+def open_analysis_landmarks(video_id: str, player: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    (frames, 33, 4) landmarks of a finished analysis with NaN for frames
+    without a detection. Memory-mapped for columnar analyses, so slicing it
+    only reads the slice; legacy JSON analyses are loaded in full. `player`
+    selects a player of a multi-player analysis. Returns None when the
+    analysis (or player) does not exist or stored no pose landmarks.
+    """
+    summary = load_summary(video_id)
+    if summary is not None:
+        landmark_file = summary["landmarks"]["file"]
+        if player is not None:
+            players = summary["analysis_metadata"].get("players") or []
+            entry = next((p for p in players if p["player"] == player), None)
+            if entry is None:
+                return None
+            landmark_file = entry["landmarks_file"]
+        return open_landmark_array(os.path.join(settings.ANALYSIS_DIRECTORY, landmark_file))
+    if player is not None:
+        return None
+    analysis = _load_legacy_analysis(video_id)
+    if analysis is None or analysis.get("pose_landmarks") is None:
+        return None
+    track = LandmarkTrack.from_list(analysis["pose_landmarks"])
+    data = track.data.copy()
+    data[~track.mask] = np.nan
+    return data
+
+def load_analysis_dict(video_id: str) -> Optional[dict]:
+    """
+    Full analysis in the VideoAnalysis layout, from the columnar files or a
+    legacy JSON file. Returns None when the analysis does not exist.
+    """
+    summary = load_summary(video_id)
+    if summary is None:
+        return _load_legacy_analysis(video_id)
+
+    analysis = {key: value for key, value in summary.items() if key != "landmarks"}
+    landmark_file = os.path.join(settings.ANALYSIS_DIRECTORY, summary["landmarks"]["file"])
+    analysis["pose_landmarks"] = read_landmarks(landmark_file).to_list()
+    return analysis
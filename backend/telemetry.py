@@ -0,0 +1,265 @@
+import math
+import os
+import threading
+from typing import Callable, Dict, Optional, Sequence
+
+from config import settings
+from jobs import COMPLETED, job_registry
+from storage import _write_json_atomic, load_summary
+
+# Prometheus text exposition format, version 0.0.4 (the response adds charset=utf-8)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+JOB_SECONDS_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+JOB_FPS_BUCKETS = (1, 5, 10, 15, 20, 30, 45, 60, 90, 120, 240)
+RATIO_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+class _Metric:
+    """A metric family with optional labels. Updates take a lock, so any thread may record."""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """(suffix, label names, label values, value) of every series."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [("", self.labelnames, key, value) for key, value in items]
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. With `function`, the value is read when
+    the metrics are rendered instead of being set.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.function is not None:
+            return [("", (), (), self.function())]
+        with self._lock:
+            items = list(self._values.items())
+        return [("", self.labelnames, key, value) for key, value in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series["counts"]), series["sum"]) for key, series in self._values.items()]
+        samples = []
+        names = self.labelnames + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(("_bucket", names, key + (_format_value(bound),), cumulative))
+            samples.append(("_sum", self.labelnames, key, total))
+            samples.append(("_count", self.labelnames, key, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """The metrics of one process, rendered for GET /metrics."""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to produce the response headers, per route",
+    ("method", "route", "status"),
+)
+analysis_jobs = registry.counter(
+    "analysis_jobs_total", "Analysis jobs that finished, by final status", ("status",)
+)
+analysis_job_duration = registry.histogram(
+    "analysis_job_duration_seconds", "Wall time of finished analysis jobs, from start to end",
+    buckets=JOB_SECONDS_BUCKETS,
+)
+analysis_job_fps = registry.histogram(
+    "analysis_job_frames_per_second", "Video frames covered per second of a completed job",
+    buckets=JOB_FPS_BUCKETS,
+)
+analysis_frames = registry.counter(
+    "analysis_frames_total", "Video frames covered by completed jobs"
+)
+analysis_detected_frames = registry.counter(
+    "analysis_detected_frames_total", "Analyzed frames of completed jobs in which a pose was detected"
+)
+analysis_sampled_frames = registry.counter(
+    "analysis_sampled_frames_total", "Frames of completed jobs that went through pose inference"
+)
+analysis_detection_rate = registry.histogram(
+    "analysis_pose_detection_ratio", "Share of the analyzed frames with a detected pose, per completed job",
+    buckets=RATIO_BUCKETS,
+)
+analysis_stage_seconds = registry.counter(
+    "analysis_stage_seconds_total", "Busy time of each analysis pipeline stage", ("stage",)
+)
+analysis_stage_ms_per_frame = registry.histogram(
+    "analysis_stage_ms_per_frame", "Busy milliseconds per frame of each pipeline stage, per completed job",
+    ("stage",), buckets=STAGE_MS_BUCKETS,
+)
+analysis_bottlenecks = registry.counter(
+    "analysis_bottleneck_total", "Completed jobs by the pipeline stage with the most busy time", ("stage",)
+)
+analysis_persistence = registry.counter(
+    "analysis_stats_persistence_total", "Completed jobs whose stats were written to the database, by outcome",
+    ("outcome",)
+)
+
+def job_profile(video_id: str, job: dict, summary: Optional[dict]) -> dict:
+    """Per-job profile: outcome, throughput and, for completed jobs, where the time went."""
+    metadata = (summary or {}).get("analysis_metadata", {})
+    profile = {
+        "video_id": video_id,
+        "status": job["status"],
+        "error": job["error"],
+        "frames_processed": job["frames_processed"],
+        "elapsed_seconds": job["elapsed_seconds"],
+        "fps": job["fps"],
+        "persistence": job["persistence"],
+    }
+    if summary is not None:
+        sampled = metadata.get("analyzed_frames") or 0
+        detected = summary["processed_frames"] - (metadata.get("interpolated_frames") or 0)
+        profile.update({
+            "analyzed_frames": sampled,
+            "detected_frames": detected,
+            "pose_detection_rate": round(detected / sampled, 4) if sampled else 0.0,
+            "frame_stride": metadata.get("frame_stride"),
+            "segments": metadata.get("segments"),
+            "stage_timings": metadata.get("stage_timings"),
+        })
+        for key in ("model_cascade", "roi", "tracking"):
+            if key in metadata:
+                profile[key] = metadata[key]
+    return profile
+
+def record_analysis_job(video_id: str):
+    """
+    Records a finished job: its outcome and, for completed jobs, throughput,
+    detection rate and per-stage timings from the saved summary. Workers
+    only write the summary, so this runs in the API process once the job's
+    future is done. Writes the job profile to JOB_PROFILE_DIRECTORY when set.
+    """
+    job = job_registry.get(video_id)
+    if job is None:
+        return
+    analysis_jobs.inc(status=job["status"])
+    summary = load_summary(video_id) if job["status"] == COMPLETED else None
+    profile = job_profile(video_id, job, summary)
+
+    if summary is not None:
+        analysis_job_duration.observe(job["elapsed_seconds"])
+        analysis_job_fps.observe(job["fps"])
+        analysis_frames.inc(job["frames_processed"])
+        analysis_detected_frames.inc(profile["detected_frames"])
+        analysis_sampled_frames.inc(profile["analyzed_frames"])
+        if profile["analyzed_frames"]:
+            analysis_detection_rate.observe(profile["pose_detection_rate"])
+        timings = profile.get("stage_timings") or {}
+        for stage, values in timings.get("stages", {}).items():
+            analysis_stage_seconds.inc(values["seconds"], stage=stage)
+            if values["frames"]:
+                analysis_stage_ms_per_frame.observe(values["ms_per_frame"], stage=stage)
+        if timings.get("bottleneck"):
+            analysis_bottlenecks.inc(stage=timings["bottleneck"])
+    if job["persistence"] is not None:
+        analysis_persistence.inc(outcome="failed" if "error" in job["persistence"] else "saved")
+
+    if settings.JOB_PROFILE_DIRECTORY:
+        os.makedirs(settings.JOB_PROFILE_DIRECTORY, exist_ok=True)
+        _write_json_atomic(os.path.join(settings.JOB_PROFILE_DIRECTORY, f"{video_id}_profile.json"), profile)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Backend modules are imported flat, as the server runs them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings and the job registry are read at import time; keep test runs out of the working tree
+_workdir = tempfile.mkdtemp(prefix="backend_tests_")
+os.environ.setdefault("UPLOAD_DIRECTORY", os.path.join(_workdir, "uploads"))
+os.environ.setdefault("ANALYSIS_DIRECTORY", os.path.join(_workdir, "analysis_results"))
+os.environ.setdefault("JOB_REGISTRY_PATH", os.path.join(_workdir, "jobs.sqlite3"))
@@ -0,0 +1,208 @@
+"""
+Parity reference for the metrics engine: the frame-by-frame implementation
+compute_basketball_metrics replaced, random landmark tracks to feed both and
+a comparison within rounding tolerance. Used by tests/test_metrics.py and
+benchmarks/bench_metrics.py.
+"""
+import math
+
+import numpy as np
+
+from landmarks import HIP_VISIBILITY_THRESHOLD, LEFT_HIP, RIGHT_HIP, LandmarkTrack
+from metrics import REAL_COURT_LENGTH, REAL_COURT_WIDTH, empty_basketball_metrics
+from schemas import BasketballMetrics
+
+# Allowed absolute difference per metric; values are rounded to 1 or 2 decimals
+TOLERANCES = {
+    "total_distance_covered": 0.011,
+    "average_speed": 0.011,
+    "max_speed": 0.011,
+    "court_coverage_percentage": 0.11,
+    "movement_efficiency": 0.11,
+    "paint_time_percentage": 0.11,
+    "three_point_time_percentage": 0.11,
+}
+
+def random_track(rng: np.random.Generator, frames: int) -> LandmarkTrack:
+    """Random-walk hip track with detection gaps, hidden hips and pauses."""
+    steps = rng.normal(0, rng.uniform(0.001, 0.05), size=(frames, 2))
+    steps[rng.random(frames) < 0.1] = 0.0  # standing still
+    positions = rng.uniform(-0.1, 1.1, size=2) + np.cumsum(steps, axis=0)
+    data = rng.random((frames, 33, 4)).astype(np.float32)
+    data[:, LEFT_HIP, :2] = positions + rng.normal(0, 0.01, size=(frames, 2))
+    data[:, RIGHT_HIP, :2] = 2 * positions - data[:, LEFT_HIP, :2]
+    mask = rng.random(frames) > rng.uniform(0, 0.3)
+    return LandmarkTrack(data, mask)
+
+def compare(expected, actual) -> list:
+    problems = []
+    for name, value in expected.dict().items():
+        other = getattr(actual, name)
+        if name == "court_zone_distribution":
+            for zone, share in value.items():
+                if abs(share - other[zone]) > 1e-6:
+                    problems.append(f"{name}[{zone}]: {share} != {other[zone]}")
+        elif abs(value - other) > TOLERANCES.get(name, 0):
+            problems.append(f"{name}: {value} != {other}")
+    return problems
+
+def reference_basketball_metrics(pose_landmarks: LandmarkTrack, court_width: float,
+                                 court_height: float, fps: float) -> BasketballMetrics:
+    """
+    Frame-by-frame implementation the vectorized engine replaced, kept as the
+    parity reference for compute_basketball_metrics.
+    """
+    if len(pose_landmarks) < 2:
+        return empty_basketball_metrics()
+    
+    PIXELS_PER_FOOT_X = court_width / REAL_COURT_LENGTH
+    PIXELS_PER_FOOT_Y = court_height / REAL_COURT_WIDTH
+    
+    # Extract hip center positions (landmarks 23 and 24 are hips), using the
+    # average of left and right hip for center of mass
+    hip_centers, hips_visible = pose_landmarks.hip_centers(visibility_threshold=HIP_VISIBILITY_THRESHOLD)
+    valid_positions = [tuple(pos) for pos in hip_centers[hips_visible].tolist()]
+    
+    if len(valid_positions) < 2:
+        return empty_basketball_metrics()
+    
+    # Calculate distances and speeds in real-world units
+    distances = []
+    speeds = []
+    direction_changes = 0
+    
+    for i in range(1, len(valid_positions)):
+        prev = valid_positions[i-1]
+        curr = valid_positions[i]
+        
+        # Convert pixel distances to real-world feet
+        pixel_distance = ((curr[0] - prev[0])**2 + (curr[1] - prev[1])**2)**0.5
+        real_distance = pixel_distance / ((PIXELS_PER_FOOT_X + PIXELS_PER_FOOT_Y) / 2)
+        distances.append(real_distance)
+        
+        # Calculate speed in mph
+        time_diff = 1.0 / fps if fps > 0 else 0.033  # seconds per frame
+        speed_fps = real_distance / time_diff  # feet per second
+        speed_mph = speed_fps * 0.681818  # Convert to mph
+        speeds.append(speed_mph)
+        
+        # Detect direction changes
+        if i > 1:
+            prev_prev = valid_positions[i-2]
+            # Calculate direction vectors
+            dir1_x = prev[0] - prev_prev[0]
+            dir1_y = prev[1] - prev_prev[1]
+            dir2_x = curr[0] - prev[0]
+            dir2_y = curr[1] - prev[1]
+            
+            # Calculate angle between directions
+            if (dir1_x != 0 or dir1_y != 0) and (dir2_x != 0 or dir2_y != 0):
+                dot_product = dir1_x * dir2_x + dir1_y * dir2_y
+                mag1 = (dir1_x**2 + dir1_y**2)**0.5
+                mag2 = (dir2_x**2 + dir2_y**2)**0.5
+                if mag1 > 0 and mag2 > 0:
+                    cos_angle = dot_product / (mag1 * mag2)
+                    cos_angle = max(-1, min(1, cos_angle))
+                    angle = math.acos(cos_angle)
+                    if angle > math.pi / 3:  # 60 degrees threshold
+                        direction_changes += 1
+    
+    # Calculate core metrics
+    total_distance = sum(distances)
+    avg_speed = sum(speeds) / len(speeds) if speeds else 0
+    max_speed = max(speeds) if speeds else 0
+    
+    # Calculate high-intensity sprints (> 15 mph)
+    high_intensity_sprints = sum(1 for speed in speeds if speed > 15.0)
+    
+    # Calculate acceleration events
+    acceleration_threshold = 3.0  # mph/s
+    acceleration_events = 0
+    for i in range(1, len(speeds)):
+        time_diff = 1.0 / fps if fps > 0 else 0.033
+        if time_diff > 0:
+            acceleration = abs(speeds[i] - speeds[i-1]) / time_diff
+            if acceleration > acceleration_threshold:
+                acceleration_events += 1
+    
+    # Calculate court zone distribution
+    zone_counts = {"paint": 0, "mid_range": 0, "three_point": 0, "baseline": 0}
+    paint_time = 0
+    three_point_time = 0
+    
+    for pos in valid_positions:
+        x, y = pos[0] * court_width, pos[1] * court_height  # Convert to pixel coordinates
+        
+        # Convert to real court coordinates
+        real_x = x / PIXELS_PER_FOOT_X
+        real_y = y / PIXELS_PER_FOOT_Y
+        
+        # Define court zones based on NBA dimensions
+        if real_x < 19:  # Left side
+            if real_y < 8 or real_y > 42:
+                zone_counts["baseline"] += 1
+            elif 8 <= real_y <= 42:
+                zone_counts["paint"] += 1
+                paint_time += 1
+            else:
+                zone_counts["three_point"] += 1
+                three_point_time += 1
+        elif real_x < 75:  # Center court
+            if 8 <= real_y <= 42:
+                zone_counts["paint"] += 1
+                paint_time += 1
+            else:
+                zone_counts["mid_range"] += 1
+        else:  # Right side
+            if real_y < 8 or real_y > 42:
+                zone_counts["baseline"] += 1
+            elif 8 <= real_y <= 42:
+                zone_counts["paint"] += 1
+                paint_time += 1
+            else:
+                zone_counts["three_point"] += 1
+                three_point_time += 1
+    
+    # Convert to percentages
+    total_points = len(valid_positions)
+    zone_distribution = {zone: (count / total_points) * 100 for zone, count in zone_counts.items()}
+    paint_time_percentage = (paint_time / total_points) * 100
+    three_point_time_percentage = (three_point_time / total_points) * 100
+    
+    # Calculate court coverage percentage
+    grid_size = 10
+    covered_cells = set()
+    for pos in valid_positions:
+        x, y = pos[0] * court_width, pos[1] * court_height
+        grid_x = int((x / court_width) * grid_size)
+        grid_y = int((y / court_height) * grid_size)
+        covered_cells.add((grid_x, grid_y))
+    
+    court_coverage_percentage = (len(covered_cells) / (grid_size * grid_size)) * 100
+    
+    # Calculate movement efficiency
+    if len(valid_positions) > 1:
+        start = valid_positions[0]
+        end = valid_positions[-1]
+        start_real_x = start[0] * court_width / PIXELS_PER_FOOT_X
+        start_real_y = start[1] * court_height / PIXELS_PER_FOOT_Y
+        end_real_x = end[0] * court_width / PIXELS_PER_FOOT_X
+        end_real_y = end[1] * court_height / PIXELS_PER_FOOT_Y
+        straight_line_distance = ((end_real_x - start_real_x)**2 + (end_real_y - start_real_y)**2)**0.5
+        movement_efficiency = (straight_line_distance / total_distance) * 100 if total_distance > 0 else 0
+    else:
+        movement_efficiency = 0
+    
+    return BasketballMetrics(
+        total_distance_covered=round(total_distance, 2),
+        average_speed=round(avg_speed, 2),
+        max_speed=round(max_speed, 2),
+        high_intensity_sprints=high_intensity_sprints,
+        court_coverage_percentage=round(court_coverage_percentage, 1),
+        movement_efficiency=round(movement_efficiency, 1),
+        court_zone_distribution=zone_distribution,
+        paint_time_percentage=round(paint_time_percentage, 1),
+        three_point_time_percentage=round(three_point_time_percentage, 1),
+        acceleration_events=acceleration_events,
+        direction_changes=direction_changes
+    )
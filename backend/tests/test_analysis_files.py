@@ -0,0 +1,26 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+@pytest.fixture
+def analysis_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "ANALYSIS_DIRECTORY", str(tmp_path))
+    for name in ("clip_summary.json", "clip.landmarks.f32", "jobs.sqlite3", "jobs.sqlite3-wal"):
+        (tmp_path / name).write_bytes(b"{}")
+    return tmp_path
+
+def test_serves_analysis_json(analysis_directory):
+    response = main.get_analysis_data("clip_summary.json")
+    assert response.path == os.path.join(str(analysis_directory), "clip_summary.json")
+
+@pytest.mark.parametrize("filename", [
+    "jobs.sqlite3", "jobs.sqlite3-wal", "clip.landmarks.f32", "../clip_summary.json", "missing_summary.json",
+])
+def test_other_files_are_not_found(analysis_directory, filename):
+    with pytest.raises(HTTPException) as error:
+        main.get_analysis_data(filename)
+    assert error.value.status_code == 404
+
@@ -0,0 +1,77 @@
+import struct
+
+import pytest
+
+from faststart import is_fast_start, make_fast_start
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def chunk_offsets(box_type: bytes, offsets: list) -> bytes:
+    entry = ">I" if box_type == b"stco" else ">Q"
+    return box(box_type, struct.pack(">II", 0, len(offsets)) + b"".join(struct.pack(entry, o) for o in offsets))
+
+def track(offsets_box: bytes) -> bytes:
+    return box(b"trak", box(b"mdia", box(b"minf", box(b"stbl", offsets_box))))
+
+def write_movie(path, chunks: list) -> list:
+    """ftyp, mdat with `chunks`, then moov with one stco and one co64 track. Returns the chunk offsets."""
+    ftyp = box(b"ftyp", b"isom\0\0\0\0isom")
+    offsets, position = [], len(ftyp) + 8
+    for chunk in chunks:
+        offsets.append(position)
+        position += len(chunk)
+    mdat = box(b"mdat", b"".join(chunks))
+    half = len(offsets) // 2
+    moov = box(b"moov", box(b"mvhd", bytes(100)) + track(chunk_offsets(b"stco", offsets[:half]))
+               + track(chunk_offsets(b"co64", offsets[half:])))
+    path.write_bytes(ftyp + mdat + moov)
+    return offsets
+
+def read_offsets(data: bytes) -> list:
+    offsets = []
+    for box_type, entry, size in ((b"stco", ">I", 4), (b"co64", ">Q", 8)):
+        start = data.index(box_type) + 4
+        count = struct.unpack_from(">I", data, start + 4)[0]
+        offsets += [struct.unpack_from(entry, data, start + 8 + i * size)[0] for i in range(count)]
+    return offsets
+
+def test_moves_moov_and_shifts_chunk_offsets(tmp_path):
+    path = tmp_path / "movie.mp4"
+    chunks = [bytes([i]) * (10 + i) for i in range(6)]
+    write_movie(path, chunks)
+    assert not is_fast_start(str(path))
+
+    assert make_fast_start(str(path)) is True
+    assert is_fast_start(str(path))
+    data = path.read_bytes()
+    # Every rewritten offset, stco and co64 alike, still points at its chunk
+    offsets = read_offsets(data)
+    assert len(offsets) == len(chunks)
+    for offset, chunk in zip(offsets, chunks):
+        assert data[offset:offset + len(chunk)] == chunk
+
+def test_writes_to_another_path(tmp_path):
+    path, output = tmp_path / "movie.mp4", tmp_path / "fast.mp4"
+    write_movie(path, [b"a" * 20, b"b" * 30])
+    original = path.read_bytes()
+    make_fast_start(str(path), str(output))
+    assert path.read_bytes() == original
+    assert is_fast_start(str(output))
+
+def test_fast_start_file_is_left_alone(tmp_path):
+    path = tmp_path / "movie.mp4"
+    write_movie(path, [b"a" * 20, b"b" * 30])
+    make_fast_start(str(path))
+    data = path.read_bytes()
+    assert make_fast_start(str(path)) is False
+    assert path.read_bytes() == data
+
+def test_not_an_mp4(tmp_path):
+    path = tmp_path / "movie.mp4"
+    path.write_bytes(box(b"free", b"x" * 20))
+    with pytest.raises(ValueError):
+        make_fast_start(str(path))
+    path.write_bytes(b"\0\0\0\x40junk")
+    with pytest.raises(ValueError):
+        make_fast_start(str(path))
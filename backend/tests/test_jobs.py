@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+import jobs
+import workers
+from config import settings
+from jobs import JobRegistry
+from schemas import AnalysisProfile
+
+@pytest.fixture
+def registry(tmp_path):
+    return JobRegistry(str(tmp_path / "jobs.sqlite3"))
+
+def test_claim_takes_jobs_without_a_live_owner(registry):
+    registry.create("orphan", 600, video_path="orphan.mp4")
+    registry.start("orphan")
+    registry.plan_ranges("orphan", [(0, 300), (300, None)])
+    registry.save_checkpoint("orphan", 0, {"frame": 200})
+    registry.save_checkpoint("orphan", 300, {"frame": 350})
+    registry.renew_lease("a")
+
+    claimed = registry.claim_unfinished("a")
+    assert [job["video_id"] for job in claimed] == ["orphan"]
+    job = registry.get("orphan")
+    assert job["status"] == jobs.QUEUED and job["owner"] == "a"
+    assert job["frames_processed"] == job["frames_resumed"] == 250
+    assert job["started_at"] is None
+
+def test_jobs_without_checkpoints_restart_from_the_beginning(registry):
+    # Multi-player jobs report progress but save no checkpoints
+    registry.create("players", 600, profile={"multi_player": True})
+    registry.start("players")
+    registry.add_progress("players", 300)
+    registry.renew_lease("a")
+
+    assert [job["video_id"] for job in registry.claim_unfinished("a")] == ["players"]
+    job = registry.get("players")
+    assert job["frames_processed"] == job["frames_resumed"] == 0
+
+def test_each_job_is_claimed_once(registry):
+    registry.create("orphan", 600)
+    registry.renew_lease("a")
+    registry.renew_lease("b")
+    assert len(registry.claim_unfinished("a")) == 1
+    # "a" holds a live lease now, so neither process claims the job again
+    assert registry.claim_unfinished("b") == []
+    assert registry.claim_unfinished("a") == []
+
+def test_claim_skips_jobs_of_live_owners(registry, monkeypatch):
+    registry.renew_lease("live")
+    registry.create("running", 600, owner="live")
+    registry.start("running")
+    registry.create("done", 600)
+    registry.complete("done")
+    assert registry.claim_unfinished("other") == []
+
+    # Once the lease is older than the timeout the job is up for grabs
+    monkeypatch.setattr(settings, "JOB_LEASE_TIMEOUT", 0.0)
+    time.sleep(0.01)
+    registry.renew_lease("other")
+    assert [job["video_id"] for job in registry.claim_unfinished("other")] == ["running"]
+
+def resume(registry, monkeypatch, total_frames):
+    monkeypatch.setattr(workers, "job_registry", registry)
+    pool = workers.AnalysisWorkerPool(max_workers=2, max_queued=0)
+    dispatched = []
+    monkeypatch.setattr(pool, "_read_properties", lambda path: {"total_frames": total_frames, "fps": 30.0})
+    monkeypatch.setattr(pool, "_dispatch", lambda *args: dispatched.append(args[-1]))
+    assert pool.resume_unfinished() == (len(dispatched), 0)
+    return dispatched
+
+def test_resume_segments_unplanned_long_jobs_like_submit(registry, monkeypatch, tmp_path):
+    video = tmp_path / "long.mp4"
+    video.write_bytes(b"")
+    registry.create("long", settings.ANALYSIS_SEGMENT_MIN_FRAMES, video_path=str(video),
+                    profile=AnalysisProfile().dict())
+    assert resume(registry, monkeypatch, settings.ANALYSIS_SEGMENT_MIN_FRAMES) == [True]
+
+def test_resume_keeps_the_ranges_a_job_planned(registry, monkeypatch, tmp_path):
+    video = tmp_path / "long.mp4"
+    video.write_bytes(b"")
+    registry.create("long", settings.ANALYSIS_SEGMENT_MIN_FRAMES, video_path=str(video),
+                    profile=AnalysisProfile().dict())
+    registry.start("long")
+    registry.plan_ranges("long", [(0, None)])
+    assert resume(registry, monkeypatch, settings.ANALYSIS_SEGMENT_MIN_FRAMES) == [False]
+
+def test_resume_fails_jobs_without_their_video(registry, monkeypatch):
+    monkeypatch.setattr(workers, "job_registry", registry)
+    registry.create("gone", 600, video_path="/nonexistent/gone.mp4")
+    assert workers.AnalysisWorkerPool(1, 0).resume_unfinished() == (0, 1)
+    assert registry.get("gone")["status"] == jobs.FAILED
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from landmarks import (
+    HIP_VISIBILITY_THRESHOLD, LANDMARK_GROUPS, LANDMARK_NAMES, LEFT_HIP, NUM_LANDMARKS, RIGHT_HIP,
+    LandmarkTrack, hip_center, hip_centers, resolve_landmark_subset
+)
+
+def test_all_landmarks_by_default():
+    assert resolve_landmark_subset(None) == list(range(NUM_LANDMARKS))
+    assert resolve_landmark_subset("") == list(range(NUM_LANDMARKS))
+
+def test_names_groups_and_indices():
+    group = next(iter(LANDMARK_GROUPS))
+    expected = [LANDMARK_NAMES.index(name) for name in LANDMARK_GROUPS[group]]
+    assert resolve_landmark_subset(group) == expected
+    assert resolve_landmark_subset(f" {LANDMARK_NAMES[5].upper()} ,0,5") == [5, 0]
+
+@pytest.mark.parametrize("spec", ["nose_tip", str(NUM_LANDMARKS), "-1"])
+def test_unknown_landmarks(spec):
+    with pytest.raises(ValueError):
+        resolve_landmark_subset(spec)
+
+@pytest.mark.parametrize("spec", [",", " , ,", ",,,"])
+def test_nothing_selected(spec):
+    with pytest.raises(ValueError, match="No landmarks selected"):
+        resolve_landmark_subset(spec)
+
+def frame(left_visibility=0.9, right_visibility=0.9):
+    landmarks = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[LEFT_HIP] = (0.25, 0.5, 0, left_visibility)
+    landmarks[RIGHT_HIP] = (0.75, 0.25, 0, right_visibility)
+    return landmarks
+
+def test_hip_center():
+    assert hip_center(frame()) == pytest.approx((0.5, 0.375))
+    assert hip_center(frame(right_visibility=HIP_VISIBILITY_THRESHOLD)) is None
+    assert hip_center(frame(left_visibility=0.2)) is None
+    assert hip_center(frame(0.4, 0.4), visibility_threshold=0.3) == pytest.approx((0.5, 0.375))
+
+def test_hip_centers_match_hip_center():
+    missing = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    data = np.stack([frame(), frame(right_visibility=0.1), missing, frame(0.6, 0.7)])
+    centers, visible = hip_centers(data)
+    assert visible.tolist() == [hip_center(landmarks) is not None for landmarks in data]
+    for landmarks, center, seen in zip(data, centers, visible):
+        if seen:
+            assert tuple(center) == pytest.approx(hip_center(landmarks))
+
+    # A track also leaves out frames without a detection
+    track = LandmarkTrack(data, mask=[True, True, True, False])
+    assert track.hip_centers()[1].tolist() == [True, False, False, False]
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from media import parse_range, range_file_response
+
+SIZE = 1000
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=999-999", (999, 999)),
+])
+def test_ranges(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+@pytest.mark.parametrize("header", [
+    None, "", "items=0-10", "bytes=0-1,5-6", "bytes=-", "bytes=a-b", "bytes=10-5", "bytes=5",
+])
+def test_whole_file(header):
+    # Headers that are missing, malformed or ask for several ranges get the whole file
+    assert parse_range(header, SIZE) is None
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", SIZE), ("bytes=5000-6000", SIZE), ("bytes=-0", SIZE), ("bytes=0-", 0), ("bytes=-5", 0),
+])
+def test_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(bytes(range(256)) * 4)
+    app = FastAPI()
+
+    @app.api_route("/clip", methods=["GET", "HEAD"])
+    def clip(request: Request):
+        return range_file_response(request, str(path))
+
+    @app.get("/missing")
+    def missing(request: Request):
+        return range_file_response(request, str(tmp_path / "missing.mp4"))
+
+    return TestClient(app)
+
+def test_partial_content(client):
+    response = client.get("/clip", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.content == bytes(range(10, 20))
+
+def test_full_content(client):
+    response = client.get("/clip")
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert len(response.content) == 1024
+
+def test_range_not_satisfiable(client):
+    response = client.get("/clip", headers={"Range": "bytes=2000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+def test_if_range(client):
+    etag = client.head("/clip").headers["etag"]
+    assert client.get("/clip", headers={"Range": "bytes=0-1", "If-Range": etag}).status_code == 206
+    # A validator of an older version of the file gets the whole file
+    assert client.get("/clip", headers={"Range": "bytes=0-1", "If-Range": '"old"'}).status_code == 200
+
+def test_head(client):
+    response = client.head("/clip", headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "100"
+    assert response.content == b""
+
+def test_missing_file(client):
+    assert client.get("/missing").status_code == 404
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from landmarks import LEFT_HIP, RIGHT_HIP, NUM_LANDMARKS, LandmarkTrack
+from metrics import (
+    MetricsAccumulator, compute_basketball_metrics, compute_metrics_from_positions, empty_basketball_metrics
+)
+from metrics_reference import compare, random_track, reference_basketball_metrics
+
+def hip_track(positions, visibility=0.9) -> LandmarkTrack:
+    """A track whose hips are both at `positions`, one frame per row."""
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+    data = np.zeros((len(positions), NUM_LANDMARKS, 4), dtype=np.float32)
+    for hip in (LEFT_HIP, RIGHT_HIP):
+        data[:, hip, :2] = positions
+        data[:, hip, 3] = visibility
+    return LandmarkTrack(data)
+
+def assert_parity(track: LandmarkTrack, width=1920, height=1080, fps=30.0):
+    batch = compute_basketball_metrics(track, width, height, fps)
+    assert compare(reference_basketball_metrics(track, width, height, fps), batch) == []
+    return batch
+
+def test_zigzag_track():
+    positions = [(0.1 + 0.05 * i, 0.3 if i % 2 else 0.6) for i in range(20)]
+    metrics = assert_parity(hip_track(positions))
+    assert metrics.total_distance_covered > 0
+    assert metrics.direction_changes > 0
+
+def test_standing_still():
+    metrics = assert_parity(hip_track([(0.5, 0.5)] * 30))
+    assert metrics.total_distance_covered == 0
+    assert metrics.movement_efficiency == 0
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_tracks(seed):
+    rng = np.random.default_rng(seed)
+    track = random_track(rng, int(rng.integers(2, 2000)))
+    fps = float(rng.choice([24.0, 29.97, 30.0, 60.0]))
+    assert_parity(track, int(rng.integers(320, 3840)), int(rng.integers(240, 2160)), fps)
+
+def test_empty_track():
+    assert assert_parity(LandmarkTrack()) == empty_basketball_metrics()
+
+def test_one_frame():
+    assert assert_parity(hip_track([(0.5, 0.5)])) == empty_basketball_metrics()
+
+def test_no_frame_detected():
+    track = hip_track([(0.1 * i, 0.5) for i in range(10)])
+    undetected = LandmarkTrack(track.data, np.zeros(len(track), dtype=bool))
+    assert assert_parity(undetected) == empty_basketball_metrics()
+
+def test_hips_below_visibility_threshold():
+    assert assert_parity(hip_track([(0.1 * i, 0.5) for i in range(10)], visibility=0.2)) == empty_basketball_metrics()
+
+def test_unknown_fps():
+    track = hip_track([(0.1 + 0.02 * i, 0.5) for i in range(10)])
+    metrics = assert_parity(track, fps=0)
+    # A default frame interval keeps the speeds finite
+    assert 0 < metrics.max_speed < float("inf")
+
+def test_accumulator_per_frame_matches_batch():
+    rng = np.random.default_rng(1)
+    track = random_track(rng, 1500)
+    accumulator = MetricsAccumulator(1280, 720, 30.0)
+    for landmarks, detected in zip(track.data, track.mask):
+        accumulator.add_frame(landmarks if detected else None)
+    assert compare(compute_basketball_metrics(track, 1280, 720, 30.0), accumulator.snapshot()) == []
+
+@pytest.mark.parametrize("block", [1, 7, 500])
+def test_accumulator_blocks_match_batch(block):
+    rng = np.random.default_rng(2)
+    centers, visible = random_track(rng, 1500).hip_centers()
+    positions = centers[visible]
+    accumulator = MetricsAccumulator(1280, 720, 30.0)
+    for start in range(0, len(positions), block):
+        accumulator.add_positions(positions[start:start + block])
+    assert compare(compute_metrics_from_positions(positions, 1280, 720, 30.0), accumulator.snapshot()) == []
+
+def test_accumulator_snapshot_while_streaming():
+    positions = np.array([(0.1 + 0.03 * i, 0.4 + 0.01 * (i % 3)) for i in range(40)])
+    accumulator = MetricsAccumulator(1920, 1080, 30.0)
+    for i, (x, y) in enumerate(positions, start=1):
+        accumulator.add_position(x, y)
+        assert compare(compute_metrics_from_positions(positions[:i], 1920, 1080, 30.0), accumulator.snapshot()) == []
@@ -0,0 +1,124 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import persistence
+from analysis import AnalysisResult
+from config import settings
+from landmarks import LEFT_HIP, NUM_LANDMARKS, RIGHT_HIP
+from metrics import compute_metrics_from_positions, empty_basketball_metrics
+from persistence import FEET_TO_METERS, analysis_rows, persist_analysis, session_id_for
+from storage import LandmarkWriter, landmarks_path, player_landmarks_path
+
+FPS = 10.0
+FRAMES = 35
+CREATED_AT = 1700000000.0
+
+@pytest.fixture(autouse=True)
+def analysis_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "STATS_SAMPLE_INTERVAL", 1.0)
+
+def write_track(path, seen):
+    """A player walking right, seen in the frames where `seen` is True."""
+    data = np.full((FRAMES, NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    x = np.linspace(0.1, 0.9, FRAMES)
+    for hip in (LEFT_HIP, RIGHT_HIP):
+        data[seen, hip, 0] = x[seen]
+        data[seen, hip, 1] = 0.5
+        data[seen, hip, 3] = 0.9
+    with LandmarkWriter(path) as writer:
+        writer.write_frames(data)
+    return data
+
+def make_result(video_id, stride=1, fps=FPS, players=None):
+    metadata = {
+        "fps": fps, "frame_stride": stride, "analysis_duration": FRAMES / FPS,
+        "court_dimensions": {"width": 1280, "height": 720},
+    }
+    if players is not None:
+        metadata["players"] = players
+    return AnalysisResult(
+        video_id=video_id, status="completed", total_frames=FRAMES, processed_frames=FRAMES,
+        landmarks_path=landmarks_path(video_id), basketball_metrics=empty_basketball_metrics(),
+        analysis_metadata=metadata,
+    )
+
+def seen_except(start, stop):
+    seen = np.ones(FRAMES, dtype=bool)
+    seen[start:stop] = False
+    return seen
+
+def test_single_player_session_and_samples():
+    seen = seen_except(20, 30)
+    data = write_track(landmarks_path("clip"), seen)
+    session, stats = analysis_rows(make_result("clip"), "/uploads/clip.mp4", CREATED_AT)
+
+    started_at = datetime.fromtimestamp(CREATED_AT, timezone.utc)
+    assert session["id"] == session_id_for("clip") == uuid.uuid5(uuid.NAMESPACE_URL, "basketball-video:clip")
+    assert session["name"] == "clip.mp4"
+    assert session["video_url"] == "/uploads/clip.mp4"
+    assert session["started_at"] == started_at
+    assert session["ended_at"].tzinfo is not None and session["ended_at"] >= started_at
+    assert session["duration"] == 3.5
+
+    # The totals row, then one row per second of video with the player in it
+    assert [row["video_timestamp"] for row in stats] == [None, 0.0, 1.0, 3.0]
+    assert [row["timestamp"] for row in stats] == [
+        started_at, started_at, started_at + timedelta(seconds=1), started_at + timedelta(seconds=3)
+    ]
+    assert {row["player_index"] for row in stats} == {0}
+    assert [row["minutes_played"] for row in stats] == [
+        round(25 / FPS / 60, 2), round(10 / FPS / 60, 2), round(10 / FPS / 60, 2), round(5 / FPS / 60, 2)
+    ]
+    centers = data[:10, LEFT_HIP, :2].astype(np.float64)
+    expected = compute_metrics_from_positions(centers, 1280, 720, FPS)
+    assert stats[1]["distance_covered"] == round(expected.total_distance_covered * FEET_TO_METERS, 2)
+
+def test_uuid_video_ids_are_the_session_id():
+    video_id = str(uuid.uuid4())
+    write_track(landmarks_path(video_id), np.ones(FRAMES, dtype=bool))
+    session, stats = analysis_rows(make_result(video_id), f"/uploads/{video_id}.mp4")
+    assert session["id"] == uuid.UUID(video_id)
+    assert session["started_at"].tzinfo is timezone.utc
+    assert all(row["session_id"] == session["id"] for row in stats)
+
+def test_stride_samples_the_analyzed_frames():
+    write_track(landmarks_path("strided"), seen_except(20, 30))
+    _, stats = analysis_rows(make_result("strided", stride=2), "strided.mp4", CREATED_AT)
+    assert [row["video_timestamp"] for row in stats] == [None, 0.0, 1.0, 3.0]
+    # 13 analyzed frames with the player at 5 analyzed frames per second
+    assert stats[0]["minutes_played"] == round(13 / (FPS / 2) / 60, 2)
+
+def test_rows_per_tracked_player():
+    write_track(landmarks_path("game"), np.ones(FRAMES, dtype=bool))
+    write_track(player_landmarks_path("game", 1), seen_except(0, 10))
+    players = [
+        {"player": player, "landmarks_file": os.path.basename(path), "basketball_metrics": empty_basketball_metrics().dict()}
+        for player, path in ((0, landmarks_path("game")), (1, player_landmarks_path("game", 1)))
+    ]
+    _, stats = analysis_rows(make_result("game", players=players), "game.mp4", CREATED_AT)
+    assert [(row["player_index"], row["video_timestamp"]) for row in stats] == [
+        (0, None), (0, 0.0), (0, 1.0), (0, 2.0), (0, 3.0), (1, None), (1, 1.0), (1, 2.0), (1, 3.0),
+    ]
+
+def test_unknown_fps_has_no_stats():
+    write_track(landmarks_path("nofps"), np.ones(FRAMES, dtype=bool))
+    session, stats = analysis_rows(make_result("nofps", fps=0), "nofps.mp4", CREATED_AT)
+    assert session["status"] == "completed"
+    assert stats == []
+
+def test_persist_analysis_returns_errors(monkeypatch):
+    result = make_result("clip")
+    monkeypatch.setattr(settings, "DATABASE_URL", None)
+    assert persist_analysis(result, "clip.mp4") is None
+
+    def fail(*args):
+        raise ConnectionError("database is down")
+    monkeypatch.setattr(settings, "DATABASE_URL", "sqlite://")
+    monkeypatch.setattr(settings, "PERSIST_ANALYSIS_STATS", True)
+    monkeypatch.setattr(persistence, "save_analysis_stats", fail)
+    assert persist_analysis(result, "clip.mp4") == {"error": "ConnectionError: database is down"}
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from config import settings
+from landmarks import NUM_LANDMARKS
+from players import MultiPlayerTracker
+from storage import open_landmark_array
+
+class IdlePose:
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def analysis_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_DIRECTORY", str(tmp_path))
+    return tmp_path
+
+def landmarks(value):
+    return np.full((NUM_LANDMARKS, 4), value, dtype=np.float32)
+
+def tracker(min_track_frames=3):
+    return MultiPlayerTracker("game", 640, 480, IdlePose, detector=object(), min_track_frames=min_track_frames)
+
+def test_short_tracks_are_deleted_when_they_end(analysis_directory):
+    players = tracker()
+    players._start_track((0, 0, 10, 10), 100)
+    track = players.active[0]
+    track.write(100, landmarks(1))
+    track.write(102, None)
+    players._end_track(track)
+
+    assert track.writer._file.closed
+    assert not os.path.exists(track.output_path)
+    assert players.ended == [] and players.tracks_discarded == 1 and players.tracks_started == 1
+
+def test_track_files_start_at_the_first_frame(analysis_directory):
+    players = tracker()
+    players._start_track((0, 0, 10, 10), 4)
+    track = players.active[0]
+    for frame in (4, 6, 8):
+        track.write(frame, landmarks(frame))
+    players._end_track(track)
+    assert track.writer._file.closed
+    # Frames 4 to 8, with the ones skipped by the stride left empty
+    assert len(open_landmark_array(track.output_path)) == 5
+
+    kept = players.finish()
+    assert kept == [track]
+    path = str(analysis_directory / "player0.landmarks.f32")
+    track.write_padded(path, 12)
+    data = open_landmark_array(path)
+    assert len(data) == 12
+    seen = [frame for frame in range(12) if not np.isnan(data[frame]).all()]
+    assert seen == [4, 6, 8]
+    assert data[6, 0, 0] == 6
+    assert not os.path.exists(track.output_path)
+
+def test_finish_ends_the_active_tracks(analysis_directory):
+    players = tracker(min_track_frames=2)
+    for frame, box in ((0, (0, 0, 10, 10)), (0, (100, 100, 120, 120))):
+        players._start_track(box, frame)
+    long_track, short_track = players.active
+    long_track.write(0, landmarks(1))
+    long_track.write(1, landmarks(1))
+    short_track.write(0, landmarks(1))
+
+    assert players.finish() == [long_track]
+    assert players.active == [] and players.tracks_discarded == 1
+    assert not os.path.exists(short_track.output_path)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from analysis import plan_segments, stitch_frame_ranges
+from landmarks import NUM_LANDMARKS
+from storage import LandmarkWriter, open_landmark_array
+from timeline import range_timeline
+
+@pytest.mark.parametrize("total_frames, count", [(100, 1), (100, 3), (9001, 4), (5, 8), (0, 4)])
+def test_plan_segments(total_frames, count):
+    segments = plan_segments(total_frames, count)
+    assert 1 <= len(segments) <= max(1, min(count, total_frames))
+    assert segments[0][0] == 0
+    # Contiguous, each range ending where the next starts, the last one open-ended
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end == start
+    assert segments[-1][1] is None
+    lengths = [end - start for start, end in segments[:-1]]
+    assert all(length > 0 for length in lengths)
+    if lengths:
+        assert max(lengths) - min(lengths) <= 1
+
+def frame_range(tmp_path, start_frame: int, frames: int, seconds: float) -> dict:
+    data = np.full((frames, NUM_LANDMARKS, 4), start_frame, dtype=np.float32) + np.arange(frames)[:, None, None]
+    path = str(tmp_path / f"part{start_frame}.f32")
+    with LandmarkWriter(path) as writer:
+        writer.write_frames(data)
+    return {
+        "start_frame": start_frame,
+        "frames": frames,
+        "landmarks_path": path,
+        "sampled_frames": frames,
+        "detected_frames": frames - 1,
+        "interpolated_frames": 1,
+        "inference_size": (256, 144),
+        "hip_positions": np.full((frames - 1, 2), start_frame, dtype=np.float64),
+        "stage_timings": {"stages": {"pose": {"seconds": seconds, "frames": frames}}, "wall_seconds": seconds},
+        "pose_stats": {},
+        "timeline": range_timeline(start_frame, frames, start_frame, [start_frame], [0.0] * frames, None),
+    }
+
+def test_stitch_frame_ranges(tmp_path):
+    parts = [frame_range(tmp_path, 0, 10, 1.0), frame_range(tmp_path, 10, 5, 0.5)]
+    output = str(tmp_path / "video.f32")
+    # Segments finish in any order
+    stitched = stitch_frame_ranges(list(reversed(parts)), output)
+    assert stitched["frames"] == 15
+    assert stitched["detected_frames"] == 13
+    assert stitched["interpolated_frames"] == 2
+    assert stitched["inference_size"] == (256, 144)
+    assert stitched["hip_positions"].tolist() == [[0, 0]] * 9 + [[10, 10]] * 4
+    assert stitched["stage_timings"]["stages"]["pose"] == {"seconds": 1.5, "frames": 15, "ms_per_frame": 100.0}
+    assert stitched["timeline"]["keyframes"] == [0, 10]
+    # Landmark files are joined in frame order and the parts removed
+    assert open_landmark_array(output)[:, 0, 0].tolist() == list(range(15))
+    assert not any(path.name.startswith("part") for path in tmp_path.iterdir())
+
+def test_stitch_refuses_gaps(tmp_path):
+    parts = [frame_range(tmp_path, 0, 10, 1.0), frame_range(tmp_path, 12, 5, 0.5)]
+    with pytest.raises(ValueError):
+        stitch_frame_ranges(parts, str(tmp_path / "video.f32"))
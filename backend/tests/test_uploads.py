@@ -0,0 +1,146 @@
+import hashlib
+import os
+import uuid
+
+import pytest
+
+import uploads
+from config import settings
+from uploads import UploadError
+
+VIDEO = b"\0\0\0\x18ftypmp42" + bytes(range(256)) * 40
+
+@pytest.fixture(autouse=True)
+def upload_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIRECTORY", str(tmp_path))
+    return tmp_path
+
+def new_session(size=len(VIDEO)):
+    session = uploads.create_session("clip.mp4", "video/mp4", size, {})
+    return uploads.load_session(session["upload_id"])
+
+def part_content(session):
+    with open(uploads._part_path(session["upload_id"]), "rb") as f:
+        return f.read()
+
+def test_chunks_in_order():
+    session = new_session()
+    assert uploads.write_chunk(session, 0, VIDEO[:1000]) == 1000
+    assert uploads.write_chunk(session, 1000, VIDEO[1000:]) == len(VIDEO)
+    assert uploads.load_session(session["upload_id"])["offset"] == len(VIDEO)
+    assert part_content(session) == VIDEO
+
+def test_gap_is_refused():
+    session = new_session()
+    uploads.write_chunk(session, 0, VIDEO[:1000])
+    with pytest.raises(UploadError) as error:
+        uploads.write_chunk(session, 2000, VIDEO[2000:3000])
+    assert error.value.status_code == 409
+    assert session["offset"] == 1000
+
+def test_late_duplicate_keeps_later_bytes():
+    session = new_session()
+    uploads.write_chunk(session, 0, VIDEO[:1000])
+    uploads.write_chunk(session, 1000, VIDEO[1000:3000])
+    # A retried first chunk arriving after the second one
+    assert uploads.write_chunk(session, 0, VIDEO[:1000]) == 1000
+    assert session["offset"] == 3000
+    assert uploads.load_session(session["upload_id"])["offset"] == 3000
+    uploads.write_chunk(session, 3000, VIDEO[3000:])
+    assert part_content(session) == VIDEO
+
+def test_overlapping_chunk_appends_new_bytes():
+    session = new_session()
+    uploads.write_chunk(session, 0, VIDEO[:1000])
+    assert uploads.write_chunk(session, 500, VIDEO[500:2000]) == 2000
+    assert session["offset"] == 2000
+    assert part_content(session) == VIDEO[:2000]
+
+def test_past_declared_size_is_refused():
+    session = new_session(100)
+    with pytest.raises(UploadError) as error:
+        uploads.write_chunk(session, 0, VIDEO[:101])
+    assert error.value.status_code == 413
+
+def test_first_chunk_must_look_like_video():
+    session = new_session()
+    with pytest.raises(UploadError) as error:
+        uploads.write_chunk(session, 0, b"not a video at all")
+    assert error.value.status_code == 415
+
+def test_finalize_incomplete_upload():
+    session = new_session()
+    uploads.write_chunk(session, 0, VIDEO[:1000])
+    with pytest.raises(UploadError) as error:
+        uploads.finalize_session(session, "unused.mp4")
+    assert error.value.status_code == 409
+
+def test_finalize_and_restore(upload_directory):
+    session = new_session()
+    uploads.write_chunk(session, 0, VIDEO)
+    file_path = str(upload_directory / "video.mp4")
+    assert uploads.finalize_session(session, file_path) == hashlib.sha256(VIDEO).hexdigest()
+    with open(file_path, "rb") as f:
+        assert f.read() == VIDEO
+
+    # A video that could not be handed on goes back into its session
+    uploads.restore_session(session, file_path)
+    assert not os.path.exists(file_path)
+    assert uploads.load_session(session["upload_id"])["offset"] == len(VIDEO)
+
+    uploads.finalize_session(session, file_path)
+    uploads.delete_session(session["upload_id"])
+    assert uploads.load_session(session["upload_id"]) is None
+
+def test_hash_is_kept_while_streaming(upload_directory):
+    session = new_session()
+    for offset in (0, 1000, 500, 4000):
+        uploads.write_chunk(session, offset, VIDEO[offset:offset + 3000])
+    uploads.write_chunk(session, session["offset"], VIDEO[session["offset"]:])
+    # Finalizing uses the running hash instead of reading the part file again
+    with open(uploads._part_path(session["upload_id"]), "r+b") as f:
+        f.write(b"\0" * 100)
+    file_path = str(upload_directory / "video.mp4")
+    assert uploads.finalize_session(session, file_path) == hashlib.sha256(VIDEO).hexdigest()
+
+def test_hash_catches_up_after_a_restart(upload_directory):
+    file_path = str(upload_directory / "video.mp4")
+    session = new_session()
+    uploads.write_chunk(session, 0, VIDEO[:2500])
+    # A new server process has no running hash; it hashes the received bytes once
+    uploads._hashes.clear()
+    session = uploads.load_session(session["upload_id"])
+    uploads.write_chunk(session, 2500, VIDEO[2500:])
+    assert uploads.finalize_session(session, file_path) == hashlib.sha256(VIDEO).hexdigest()
+
+    uploads._hashes.clear()
+    uploads.restore_session(session, file_path)
+    assert uploads.finalize_session(session, file_path) == hashlib.sha256(VIDEO).hexdigest()
+
+def test_expire_idle_sessions():
+    idle, active = new_session(), new_session()
+    for path in (uploads._session_path(idle["upload_id"]), uploads._part_path(idle["upload_id"])):
+        os.utime(path, (0, 0))
+    assert uploads.expire_sessions() == [idle["upload_id"]]
+    assert uploads.load_session(idle["upload_id"]) is None
+    assert uploads.load_session(active["upload_id"]) is not None
+
+def test_unknown_ids_are_not_looked_up():
+    assert uploads.load_session("../../etc/passwd") is None
+
+def test_unknown_sessions_get_no_lock():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    unknown = str(uuid.uuid4())
+    assert client.put(f"/videos/upload-sessions/{unknown}?offset=0", content=VIDEO).status_code == 404
+    assert client.post(f"/videos/upload-sessions/{unknown}/complete").status_code == 404
+    assert unknown not in main._upload_session_locks
+
+    session = new_session()
+    response = client.put(f"/videos/upload-sessions/{session['upload_id']}?offset=0", content=VIDEO[:1000])
+    assert response.status_code == 200 and response.json()["offset"] == 1000
+    assert session["upload_id"] in main._upload_session_locks
+    assert client.delete(f"/videos/upload-sessions/{session['upload_id']}").status_code == 200
+    assert session["upload_id"] not in main._upload_session_locks
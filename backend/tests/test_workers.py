@@ -0,0 +1,26 @@
+from concurrent.futures import Future
+
+import workers
+from config import settings
+
+def future(state):
+    f = Future()
+    if state in ("running", "done"):
+        f.set_running_or_notify_cancel()
+    if state == "done":
+        f.set_result(True)
+    return f
+
+def test_busy_workers_counts_unfinished_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_SEGMENT_COUNT", 0)
+    pool = workers.AnalysisWorkerPool(max_workers=4, max_queued=4)
+    pool._jobs = {"running": future("running"), "waiting": future("pending"), "done": future("done")}
+    # The finished job no longer holds a worker, even before its callback removed it
+    assert pool._busy_workers() == 2
+
+    # A segmented job takes a worker per segment
+    pool._jobs["long"] = future("running")
+    pool._segmented_jobs.add("long")
+    assert pool._busy_workers() == 6
+    monkeypatch.setattr(settings, "ANALYSIS_SEGMENT_COUNT", 2)
+    assert pool._busy_workers() == 4
@@ -0,0 +1,196 @@
+import bisect
+import math
+import os
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from config import settings
+from storage import _write_json_atomic, sprite_path, video_index_path
+
+# Side outputs of the analysis decode for the timeline UI: a sprite sheet of
+# thumbnails taken every THUMBNAIL_INTERVAL seconds, and an index of the
+# video's keyframes and frame timestamps. Both come from frames the pipeline
+# decodes anyway, so no video is decoded a second time.
+
+def thumbnail_interval(fps: float, total_frames: int) -> float:
+    """
+    Seconds between thumbnails: THUMBNAIL_INTERVAL, stretched for long
+    videos so the sprite stays within THUMBNAIL_MAX_TILES tiles.
+    """
+    duration = total_frames / fps if fps > 0 else 0
+    return max(settings.THUMBNAIL_INTERVAL, duration / max(1, settings.THUMBNAIL_MAX_TILES))
+
+class ThumbnailCollector:
+    """
+    Keeps the first frame seen at or after the start of every thumbnail
+    interval, shrunk to THUMBNAIL_WIDTH. Frames arrive in frame order from
+    the pipeline's converter thread; segments of one video each collect
+    their own tiles, which merge_timelines joins.
+    """
+    def __init__(self, fps: float, total_frames: int):
+        self.fps = fps if fps > 0 else settings.FRAME_RATE
+        self.interval = thumbnail_interval(self.fps, total_frames)
+        self.tile_size = None
+        self.tiles = {}
+
+    def add(self, frame_index: int, image: np.ndarray):
+        tile = int(frame_index / self.fps // self.interval)
+        if tile in self.tiles:
+            return
+        if self.tile_size is None:
+            height, width = image.shape[:2]
+            tile_width = settings.THUMBNAIL_WIDTH
+            self.tile_size = tile_width, max(2, round(height * tile_width / width / 2) * 2)
+        self.tiles[tile] = (frame_index, cv2.resize(image, self.tile_size, interpolation=cv2.INTER_AREA))
+
+    def result(self) -> dict:
+        return {"interval": self.interval, "tile_size": self.tile_size, "tiles": self.tiles}
+
+def range_timeline(start_frame: int, frames: int, index_start: int, keyframes: List[int],
+                   timestamps: List[float], thumbnails: Optional[ThumbnailCollector]) -> dict:
+    """
+    Timeline part of the frame range [start_frame, start_frame + frames).
+    Keyframes and timestamps are known from `index_start` on (later than
+    the range start when the range resumed from a checkpoint); earlier
+    timestamps are NaN.
+    """
+    known = np.asarray(timestamps, dtype=np.float64)[:max(0, start_frame + frames - index_start)]
+    stamps = np.full(frames, np.nan)
+    stamps[index_start - start_frame:index_start - start_frame + len(known)] = known
+    end_frame = start_frame + frames
+    return {
+        "keyframes": [k for k in keyframes if start_frame <= k < end_frame],
+        "timestamps": stamps,
+        "thumbnails": thumbnails.result() if thumbnails is not None else None,
+    }
+
+def merge_timelines(parts: List[Optional[dict]]) -> Optional[dict]:
+    """Joins the timeline parts of consecutive frame ranges, in frame order."""
+    if not parts or any(part is None for part in parts):
+        return None
+    thumbnails = None
+    for part in parts:
+        if part["thumbnails"] is None:
+            continue
+        if thumbnails is None:
+            thumbnails = {**part["thumbnails"], "tiles": dict(part["thumbnails"]["tiles"])}
+        else:
+            thumbnails["tile_size"] = thumbnails["tile_size"] or part["thumbnails"]["tile_size"]
+            for tile, value in part["thumbnails"]["tiles"].items():
+                thumbnails["tiles"].setdefault(tile, value)
+    return {
+        "keyframes": [k for part in parts for k in part["keyframes"]],
+        "timestamps": np.concatenate([part["timestamps"] for part in parts]),
+        "thumbnails": thumbnails,
+    }
+
+def write_sprite(video_id: str, thumbnails: dict, duration: float) -> Optional[dict]:
+    """
+    Writes the thumbnails into one JPEG sprite sheet of THUMBNAIL_COLUMNS
+    columns, tile n at row n // columns, column n % columns. Tiles that
+    were never seen (e.g. before a resumed checkpoint) stay black. Returns
+    the sprite layout for the analysis metadata.
+    """
+    tiles = thumbnails["tiles"]
+    if not tiles or thumbnails["tile_size"] is None:
+        return None
+    tile_width, tile_height = thumbnails["tile_size"]
+    count = max(max(tiles) + 1, math.ceil(duration / thumbnails["interval"]) if duration > 0 else 0)
+    columns = min(settings.THUMBNAIL_COLUMNS, count)
+    rows = math.ceil(count / columns)
+    sprite = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    frames = [None] * count
+    for tile, (frame_index, image) in tiles.items():
+        row, column = divmod(tile, columns)
+        sprite[row * tile_height:(row + 1) * tile_height, column * tile_width:(column + 1) * tile_width] = image
+        frames[tile] = frame_index
+
+    path = sprite_path(video_id)
+    temporary_path = f"{path}.tmp.jpg"
+    if not cv2.imwrite(temporary_path, sprite, [cv2.IMWRITE_JPEG_QUALITY, settings.THUMBNAIL_JPEG_QUALITY]):
+        return None
+    os.replace(temporary_path, path)
+    return {
+        "file": os.path.basename(path),
+        "interval": thumbnails["interval"],
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "columns": columns,
+        "rows": rows,
+        "count": count,
+        "missing": count - len(tiles),
+        "frames": frames,
+        "bytes": os.path.getsize(path),
+    }
+
+def write_video_index(video_id: str, fps: float, keyframes: List[int], timestamps: np.ndarray) -> dict:
+    """
+    Writes the keyframe and timestamp index of a video. Per-frame
+    timestamps are only stored when the frame rate is variable; otherwise
+    frame n is at n / fps. Returns a short description for the metadata.
+    """
+    frames = len(timestamps)
+    known = ~np.isnan(timestamps)
+    expected = np.arange(frames) * (1000.0 / fps) if fps > 0 else np.zeros(frames)
+    constant_rate = fps > 0 and bool(np.all(np.abs(timestamps[known] - expected[known]) < 1.0))
+    index = {
+        "fps": fps,
+        "frames": frames,
+        "complete": bool(known.all()),
+        "constant_frame_rate": constant_rate,
+        "keyframes": keyframes,
+        "keyframe_times": [round(_frame_time_ms(timestamps, fps, k) / 1000, 4) for k in keyframes],
+        # Milliseconds per frame, null where unknown
+        "timestamps_ms": None if constant_rate else [
+            round(float(t), 3) if not math.isnan(t) else None for t in timestamps
+        ],
+    }
+    _write_json_atomic(video_index_path(video_id), index)
+    return {
+        "file": os.path.basename(video_index_path(video_id)),
+        "keyframes": len(keyframes),
+        "complete": index["complete"],
+        "constant_frame_rate": constant_rate,
+    }
+
+def _frame_time_ms(timestamps: np.ndarray, fps: float, frame: int) -> float:
+    if frame < len(timestamps) and not math.isnan(timestamps[frame]):
+        return float(timestamps[frame])
+    return frame * 1000.0 / fps if fps > 0 else 0.0
+
+def frame_time(index: dict, frame: int) -> float:
+    """Seconds at which `frame` of an indexed video is shown."""
+    stamps = index["timestamps_ms"]
+    if stamps is not None and 0 <= frame < len(stamps) and stamps[frame] is not None:
+        return stamps[frame] / 1000
+    return frame / index["fps"] if index["fps"] > 0 else 0.0
+
+def frame_at(index: dict, time: float) -> int:
+    """The frame shown at `time` seconds: the last one starting at or before it."""
+    stamps = index["timestamps_ms"]
+    if stamps is None or any(t is None for t in stamps):
+        frame = int(time * index["fps"] + 1e-6) if index["fps"] > 0 else 0
+    else:
+        frame = bisect.bisect_right(stamps, time * 1000) - 1
+    return min(max(frame, 0), max(index["frames"] - 1, 0))
+
+def keyframe_before(index: dict, frame: int) -> Optional[int]:
+    """The last keyframe at or before `frame`, where a seek to `frame` starts decoding."""
+    position = bisect.bisect_right(index["keyframes"], frame)
+    return index["keyframes"][position - 1] if position else None
+
+def thumbnail_tile(layout: dict, time: float) -> dict:
+    """Position in the sprite of the thumbnail covering `time` seconds."""
+    tile = min(max(int(time // layout["interval"]), 0), layout["count"] - 1)
+    row, column = divmod(tile, layout["columns"])
+    return {
+        "tile": tile,
+        "time": round(tile * layout["interval"], 4),
+        "frame": layout["frames"][tile],
+        "x": column * layout["tile_width"],
+        "y": row * layout["tile_height"],
+        "width": layout["tile_width"],
+        "height": layout["tile_height"],
+    }
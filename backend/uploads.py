@@ -0,0 +1,198 @@
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from config import settings
+
+# Chunked uploads: a session collects the bytes of one video in a part file,
+# chunk by chunk at increasing byte offsets, and is finalized once complete.
+# The part file's size is the upload offset, so a session survives restarts
+# and a client that lost its connection asks for the offset and resends the rest.
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Running SHA-256 of the bytes each session received: [hasher, bytes hashed].
+# Bytes only ever reach a part file in order, so the hash is updated as every
+# chunk is written and finalizing never reads the upload again. A process
+# that missed bytes (after a restart, or when another server process wrote
+# some chunks) hashes them from the part file before going on.
+_hashes: Dict[str, list] = {}
+
+class UploadError(Exception):
+    """Raised when an upload is refused. `status_code` is the HTTP status to answer with."""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+def session_directory() -> str:
+    return os.path.join(settings.UPLOAD_DIRECTORY, "sessions")
+
+def _session_path(upload_id: str) -> str:
+    return os.path.join(session_directory(), f"{upload_id}.json")
+
+def _part_path(upload_id: str) -> str:
+    return os.path.join(session_directory(), f"{upload_id}.part")
+
+def check_video_type(content_type: Optional[str], filename: Optional[str]) -> str:
+    """
+    Returns the video MIME type of an upload or raises UploadError (415).
+    Generic or missing content types fall back to the file extension.
+    """
+    if content_type in (None, "", "application/octet-stream"):
+        content_type = mimetypes.guess_type(filename or "")[0]
+    if content_type not in settings.ALLOWED_VIDEO_TYPES:
+        allowed = ", ".join(settings.ALLOWED_VIDEO_TYPES)
+        raise UploadError(415, f"Unsupported video type {content_type or 'unknown'}. Allowed: {allowed}")
+    return content_type
+
+def check_video_size(size: int):
+    """Raises UploadError (413) for uploads over MAX_FILE_SIZE."""
+    if size > settings.MAX_FILE_SIZE:
+        raise UploadError(
+            413, f"Video is {size} bytes, the limit is {settings.MAX_FILE_SIZE} bytes"
+        )
+
+def looks_like_video(head: bytes) -> bool:
+    """
+    Whether the first bytes of a file carry the signature of a container
+    we can decode: MP4/QuickTime (an ftyp, moov, mdat, free, skip or wide
+    box), AVI (RIFF....AVI ) or Matroska/WebM (EBML).
+    """
+    if len(head) >= 8 and head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide"):
+        return True
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return True
+    return head[:4] == b"\x1a\x45\xdf\xa3"
+
+def create_session(filename: str, content_type: Optional[str], total_size: int, profile: dict) -> dict:
+    """
+    Opens an upload session after the type and size checks, so nothing of
+    an upload we would refuse is ever transferred.
+    """
+    content_type = check_video_type(content_type, filename)
+    check_video_size(total_size)
+    if total_size <= 0:
+        raise UploadError(400, "total_size must be positive")
+    os.makedirs(session_directory(), exist_ok=True)
+    session = {
+        "upload_id": str(uuid.uuid4()),
+        "filename": filename,
+        "content_type": content_type,
+        "total_size": total_size,
+        "profile": profile,
+        "created_at": time.time(),
+    }
+    open(_part_path(session["upload_id"]), "wb").close()
+    with open(_session_path(session["upload_id"]), "w") as f:
+        json.dump(session, f)
+    return session
+
+def load_session(upload_id: str) -> Optional[dict]:
+    """The session with its current offset, or None when it does not exist."""
+    try:
+        # Ids end up in file paths, so only ids we could have handed out are looked up
+        uuid.UUID(upload_id)
+    except ValueError:
+        return None
+    try:
+        with open(_session_path(upload_id)) as f:
+            session = json.load(f)
+        session["offset"] = os.path.getsize(_part_path(upload_id))
+    except (OSError, ValueError):
+        return None
+    return session
+
+def _hash_through(upload_id: str, offset: int):
+    """The session's running hash, brought up to the first `offset` bytes of its part file."""
+    state = _hashes.get(upload_id)
+    if state is None or state[1] > offset:
+        state = _hashes[upload_id] = [hashlib.sha256(), 0]
+    if state[1] < offset:
+        with open(_part_path(upload_id), "rb") as f:
+            f.seek(state[1])
+            while state[1] < offset:
+                block = f.read(min(HASH_BLOCK_SIZE, offset - state[1]))
+                if not block:
+                    raise UploadError(409, "Upload part file is shorter than its offset")
+                state[0].update(block)
+                state[1] += len(block)
+    return state[0]
+
+def write_chunk(session: dict, offset: int, data: bytes) -> int:
+    """
+    Writes `data` to the session at `offset` and returns the offset just
+    past it. The offset may repeat bytes that already arrived, e.g. when a
+    chunk is retried or a late duplicate comes in; only the bytes past what
+    was received are written, so nothing received is dropped. The offset
+    may not leave a gap. Nothing past the declared total size is accepted.
+    """
+    received = session["offset"]
+    if offset < 0:
+        raise UploadError(400, "Offset must not be negative")
+    if offset > received:
+        raise UploadError(409, f"Offset {offset} is past the {received} bytes received so far")
+    end = offset + len(data)
+    if end > session["total_size"]:
+        raise UploadError(413, f"Chunk goes past the declared size of {session['total_size']} bytes")
+    if offset == 0 and data and not looks_like_video(data[:16]):
+        raise UploadError(415, "File content is not a supported video container")
+    if end > received:
+        new_bytes = data[received - offset:]
+        digest = _hash_through(session["upload_id"], received)
+        with open(_part_path(session["upload_id"]), "r+b") as f:
+            f.seek(received)
+            f.write(new_bytes)
+        digest.update(new_bytes)
+        _hashes[session["upload_id"]][1] = end
+        session["offset"] = end
+    return end
+
+def finalize_session(session: dict, file_path: str) -> str:
+    """
+    Moves a complete upload to `file_path` and returns the SHA-256 of the
+    content, kept up to date while the chunks were written. The session itself stays until delete_session, so a video that
+    could not be handed on is put back with restore_session.
+    """
+    if session["offset"] != session["total_size"]:
+        raise UploadError(
+            409, f"Upload is incomplete: {session['offset']} of {session['total_size']} bytes received"
+        )
+    digest = _hash_through(session["upload_id"], session["total_size"])
+    shutil.move(_part_path(session["upload_id"]), file_path)
+    return digest.hexdigest()
+
+def restore_session(session: dict, file_path: str):
+    """Moves a finalized upload back into its session."""
+    shutil.move(file_path, _part_path(session["upload_id"]))
+
+def delete_session(upload_id: str):
+    _hashes.pop(upload_id, None)
+    for path in (_part_path(upload_id), _session_path(upload_id)):
+        if os.path.exists(path):
+            os.remove(path)
+
+def expire_sessions() -> List[str]:
+    """Removes sessions idle for more than UPLOAD_SESSION_TTL seconds; returns their ids."""
+    expired = []
+    if not os.path.isdir(session_directory()):
+        return expired
+    cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+    for name in os.listdir(session_directory()):
+        if not name.endswith(".json"):
+            continue
+        upload_id = name[:-len(".json")]
+        path = _session_path(upload_id)
+        try:
+            # The part file changes with every chunk, so idle sessions are the ones that expire
+            last_active = max(os.path.getmtime(path), os.path.getmtime(_part_path(upload_id)))
+        except OSError:
+            last_active = 0
+        if last_active < cutoff:
+            delete_session(upload_id)
+            expired.append(upload_id)
+    return expired
@@ -0,0 +1,501 @@
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+
+from analysis import (
+    analyze_frame_range, build_video_analysis, create_cascade_pose, create_pose, create_roi_pose,
+    plan_segments,
+    read_video_properties, run_pose_analysis, save_video_analysis, stitch_frame_ranges
+)
+from config import settings
+from jobs import JobCancelled, job_registry
+from metrics import MetricsAccumulator
+from persistence import persist_analysis
+from players import run_multi_player_analysis
+from proxy import ProxyWriter, concatenate_proxies
+from schemas import AnalysisProfile
+from storage import landmarks_path, proxy_path
+from timeline import ThumbnailCollector
+from telemetry import record_analysis_job
+
+# Pose instances owned by the current worker process
+_worker_pose = None
+_worker_cascade_pose = None
+
+def _init_worker():
+    """
+    Process initializer: every worker builds its own Pose instance once.
+    """
+    global _worker_pose
+    _worker_pose = create_pose()
+
+def _pose_for(profile: AnalysisProfile):
+    """
+    The worker's Pose instance for a profile, reset for a new video. The
+    cascade is only built once a job asks for it; ROI inference wraps
+    whichever one is used.
+    """
+    global _worker_cascade_pose
+    if not profile.pose_cascade:
+        pose = _worker_pose
+    else:
+        if _worker_cascade_pose is None:
+            _worker_cascade_pose = create_cascade_pose()
+        pose = _worker_cascade_pose
+    # Drop tracking state left over from the previous video
+    pose.reset()
+    return create_roi_pose(pose) if profile.roi else pose
+
+class JobProgress:
+    """
+    Progress callback of a job or segment for analyze_frame_range. Adds the
+    covered frames to the job registry and, when video `properties` are
+    given, rolling metrics of the frames analyzed so far at most every
+    ANALYSIS_PARTIAL_METRICS_INTERVAL seconds.
+    """
+    def __init__(self, video_id: str, properties: Optional[dict] = None, stride: int = 1):
+        self.video_id = video_id
+        self.metrics = None
+        if properties is not None:
+            effective_fps = properties["fps"] / stride if properties["fps"] > 0 else 0
+            self.metrics = MetricsAccumulator(properties["width"], properties["height"], effective_fps)
+        self._positions_fed = 0
+        self._next_metrics = 0.0
+    
+    def __call__(self, frames: int, hip_positions: list):
+        partial_metrics = None
+        if self.metrics is not None:
+            # Only the positions collected since the previous call are fed
+            self.metrics.add_positions(hip_positions[self._positions_fed:])
+            self._positions_fed = len(hip_positions)
+            now = time.monotonic()
+            if now >= self._next_metrics:
+                partial_metrics = self.metrics.snapshot().dict()
+                self._next_metrics = now + settings.ANALYSIS_PARTIAL_METRICS_INTERVAL
+        job_registry.add_progress(self.video_id, frames, partial_metrics)
+
+class JobCheckpoint:
+    """
+    Checkpoint callback of a job or segment for analyze_frame_range. Records
+    the state of the frame range starting at `range_start` in the job
+    registry, so a restarted server can resume from it.
+    """
+    def __init__(self, video_id: str, range_start: int):
+        self.video_id = video_id
+        self.range_start = range_start
+    
+    def __call__(self, state: dict):
+        job_registry.save_checkpoint(self.video_id, self.range_start, state)
+
+def _checkpoint_for(video_id: str, range_start: int) -> Optional[JobCheckpoint]:
+    return JobCheckpoint(video_id, range_start) if settings.ANALYSIS_CHECKPOINT_INTERVAL > 0 else None
+
+def _run_analysis_job(video_path: str, video_id: str,
+                      profile: Optional[AnalysisProfile] = None) -> bool:
+    """
+    Runs one analysis job inside a worker process. The result is written to
+    disk and the outcome to the job registry, so only a success flag crosses
+    the process boundary.
+    """
+    try:
+        job_registry.start(video_id)
+        profile = profile or AnalysisProfile.from_settings()
+        properties = read_video_properties(video_path)
+        stride = profile.stride_for(properties["fps"])
+        if profile.multi_player:
+            # Player tracks are not checkpointed: an interrupted multi-player job starts over
+            # Every player gets a Pose instance of their own
+            pose_factory = create_cascade_pose if profile.pose_cascade else create_pose
+            proxy = None
+            if settings.ANALYSIS_PROXY:
+                proxy = ProxyWriter(proxy_path(video_id), properties["fps"] / stride if properties["fps"] > 0 else 0)
+            thumbnails = None
+            if settings.ANALYSIS_THUMBNAILS:
+                thumbnails = ThumbnailCollector(properties["fps"], properties["total_frames"])
+            frames = run_multi_player_analysis(
+                video_path, video_id, profile, properties, pose_factory, progress=JobProgress(video_id),
+                proxy=proxy, thumbnails=thumbnails
+            )
+            analysis_result = build_video_analysis(video_id, properties, profile, stride, frames)
+            analysis_result.analysis_metadata["players"] = frames["players"]
+            analysis_result.analysis_metadata["tracking"] = frames["tracking"]
+        else:
+            checkpoints = job_registry.checkpoints(video_id)
+            if not checkpoints:
+                job_registry.plan_ranges(video_id, [(0, None)])
+            analysis_result = run_pose_analysis(
+                video_path, video_id, _pose_for(profile), profile,
+                progress=JobProgress(video_id, properties, stride),
+                checkpoint=_checkpoint_for(video_id, 0),
+                resume_from=checkpoints[0]["state"] if checkpoints else None,
+                proxy_output_path=proxy_path(video_id) if settings.ANALYSIS_PROXY else None
+            )
+        save_video_analysis(analysis_result)
+        persisted = persist_analysis(analysis_result, video_path, job_registry.get(video_id)["created_at"])
+        job_registry.complete(video_id, persistence=persisted)
+        return True
+    except JobCancelled:
+        print(f"Analysis job {video_id} cancelled")
+        return False
+    except Exception as e:
+        print(f"Error analyzing video: {e}")
+        job_registry.fail(video_id, f"{type(e).__name__}: {e}")
+        return False
+
+def _run_segment_job(video_path: str, video_id: str, profile: AnalysisProfile, stride: int,
+                     output_path: str, start_frame: int, end_frame: Optional[int],
+                     warmup_frames: int, properties: dict, partial_metrics: bool = False,
+                     resume_from: Optional[dict] = None, proxy_output_path: Optional[str] = None) -> dict:
+    """
+    Analyzes one frame range of a long video inside a worker process and
+    writes its landmarks to a part file. Segments with `partial_metrics`
+    also report rolling partial metrics; segments given a checkpoint state
+    in `resume_from` continue from it. With `proxy_output_path`, the
+    segment's part of the playback proxy is written there.
+    """
+    fps = properties["fps"] / stride if properties["fps"] > 0 else 0
+    # Parts are joined into one proxy afterwards, which makes that one fast start
+    proxy = ProxyWriter(proxy_output_path, fps, fast_start=False) if proxy_output_path else None
+    thumbnails = None
+    if settings.ANALYSIS_THUMBNAILS:
+        thumbnails = ThumbnailCollector(properties["fps"], properties["total_frames"])
+    return analyze_frame_range(
+        video_path, _pose_for(profile), profile, stride, output_path,
+        start_frame=start_frame, end_frame=end_frame, warmup_frames=warmup_frames,
+        progress=JobProgress(video_id, properties if partial_metrics else None, stride),
+        checkpoint=_checkpoint_for(video_id, start_frame), resume_from=resume_from,
+        proxy=proxy, thumbnails=thumbnails
+    )
+
+def _finish_segmented_job(video_path: str, video_id: str, profile: AnalysisProfile, stride: int,
+                          properties: dict, segments: List[tuple], results: List[dict]):
+    """
+    Stitches the analyzed segments of a long video inside a worker process:
+    joins the landmark and proxy parts, builds and saves the VideoAnalysis,
+    persists its stats and completes the job.
+    """
+    output_path = landmarks_path(video_id)
+    frames = stitch_frame_ranges(results, output_path)
+    proxy_parts = [r["proxy"] for r in results]
+    part_paths = [f"{proxy_path(video_id)}.part{start_frame}.mp4" for start_frame, _ in segments]
+    if settings.ANALYSIS_PROXY and all(proxy_parts):
+        proxy_fps = properties["fps"] / stride if properties["fps"] > 0 else 0
+        frames["proxy"] = concatenate_proxies(part_paths, proxy_path(video_id), proxy_fps)
+    else:
+        # Resumed segments have no proxy part, so the video gets none
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+    
+    analysis_result = build_video_analysis(video_id, properties, profile, stride, frames)
+    analysis_result.analysis_metadata["segments"] = len(segments)
+    resumed_segments = sum(1 for r in results if r.get("resumed_from_frame"))
+    if resumed_segments:
+        analysis_result.analysis_metadata["resumed_segments"] = resumed_segments
+    save_video_analysis(analysis_result)
+    persisted = persist_analysis(analysis_result, video_path, job_registry.get(video_id)["created_at"])
+    job_registry.complete(video_id, persistence=persisted)
+
+class QueueFullError(Exception):
+    """Raised when the analysis queue has no room for another job."""
+
+class AnalysisWorkerPool:
+    """
+    Bounded pool of analysis worker processes.
+    
+    At most `max_workers` jobs run at once and at most `max_queued` more wait
+    for a free worker; submissions beyond that raise QueueFullError.
+    """
+    def __init__(self, max_workers: int, max_queued: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Segmented jobs are coordinated from threads that only wait on workers
+        self._coordinators = ThreadPoolExecutor(
+            max_workers=self.max_workers + self.max_queued,
+            thread_name_prefix="segment-coordinator",
+        )
+        self._jobs: Dict[str, object] = {}
+        self._segmented_jobs: Set[str] = set()
+        self._lock = threading.Lock()
+        # Registry owner of the jobs submitted to this pool, unique per server process
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lease_stop = threading.Event()
+        self._lease_thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            if self._lease_thread is None:
+                job_registry.renew_lease(self.owner)
+                self._lease_stop.clear()
+                self._lease_thread = threading.Thread(
+                    target=self._keep_lease, name="job-lease", daemon=True
+                )
+                self._lease_thread.start()
+    
+    def _keep_lease(self):
+        # Renews the lease on this process's jobs and resumes the jobs of
+        # server processes that stopped renewing theirs, e.g. after a crash
+        while not self._lease_stop.wait(settings.JOB_LEASE_INTERVAL):
+            try:
+                resumed, failed = self.resume_unfinished()
+            except Exception as e:
+                print(f"Could not resume orphaned analysis jobs: {e}")
+                continue
+            if resumed or failed:
+                print(f"Resumed {resumed} orphaned analysis jobs, marked {failed} as failed")
+    
+    def shutdown(self, wait: bool = True):
+        self._lease_stop.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._lease_thread = None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        self._coordinators.shutdown(wait=wait, cancel_futures=not wait)
+    
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # "spawn" keeps MediaPipe/TFLite threads of the API process out of the workers
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queued
+    
+    @property
+    def active_jobs(self) -> int:
+        with self._lock:
+            return sum(1 for future in self._jobs.values() if future.running())
+    
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for future in self._jobs.values() if not future.running())
+    
+    def is_full(self) -> bool:
+        with self._lock:
+            return len(self._jobs) >= self.capacity
+    
+    def submit(self, video_path: str, video_id: str,
+               profile: Optional[AnalysisProfile] = None) -> str:
+        """
+        Queue a video for analysis. Returns "processing" when a worker is free
+        right away and "queued" otherwise.
+        
+        Videos of at least ANALYSIS_SEGMENT_MIN_FRAMES frames are split into
+        frame ranges that are analyzed on several workers and stitched back.
+        Multi-player analyses always run on one worker, since player tracks
+        cannot be stitched across segments.
+        """
+        profile = profile or AnalysisProfile.from_settings()
+        properties = self._read_properties(video_path)
+        segmented = self._is_segmented(profile, properties)
+        
+        with self._lock:
+            if len(self._jobs) >= self.capacity:
+                raise QueueFullError(
+                    f"Analysis queue is full ({len(self._jobs)} jobs pending)"
+                )
+            job_registry.create(
+                video_id, max(properties["total_frames"], 0), video_path=video_path,
+                profile=profile.dict(), owner=self.owner,
+            )
+            return self._dispatch(video_path, video_id, profile, properties, segmented)
+    
+    def _is_segmented(self, profile: AnalysisProfile, properties: dict) -> bool:
+        return (
+            self.max_workers > 1 and not profile.multi_player
+            and properties["total_frames"] >= settings.ANALYSIS_SEGMENT_MIN_FRAMES
+        )
+    
+    @staticmethod
+    def _read_properties(video_path: str) -> dict:
+        try:
+            return read_video_properties(video_path)
+        except ValueError:
+            # Unreadable videos still get a job, which records the failure
+            return {"total_frames": 0}
+    
+    def _busy_workers(self) -> int:
+        """
+        Workers taken by the pool's unfinished jobs, running ones first and then
+        the ones queued before them; a segmented job takes a worker per
+        segment. Must be called with the lock held.
+        """
+        segment_workers = min(settings.ANALYSIS_SEGMENT_COUNT or self.max_workers, self.max_workers)
+        return sum(
+            segment_workers if video_id in self._segmented_jobs else 1
+            for video_id, future in self._jobs.items() if not future.done()
+        )
+    
+    def _dispatch(self, video_path: str, video_id: str, profile: AnalysisProfile,
+                  properties: dict, segmented: bool) -> str:
+        """Hands a registered job to the workers. Must be called with the lock held."""
+        # Whether a worker is free for this job, before it is counted itself
+        status = "processing" if self._busy_workers() < self.max_workers else "queued"
+        if self._executor is None:
+            self._executor = self._create_executor()
+        if segmented:
+            future = self._coordinators.submit(
+                self._run_segmented_job, video_path, video_id, profile, properties
+            )
+        else:
+            try:
+                future = self._executor.submit(_run_analysis_job, video_path, video_id, profile)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed by the OOM killer); start a fresh pool
+                print("Analysis worker pool is broken, restarting it")
+                self._executor = self._create_executor()
+                future = self._executor.submit(_run_analysis_job, video_path, video_id, profile)
+        self._jobs[video_id] = future
+        if segmented:
+            self._segmented_jobs.add(video_id)
+        else:
+            self._segmented_jobs.discard(video_id)
+        future.add_done_callback(lambda f: self._job_done(video_id, f))
+        return status
+    
+    def resume_unfinished(self) -> Tuple[int, int]:
+        """
+        Renews this process's lease and picks up the jobs that server
+        processes whose lease expired left queued or running. Only the jobs
+        this process claimed in the registry are resumed, each from its last
+        checkpoints with the profile it was submitted with; jobs whose video
+        is gone are marked as failed. Returns how many were resumed and how
+        many failed.
+        """
+        job_registry.renew_lease(self.owner)
+        resumed = failed = 0
+        for job in job_registry.claim_unfinished(self.owner):
+            video_id, video_path = job["video_id"], job["video_path"]
+            if not video_path or not os.path.exists(video_path):
+                job_registry.fail(video_id, "Interrupted by a server restart")
+                failed += 1
+                continue
+            profile = AnalysisProfile(**json.loads(job["profile"])) if job["profile"] else None
+            profile = profile or AnalysisProfile.from_settings()
+            properties = self._read_properties(video_path)
+            # A job that planned its ranges keeps them; one interrupted before
+            # that is split by the same rule as a new submission
+            checkpoints = job_registry.checkpoints(video_id)
+            segmented = len(checkpoints) > 1 if checkpoints else self._is_segmented(profile, properties)
+            with self._lock:
+                # Resumed jobs were admitted before the restart, so the queue limit does not apply
+                self._dispatch(video_path, video_id, profile, properties, segmented)
+            resumed += 1
+        return resumed, failed
+    
+    def _run_segmented_job(self, video_path: str, video_id: str,
+                           profile: AnalysisProfile, properties: dict) -> bool:
+        """
+        Fans one long video out to the workers as overlapping frame ranges and
+        stitches the per-frame landmarks back into a single VideoAnalysis.
+        The coordinator thread only waits: segments and the stitching run on
+        the workers, so the API process does no analysis work.
+        """
+        with self._lock:
+            executor = self._executor
+        stride = profile.stride_for(properties["fps"])
+        segment_count = settings.ANALYSIS_SEGMENT_COUNT or self.max_workers
+        overlap = settings.ANALYSIS_SEGMENT_OVERLAP
+        
+        output_path = landmarks_path(video_id)
+        futures = []
+        try:
+            job_registry.start(video_id)
+            # A resumed job keeps the segments it was planned with and their checkpoints
+            checkpoints = job_registry.checkpoints(video_id)
+            if checkpoints:
+                segments = [(row["range_start"], row["range_end"]) for row in checkpoints]
+            else:
+                segments = plan_segments(properties["total_frames"], segment_count)
+                job_registry.plan_ranges(video_id, segments)
+            states = {row["range_start"]: row["state"] for row in checkpoints}
+            futures = [
+                executor.submit(
+                    _run_segment_job, video_path, video_id, profile, stride,
+                    f"{output_path}.part{start_frame}",
+                    start_frame, end_frame, overlap if start_frame > 0 else 0,
+                    # Partial metrics come from the opening segment, which covers the start of the video
+                    properties, start_frame == 0,
+                    states.get(start_frame),
+                    f"{proxy_path(video_id)}.part{start_frame}.mp4" if settings.ANALYSIS_PROXY else None
+                )
+                for start_frame, end_frame in segments
+            ]
+            results = [future.result() for future in futures]
+            executor.submit(
+                _finish_segmented_job, video_path, video_id, profile, stride, properties, segments, results
+            ).result()
+            return True
+        except JobCancelled:
+            print(f"Analysis job {video_id} cancelled")
+            return False
+        except Exception as e:
+            print(f"Error analyzing video: {e}")
+            job_registry.fail(video_id, f"{type(e).__name__}: {e}")
+            return False
+        finally:
+            # Segments still waiting for a worker are not needed any more
+            for future in futures:
+                future.cancel()
+    
+    def _job_done(self, video_id: str, future):
+        with self._lock:
+            if self._jobs.get(video_id) is future:
+                del self._jobs[video_id]
+                self._segmented_jobs.discard(video_id)
+        if future.cancelled():
+            job_registry.cancel(video_id)
+        else:
+            error = future.exception()
+            if error is not None:
+                # The worker died before it could record the failure itself
+                print(f"Analysis job {video_id} failed: {error}")
+                job_registry.fail(video_id, f"{type(error).__name__}: {error}")
+        try:
+            record_analysis_job(video_id)
+        except Exception as e:
+            print(f"Could not record metrics of analysis job {video_id}: {e}")
+    
+    def cancel(self, video_id: str) -> bool:
+        """
+        Cancels a queued or running job. Queued jobs never start; running ones
+        stop at their next progress update. Returns False when the job
+        already finished.
+        """
+        if not job_registry.cancel(video_id):
+            return False
+        with self._lock:
+            future = self._jobs.get(video_id)
+        if future is not None:
+            future.cancel()
+        return True
+    
+    def status(self, video_id: str) -> Optional[str]:
+        """
+        Returns "queued" or "processing" for jobs known to the pool, None otherwise.
+        """
+        with self._lock:
+            future = self._jobs.get(video_id)
+        if future is None:
+            return None
+        return "processing" if future.running() else "queued"
+
+analysis_pool = AnalysisWorkerPool(
+    max_workers=settings.ANALYSIS_WORKERS,
+    max_queued=settings.ANALYSIS_QUEUE_SIZE,
+)
@@ -66,6 +66,8 @@ const VideoAnalysis: React.FC<VideoAnalysisProps> = ({ videoId, safeFilename })
   const [chartType, setChartType] = useState<'movement' | 'trajectory'>('movement');
   const [viewMode, setViewMode] = useState<'charts' | 'playback'>('charts');
   const [currentFrame, setCurrentFrame] = useState(0);
+  const [liveProgress, setLiveProgress] = useState<number | null>(null);
+  const [partialMetrics, setPartialMetrics] = useState<BasketballMetrics | null>(null);
 
   // Calculate video URL using the safe filename from upload
   const videoUrl = analysis && safeFilename ? `https://basketball-api-production.up.railway.app/uploads/${safeFilename}` : '';
@@ -108,6 +110,9 @@ const VideoAnalysis: React.FC<VideoAnalysisProps> = ({ videoId, safeFilename })
       
       if (status.status === 'completed') {
         fetchAnalysis();
+      } else if (status.status === 'failed' || status.status === 'cancelled') {
+        setError(status.error || status.message);
+        setLoading(false);
       } else {
         // If still processing, check again in 2 seconds
         setTimeout(checkStatus, 2000);
@@ -119,17 +124,51 @@ const VideoAnalysis: React.FC<VideoAnalysisProps> = ({ videoId, safeFilename })
   }, [videoId, fetchAnalysis]);
 
   useEffect(() => {
-    // Start by checking status instead of immediately fetching analysis
-    checkStatus();
-  }, [videoId, checkStatus]);
+    // Progress and partial metrics are pushed over server-sent events; fall back to polling
+    if (typeof EventSource === 'undefined') {
+      checkStatus();
+      return;
+    }
+    const events = new EventSource(`https://basketball-api-production.up.railway.app/videos/${videoId}/events`);
+    events.addEventListener('progress', (event) => {
+      const status = JSON.parse((event as MessageEvent).data);
+      setLiveProgress(status.progress);
+    });
+    events.addEventListener('metrics', (event) => {
+      setPartialMetrics(JSON.parse((event as MessageEvent).data).basketball_metrics);
+    });
+    events.addEventListener('end', (event) => {
+      events.close();
+      const status = JSON.parse((event as MessageEvent).data);
+      if (status.status === 'completed') {
+        fetchAnalysis();
+      } else {
+        checkStatus();
+      }
+    });
+    events.onerror = () => {
+      events.close();
+      checkStatus();
+    };
+    return () => events.close();
+  }, [videoId, checkStatus, fetchAnalysis]);
 
   if (loading) {
     return (
       <Card className="p-6">
         <div className="flex items-center justify-center space-x-3">
           <Loader className="h-6 w-6 animate-spin text-brand-orange" />
-          <span className="text-white">Processing video with AI pose estimation...</span>
+          <span className="text-white">
+            Processing video with AI pose estimation...
+            {liveProgress !== null && ` ${Math.round(liveProgress * 100)}%`}
+          </span>
         </div>
+        {partialMetrics && (
+          <div className="mt-4 text-center text-gray-300 text-sm">
+            So far: {partialMetrics.total_distance_covered.toFixed(1)} ft covered, 
+            avg {partialMetrics.average_speed.toFixed(1)} mph, max {partialMetrics.max_speed.toFixed(1)} mph
+          </div>
+        )}
         <div className="mt-4 text-center">
           <Button onClick={checkStatus} variant="secondary" size="sm">
             Check Status
@@ -75,6 +75,8 @@ CREATE TABLE public.player_stats (
     heart_rate INTEGER, -- bpm
     speed_max DECIMAL(5,2), -- km/h
     speed_avg DECIMAL(5,2), -- km/h
+    player_index INTEGER, -- tracked player within the session's video
+    video_timestamp DECIMAL(10,2), -- start of a stats sample in the video in seconds, null for session totals
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 